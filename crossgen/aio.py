@@ -0,0 +1,102 @@
+"""asyncio API for crossword generation, for embedding it in async services without blocking the event loop.
+
+    async for score, crossword in aio.agenerate(words, max=10, timeout=5):
+        ...
+
+    # many word lists at once, in parallel worker processes
+    with concurrent.futures.ProcessPoolExecutor() as pool:
+        results = await asyncio.gather(*(aio.acreate_crosswords(words, executor=pool, timeout=5) for words in word_lists))
+
+agenerate runs the search in a thread, and streams results through a bounded queue: if the consumer falls
+behind, the search waits for it. Cancelling the consumer (or leaving the async for loop early) stops the search.
+
+Keyword arguments are passed on to command.create_crosswords.
+"""
+
+import asyncio
+import concurrent.futures
+import threading
+
+from crossgen import command
+
+_DONE = object()
+"""Queue entry marking the end of the results"""
+
+POLL_INTERVAL = 0.1
+"""Seconds between checks for cancellation while the search is waiting for the consumer"""
+
+async def agenerate(words, queue_size=16, executor=None, **kwargs):
+    """Async generator of (score, crossword) tuples, in the order they are found (not sorted by score)
+
+    queue_size = most results to buffer before the search waits for the consumer
+    executor = concurrent.futures.ThreadPoolExecutor to run the search in, or None for the event loop's default
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue(maxsize=queue_size)
+    cancel = threading.Event()
+
+    def put(score, crossword): # runs in the search thread
+        future = asyncio.run_coroutine_threadsafe(queue.put((score, crossword)), loop)
+        while True:
+            try:
+                future.result(timeout=POLL_INTERVAL)
+                return
+            except concurrent.futures.TimeoutError:
+                if cancel.is_set():
+                    future.cancel()
+                    return
+
+    def run():
+        command.create_crosswords(list(words), result_callback=put, cancel=cancel, verbose=False, **kwargs)
+
+    def finish(future): # runs in the event loop once the search is done
+        if not cancel.is_set(): # otherwise, nobody is left to read it
+            loop.create_task(queue.put(_DONE))
+
+    producer = loop.run_in_executor(executor, run)
+    producer.add_done_callback(finish)
+    try:
+        while True:
+            item = await queue.get()
+            if item is _DONE:
+                break
+            yield item
+        await producer # re-raise anything the search raised
+    finally:
+        cancel.set()
+
+async def acreate_crosswords(words, executor=None, **kwargs):
+    """Coroutine version of command.create_crosswords, returning the same sorted list of (score, crossword)
+
+    executor = where to run the search:
+        - None or a ThreadPoolExecutor: in a thread; cancelling the coroutine stops the search
+        - a ProcessPoolExecutor: in a worker process, so that several searches can run in parallel with
+          asyncio.gather; kwargs must then be picklable, and cancelling only stops searches that haven't
+          started yet, so pass a timeout
+    """
+    loop = asyncio.get_running_loop()
+    if isinstance(executor, concurrent.futures.ProcessPoolExecutor):
+        return await loop.run_in_executor(executor, _create_crosswords, list(words), kwargs)
+
+    cancel = threading.Event()
+    try:
+        return await loop.run_in_executor(executor, _create_crosswords, list(words), kwargs, cancel)
+    finally:
+        cancel.set()
+
+def _create_crosswords(words, kwargs, cancel=None):
+    return command.create_crosswords(words, cancel=cancel, verbose=False, **kwargs)
+
+async def _example():
+    words = ["reimu", "marisa", "sanae", "youmu", "sakuya"]
+    async for score, crossword in agenerate(words, max=3, seed=0):
+        print(f"score: {score:.2f}")
+        print(crossword)
+    results = await asyncio.gather(*(acreate_crosswords(words, max=5, seed=seed) for seed in range(3)))
+    print([len(result) for result in results])
+
+def main():
+    asyncio.run(_example())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""Batch generation: many word lists from a JSONL file, spread over a pool of worker processes.
+
+Each input line is a JSON object like the body of a crossgen.server /generate request:
+    {"id" : "puzzle-1", "words" : [...], "max" : 10, "timeout" : 5}
+where id is optional (it defaults to the line number, counting from 1), and any option left out takes its value
+from the defaults given to run_batch. Each list gets its own deadline, which starts when a worker picks it up
+rather than when it's read, so a long queue doesn't eat into it.
+
+Results are appended to the output file as soon as each list is done, one line per list, in the order they finish:
+    {"id" : ..., "words" : [...], "crosswords" : [{"score" : ..., "placements" : [...]}, ...], "stats" : {...}}
+or {"id" : ..., "error" : "..."} for lists that couldn't be generated. Rerunning with the same output file skips the
+lists that already have results there, so an interrupted run picks up where it stopped (failed lists are retried).
+
+Run with `crossgenc batch`.
+"""
+
+import concurrent.futures
+import json
+import logging
+import os
+import signal
+import sys
+import time
+
+from crossgen import server
+
+def _init_worker():
+    """Worker initializer: leave Ctrl+C to the parent, which would otherwise get partial results written as if
+    they were complete, keep per-list log messages out of the progress output, and import the search modules up front"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    logging.getLogger().setLevel(logging.WARNING)
+    server._warm_up()
+
+def _generate(words, options, timeout, cache_dir=None):
+    """Run one list in a worker process, with a deadline that starts now"""
+    return server._generate(words, options, time.time() + timeout, cache_dir)
+
+def read_done_ids(path):
+    """Return the set of ids that have results in the output file at path (which may not exist yet)
+
+    A line cut short by an interrupted write is truncated away, so that appending to the file keeps it valid."""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, "rb+") as infile:
+        good_size = 0
+        for line in infile:
+            if not line.endswith(b"\n"):
+                break
+            good_size += len(line)
+            result = json.loads(line)
+            if "error" not in result:
+                done.add(_id_key(result["id"]))
+        infile.truncate(good_size)
+    return done
+
+def _id_key(list_id):
+    return json.dumps(list_id, sort_keys=True) # so that 1 and "1" stay different, and lists or dicts still work
+
+def read_lists(infile, defaults, default_timeout, max_timeout):
+    """Yield (id, words, options, timeout) for each line of infile, or (id, None, error message, None) for bad lines"""
+    for line_number, line in enumerate(infile, 1):
+        if line.strip() == "":
+            continue
+        try:
+            request = json.loads(line)
+        except ValueError:
+            yield (line_number, None, "line is not valid JSON", None)
+            continue
+        if not isinstance(request, dict):
+            yield (line_number, None, "line must be a JSON object", None)
+            continue
+        list_id = request.get("id", line_number)
+        try:
+            (words, options, timeout) = server.parse_request({**defaults, **request}, default_timeout, max_timeout)
+        except server.RequestError as e:
+            yield (list_id, None, str(e), None)
+            continue
+        yield (list_id, words, options, timeout)
+
+def run_batch(infile, outpath, workers=None, defaults=None, default_timeout=10.0, max_timeout=60.0, cache_dir=None,
+        err=sys.stderr):
+    """Generate crosswords for every list in infile (an iterable of JSONL lines) that doesn't have results in outpath
+    yet, appending them to outpath, and return a summary dict; stops early (with summary["interrupted"] set) on Ctrl+C
+
+    workers = number of worker processes (default: one per CPU)
+    defaults = dict of create_crosswords options (see server.OPTIONS) for lines that don't give them
+    default_timeout, max_timeout = seconds per list for lines that don't give a timeout, and the most a line can ask for
+    cache_dir = directory of a cache.ResultCache shared by the workers, or None for no caching
+    """
+    workers = workers or os.cpu_count() or 1
+    defaults = defaults or {}
+    done_ids = read_done_ids(outpath)
+    summary = {"done" : 0, "skipped" : 0, "errors" : 0, "crosswords" : 0}
+    start_time = time.perf_counter()
+    max_pending = 2 * workers # enough to keep every worker busy, without reading the whole input up front
+
+    with open(outpath, "a", encoding="utf-8") as outfile:
+        def write(result):
+            outfile.write(json.dumps(result, separators=(",", ":")) + "\n")
+            outfile.flush()
+            if "error" in result:
+                summary["errors"] += 1
+                print("x", end="", file=err, flush=True)
+            else:
+                summary["done"] += 1
+                summary["crosswords"] += len(result["crosswords"])
+                print(".", end="", file=err, flush=True)
+
+        def collect(pending, return_when):
+            (finished, not_finished) = concurrent.futures.wait(pending, return_when=return_when)
+            for future in finished:
+                (list_id, words) = pending.pop(future)
+                try:
+                    (crosswords, stats) = future.result()
+                except Exception as e:
+                    write({"id" : list_id, "error" : f"{type(e).__name__}: {e}"})
+                    continue
+                words = [word.upper().replace(" ", "") for word in words]
+                write({"id" : list_id, "words" : words, "crosswords" : crosswords, "stats" : stats})
+
+        pool = concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+        pending = {} # future: (id, words)
+        seen_ids = set()
+        try:
+            for list_id, words, options, timeout in read_lists(infile, defaults, default_timeout, max_timeout):
+                key = _id_key(list_id)
+                if key in done_ids:
+                    summary["skipped"] += 1
+                    continue
+                if key in seen_ids:
+                    logging.warning(f"skipping duplicate list id {list_id}")
+                    continue
+                seen_ids.add(key)
+                if words is None:
+                    write({"id" : list_id, "error" : options})
+                    continue
+                pending[pool.submit(_generate, words, options, timeout, cache_dir)] = (list_id, words)
+                if len(pending) >= max_pending:
+                    collect(pending, concurrent.futures.FIRST_COMPLETED)
+            if len(pending) > 0:
+                collect(pending, concurrent.futures.ALL_COMPLETED)
+        except KeyboardInterrupt: # lists still running are redone next time
+            print(f"\nInterrupted with {len(pending)} lists unfinished", file=err)
+            pool.shutdown(wait=False, cancel_futures=True)
+            summary["interrupted"] = True
+        else:
+            pool.shutdown()
+
+    summary["time"] = time.perf_counter() - start_time
+    print(file=err)
+    return summary
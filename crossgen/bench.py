@@ -0,0 +1,224 @@
+"""Microbenchmarks for the grid.Grid, pretty and walker operations that generation time depends on.
+
+Run with `python -m crossgen.bench`. Every benchmark runs on fixed synthetic grids built from a
+seeded RNG, so numbers are comparable between runs and between commits.
+
+For each operation, reports the best time per call over several repeats, plus the peak memory
+allocated during a call and the number of memory blocks still held after it (measured separately
+with tracemalloc, since tracing slows everything down).
+"""
+
+import argparse
+import io
+import json
+import random
+import sys
+import time
+import tracemalloc
+
+from crossgen import grid
+from crossgen import pretty
+from crossgen import walker
+
+ALPHABET = "AEIORSTN"
+"""Small alphabet, so that synthetic words share plenty of letters"""
+
+def make_words(count, seed=0, min_length=3, max_length=10, alphabet=ALPHABET):
+    """Return a deterministic list of count distinct random words"""
+    rng = random.Random(seed)
+    words = []
+    while len(words) < count:
+        word = "".join(rng.choice(alphabet) for i in range(rng.randint(min_length, max_length)))
+        if word not in words:
+            words.append(word)
+    return words
+
+def make_grid(words, grid_class=grid.Grid):
+    """Greedily build a grid (a grid_class) out of as many of words as possible, in order
+
+    Each word is joined at the first parent word and letter it fits at, so the result only
+    depends on words."""
+    g = grid_class()
+    g.add_word(words[0], 0, 0, grid.EAST)
+    for child_word in words[1:]:
+        placed = False
+        for parent_word in list(g.words):
+            for parent_index, parent_letter in enumerate(parent_word):
+                for child_index, child_letter in enumerate(child_word):
+                    if parent_letter == child_letter and g.can_join_word(parent_word, parent_index, child_word, child_index):
+                        g.join_word(parent_word, parent_index, child_word, child_index)
+                        placed = True
+                        break
+                if placed:
+                    break
+            if placed:
+                break
+    return g
+
+def find_candidate(g, words):
+    """Return (word, x, y, direction) for the first word not in g that can be joined to it"""
+    for child_word in words:
+        if child_word in g.words:
+            continue
+        for parent_word, data in g.words.items():
+            for parent_index, parent_letter in enumerate(parent_word):
+                for child_index, child_letter in enumerate(child_word):
+                    if parent_letter == child_letter and g.can_join_word(parent_word, parent_index, child_word, child_index):
+                        direction = grid.switch_orientation(data["orientation"])
+                        join_coords = grid.add(data["coords"], grid.scale(data["orientation"], parent_index))
+                        (x, y) = grid.sub(join_coords, grid.scale(direction, child_index))
+                        return (child_word, x, y, direction)
+    raise ValueError("no word can be joined to the grid")
+
+def find_rejected_candidate(g, words):
+    """Return (word, x, y, direction) for the first join onto g of a word not in it that can't be made,
+    other than for a letter mismatch (which the search never tries)"""
+    for child_word in words:
+        if child_word in g.words:
+            continue
+        for parent_word, data in g.words.items():
+            for parent_index, parent_letter in enumerate(parent_word):
+                for child_index, child_letter in enumerate(child_word):
+                    if parent_letter == child_letter and not g.can_join_word(parent_word, parent_index, child_word, child_index):
+                        return (child_word, *g.get_join_position(parent_word, parent_index, child_index))
+    raise ValueError("every word can be joined to the grid")
+
+def make_search_state(words, seed=0, steps=20):
+    """Run a CrosswordTreeSearch on words for a fixed number of expansions, and return
+    (searcher, state) for the next state it would expand"""
+    searcher = walker.CrosswordTreeSearch(words, rng=seed)
+    for i in range(steps):
+        state = searcher.stack.pop()
+        if searcher.expand(state) is not None or len(searcher.stack) == 0:
+            break
+    return (searcher, searcher.stack[-1])
+
+def build_benchmarks(seed=0):
+    """Return a list of (name, setup) pairs, where setup() returns the function to time
+
+    The setup is kept out of the timings."""
+    benchmarks = []
+    for size in (10, 40):
+        words = make_words(size + 5, seed=seed)
+        g = make_grid(words[:size])
+        (word, x, y, direction) = find_candidate(g, words)
+        other = g.copy()
+        html_printer = pretty.HtmlGridPrinter(io.StringIO())
+        label = f"{len(g.words)}w"
+
+        benchmarks += [
+            (f"Grid.can_add_word[{label}]", lambda g=g, args=(word, x, y, direction): lambda: g.can_add_word(*args)),
+            (f"Grid.add_word[{label}]", lambda g=g, args=(word, x, y, direction): _add_word_setup(g, args)),
+            (f"Grid.copy[{label}]", lambda g=g: g.copy),
+            (f"Grid.__hash__[{label}]", lambda g=g: lambda: hash(g)),
+            (f"Grid.__eq__[{label}]", lambda g=g, other=other: lambda: g == other),
+            (f"Grid.get_grid_numbers[{label}]", lambda g=g: g.get_grid_numbers),
+            (f"pretty.be_judgmental[{label}]", lambda g=g: lambda: pretty.be_judgmental(g)),
+            (f"HtmlGridPrinter.print_crossword[{label}]",
+                lambda g=g, printer=html_printer: lambda: _print_crossword(printer, g)),
+        ]
+
+    # long words, with each grid backend on the same grids
+    for size in (10, 40):
+        words = make_words(size + 5, seed=seed, min_length=12, max_length=20)
+        for grid_class in (grid.Grid, grid.BitGrid):
+            g = make_grid(words[:size], grid_class)
+            accepted = find_candidate(g, words)
+            rejected = find_rejected_candidate(g, words)
+            label = f"{len(g.words)}w long"
+            name = grid_class.__name__
+            benchmarks += [
+                (f"{name}.can_add_word[{label}]", lambda g=g, args=accepted: lambda: g.can_add_word(*args)),
+                (f"{name}.can_add_word[{label} rejected]", lambda g=g, args=rejected: lambda: g.can_add_word(*args)),
+                (f"{name}.add_word[{label}]", lambda g=g, args=accepted: _add_word_setup(g, args)),
+                (f"{name}.copy[{label}]", lambda g=g: g.copy),
+            ]
+
+    words = make_words(8, seed=seed)
+    benchmarks.append(("CrosswordTreeSearch.expand[8w]", lambda: _expand_setup(words, seed)))
+    return benchmarks
+
+def _add_word_setup(g, args):
+    def run():
+        g2 = g.copy()
+        g2.add_word(*args)
+    return run
+
+def _print_crossword(printer, g):
+    printer.out.seek(0)
+    printer.out.truncate()
+    printer.print_crossword(g, "benchmark")
+
+def _expand_setup(words, seed):
+    (searcher, state) = make_search_state(words, seed=seed)
+    def run():
+        searcher.stack = []
+        searcher.expand(state)
+    return run
+
+def time_op(func, number, repeat):
+    """Return the best seconds per call of func over repeat runs of number calls each"""
+    best = float("inf")
+    for i in range(repeat):
+        start_time = time.perf_counter()
+        for j in range(number):
+            func()
+        best = min(best, (time.perf_counter() - start_time) / number)
+    return best
+
+def measure_allocations(func, number):
+    """Return (peak bytes allocated during a call, blocks still allocated after a call), averaged over number calls"""
+    func() # warm up caches etc. so that one-time allocations aren't counted
+    tracemalloc.start()
+    try:
+        total_peak = 0
+        snapshot_before = tracemalloc.take_snapshot()
+        for j in range(number):
+            (current, _) = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            func()
+            (_, peak) = tracemalloc.get_traced_memory()
+            total_peak += peak - current
+        snapshot_after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    stats = snapshot_after.compare_to(snapshot_before, "filename")
+    retained_blocks = sum(stat.count_diff for stat in stats)
+    return (total_peak / number, retained_blocks / number)
+
+def run_benchmarks(number=200, repeat=5, filter=None, seed=0, out=sys.stdout):
+    """Run every benchmark whose name contains filter, and return a list of result dicts"""
+    results = []
+    for name, setup in build_benchmarks(seed):
+        if filter is not None and filter not in name:
+            continue
+        func = setup()
+        seconds = time_op(func, number, repeat)
+        (peak_bytes, retained_blocks) = measure_allocations(setup(), number)
+        result = {
+            "name" : name,
+            "usec_per_op" : seconds * 1e6,
+            "peak_bytes_per_op" : peak_bytes,
+            "retained_blocks_per_op" : retained_blocks,
+        }
+        results.append(result)
+        print(f"{name:45} {result['usec_per_op']:10.2f} us/op {peak_bytes:10.0f} B peak/op {retained_blocks:8.2f} blocks kept/op", file=out)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmarks for crossgen hot paths",
+            formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument("-n", "--number", metavar="INT", default=200, type=int, help="calls per timing run")
+    parser.add_argument("-r", "--repeat", metavar="INT", default=5, type=int, help="timing runs per benchmark; the best one is reported")
+    parser.add_argument("-k", "--filter", metavar="TEXT", default=None, help="only run benchmarks whose name contains this")
+    parser.add_argument("-s", "--seed", metavar="INT", default=0, type=int, help="seed for the synthetic words and search")
+    parser.add_argument("--json", metavar="PATH", default=None, help="also write the results to this path as JSON")
+    args = parser.parse_args()
+
+    results = run_benchmarks(number=args.number, repeat=args.repeat, filter=args.filter, seed=args.seed)
+    if args.json is not None:
+        with open(args.json, "w", encoding="utf-8") as outfile:
+            json.dump(results, outfile, indent=2)
+
+if __name__ == "__main__":
+    main()
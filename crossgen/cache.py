@@ -0,0 +1,156 @@
+"""On-disk cache of generated crosswords, so that regenerating the same word list is nearly instant.
+
+Entries are keyed by a hash of the options that change which layouts are valid, followed by a hash of the
+normalized word list (sorted, since the order of the words doesn't change which layouts are possible),
+so that entries with the same options but other word lists can be found by name (see find_similar). Each entry is
+a file in the compact binary format (see crossgen.compact) in the cache directory, and a file's
+modification time doubles as its last use time: hits touch the file, and once the cache is over its size
+or entry limit, the least recently used files are deleted. Keeping no separate index means several
+processes (e.g. the workers of crossgen.server) can share one cache directory.
+"""
+
+import hashlib
+import json
+import os
+import struct
+import tempfile
+
+from crossgen import compact
+
+CACHE_VERSION = 1
+"""Bump this when a change to the search or scoring invalidates old entries"""
+
+SUFFIX = ".xgen"
+
+def default_cache_dir():
+    """Return the per-user cache directory, e.g. ~/.cache/crossgen"""
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "crossgen")
+
+def normalize_words(words, capitalize=True, remove_spaces=True):
+    """Return words preprocessed the same way as create_crosswords does"""
+    if capitalize:
+        words = [word.upper() for word in words]
+    if remove_spaces:
+        words = [word.replace(" ", "") for word in words]
+    return list(words)
+
+def _hash_json(obj, digest_size):
+    data = json.dumps(obj, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    return hashlib.blake2b(data, digest_size=digest_size).hexdigest()
+
+def get_options_key(options):
+    """Return the hex prefix shared by the cache keys of every word list with these options"""
+    return _hash_json({"version" : CACHE_VERSION, "options" : options}, 8)
+
+def get_cache_key(words, options):
+    """Return the cache key for a normalized word list and a dict of JSON-serializable options"""
+    return get_options_key(options) + "-" + _hash_json(sorted(words), 16)
+
+def get_similarity(words1, words2):
+    """Return the Jaccard similarity of two word lists, from 0 (nothing in common) to 1 (the same words)"""
+    (set1, set2) = (set(words1), set(words2))
+    union = set1 | set2
+    return len(set1 & set2) / len(union) if len(union) > 0 else 1.0
+
+class ResultCache:
+    """Directory of cached results, evicting the least recently used ones
+
+    Attributes:
+        directory = where the entries are kept (created if needed)
+        max_bytes = most bytes the entries can take up in total
+        max_entries = most entries to keep
+    """
+    def __init__(self, directory=None, max_bytes=64 << 20, max_entries=1000):
+        self.directory = directory if directory is not None else default_cache_dir()
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        os.makedirs(self.directory, exist_ok=True)
+
+    def get_path(self, key):
+        return os.path.join(self.directory, key + SUFFIX)
+
+    def get(self, key):
+        """Return the cached list of (score, crossword_grid) tuples for key, or None if there aren't any"""
+        path = self.get_path(key)
+        try:
+            with open(path, "rb") as infile:
+                (words, crosswords) = compact.read_binary(infile)
+        except (OSError, ValueError, struct.error): # missing, evicted by another process, or corrupt
+            return None
+        try:
+            os.utime(path) # mark as recently used
+        except OSError:
+            pass
+        return crosswords
+
+    def put(self, key, words, crosswords):
+        """Store crosswords (a sequence of (score, crossword_grid) tuples over words) under key, replacing
+        whatever was there, and then evict old entries if the cache is too big"""
+        (fd, temp_path) = tempfile.mkstemp(suffix=".tmp", dir=self.directory)
+        try:
+            with os.fdopen(fd, "wb") as outfile:
+                compact.write_binary(outfile, words, crosswords)
+            os.replace(temp_path, self.get_path(key)) # so that readers never see a half-written entry
+        except BaseException:
+            os.remove(temp_path)
+            raise
+        self.evict()
+
+    def find_similar(self, words, options, min_similarity=0.5):
+        """Return the key of the entry with the same options whose word list is the most similar to words
+        (see get_similarity), but not the same, or None if none are at least min_similarity
+
+        Only the headers of the entries are read, so this is cheap even for a full cache."""
+        prefix = get_options_key(options) + "-"
+        exact_key = get_cache_key(words, options)
+        best_key = None
+        best_similarity = min_similarity
+        for mtime, size, path in reversed(self.get_entries()): # most recently used first, to break ties
+            key = os.path.basename(path)[:-len(SUFFIX)]
+            if not key.startswith(prefix) or key == exact_key:
+                continue
+            try:
+                with open(path, "rb") as infile:
+                    cached_words = compact.read_header(infile)
+            except (OSError, ValueError, struct.error):
+                continue
+            similarity = get_similarity(words, cached_words)
+            if similarity > best_similarity or best_key is None and similarity == best_similarity:
+                best_key = key
+                best_similarity = similarity
+        return best_key
+
+    def get_entries(self):
+        """Return a list of (last used time, size, path) for every entry, least recently used first"""
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(SUFFIX):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+        return entries
+
+    def evict(self):
+        """Delete the least recently used entries until the cache fits in max_bytes and max_entries"""
+        entries = self.get_entries()
+        total_bytes = sum(size for mtime, size, path in entries)
+        while len(entries) > 0 and (total_bytes > self.max_bytes or len(entries) > self.max_entries):
+            (mtime, size, path) = entries.pop(0)
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total_bytes -= size
+
+    def clear(self):
+        for mtime, size, path in self.get_entries():
+            os.remove(path)
+
+    def __len__(self):
+        return len(self.get_entries())
@@ -0,0 +1,95 @@
+"""Checkpoints of create_crosswords runs, so that long runs can be resumed after being interrupted or preempted.
+
+A checkpoint holds everything the generation loop needs to carry on: the word list and options, the search
+frontier (stack) and transposition table of the searchers, the random number generator states, the stopping
+and restart policies, the seen set and the crosswords found so far. It's saved as a gzipped pickle, written to a
+temporary file and then renamed over the old one, so an interruption while saving leaves the previous
+checkpoint intact. Only resume checkpoints you wrote yourself, as with any pickle.
+
+Saving takes time proportional to the size of the search state, so Checkpointer spaces saves out to keep
+the time spent saving below max_fraction of the total, however big the state gets.
+"""
+
+import gc
+import gzip
+import os
+import pickle
+import tempfile
+import time
+
+MAGIC = "crossgen-checkpoint"
+VERSION = 1
+
+NODE_LIMIT = 20000
+"""Default for Checkpointer.node_limit"""
+
+class Checkpointer:
+    """Saves checkpoints to path every interval seconds, or less often if saving is slow
+
+    Attributes:
+        path = where the checkpoint is kept
+        interval = seconds between saves, at least
+        max_fraction = most of the run time to spend saving
+        node_limit = most nodes to search between chances to save, for searches that would otherwise run until done
+        saves = number of checkpoints saved
+        save_time = total seconds spent saving
+        size = size in bytes of the last checkpoint saved
+    """
+    def __init__(self, path, interval=60.0, max_fraction=0.05, node_limit=NODE_LIMIT):
+        self.path = path
+        self.interval = interval
+        self.max_fraction = max_fraction
+        self.node_limit = node_limit
+        self.saves = 0
+        self.save_time = 0.0
+        self.size = 0
+        self.next_time = time.monotonic() + interval
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def is_due(self):
+        return time.monotonic() >= self.next_time
+
+    def save(self, words, options, state):
+        """Save a checkpoint; state should be a dict of picklable objects, pickled together so that objects
+        shared between them stay shared"""
+        start_time = time.monotonic()
+        directory = os.path.dirname(os.path.abspath(self.path))
+        (fd, temp_path) = tempfile.mkstemp(suffix=".tmp", dir=directory)
+        gc_enabled = gc.isenabled()
+        gc.disable() # pickling allocates a lot, and collections would keep walking the whole (large) search state
+        try:
+            with os.fdopen(fd, "wb") as raw_file:
+                with gzip.GzipFile(fileobj=raw_file, mode="wb", compresslevel=1) as outfile:
+                    pickle.dump({"magic" : MAGIC, "version" : VERSION, "words" : list(words), "options" : options,
+                            "state" : state}, outfile, protocol=pickle.HIGHEST_PROTOCOL)
+                self.size = raw_file.tell()
+            os.replace(temp_path, self.path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+        finally:
+            if gc_enabled:
+                gc.enable()
+        end_time = time.monotonic()
+        cost = end_time - start_time
+        self.saves += 1
+        self.save_time += cost
+        self.next_time = end_time + max(self.interval, cost / self.max_fraction)
+
+    def report(self):
+        return {"saves" : self.saves, "save_time" : self.save_time, "size" : self.size}
+
+def load_checkpoint(path):
+    """Return (words, options, state) from the checkpoint at path"""
+    with gzip.open(path, "rb") as infile:
+        try:
+            checkpoint = pickle.load(infile)
+        except (pickle.UnpicklingError, EOFError, AttributeError, ImportError, IndexError) as e:
+            raise ValueError(f"{path} is not a crossgen checkpoint: {e}") from e
+    if not isinstance(checkpoint, dict) or checkpoint.get("magic") != MAGIC:
+        raise ValueError(f"{path} is not a crossgen checkpoint")
+    if checkpoint["version"] != VERSION:
+        raise ValueError(f"unsupported crossgen checkpoint version {checkpoint['version']}")
+    return (checkpoint["words"], checkpoint["options"], checkpoint["state"])
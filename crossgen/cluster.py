@@ -0,0 +1,296 @@
+"""Divide and conquer for long word lists, which are far too big for one search over the whole list.
+
+1. partition_words splits the words into clusters of words that have a lot in common. Each pair of words gets an
+   edge for every letter node they share in the link graph (see link.generate_link_graph), weighted by how rare the
+   letter is, since words that share rare letters are the ones that are hard to fit in anywhere else. The
+   clusters are Louvain communities of that graph, split again until none is bigger than max_size.
+2. solve_clusters lays out each cluster on its own with command.create_crosswords, in parallel worker processes,
+   keeping a few of the best layouts of each.
+3. ClusterMerger joins the pieces into one crossword: starting from the biggest piece, it repeatedly adds the
+   piece (or its transpose) that can be attached with the best bridge, i.e. translated so that one of its words
+   crosses one of the words already placed, without breaking any of the rules of grid.Grid.can_add_word. A
+   cluster that can't be attached in any of its layouts is broken up into single words instead.
+
+Run with `crossgenc create --cluster-size N`.
+"""
+
+import concurrent.futures
+import logging
+import math
+import os
+import random
+import sys
+import time
+
+import networkx as nx
+
+from crossgen import grid
+from crossgen import link
+from crossgen import pretty
+from crossgen import walker
+
+CLUSTER_SIZE = 12
+"""Default most words per cluster; a search over that many words finds plenty of layouts in a second or two"""
+
+LAYOUTS_PER_CLUSTER = 3
+"""Default number of layouts of each cluster to try when merging"""
+
+TOP_CHOICES = 3
+"""The merger picks randomly between this many of the best bridges, so that each merge comes out different"""
+
+def get_word_graph(words):
+    """Return the graph of words with an edge between words that share letters, weighted by the total rarity of the
+    letters they share (the log of the number of words over the number of words with the letter)"""
+    link_graph = link.generate_link_graph(words)
+    word_graph = nx.Graph()
+    word_graph.add_nodes_from(words)
+    for node, data in link_graph.nodes(data=True):
+        if data["bipartite"] != link.LETTER:
+            continue
+        letter_words = sorted(set(link_graph.neighbors(node)))
+        rarity = math.log((len(words) + 1) / len(letter_words))
+        for i, word1 in enumerate(letter_words):
+            for word2 in letter_words[i+1:]:
+                if word_graph.has_edge(word1, word2):
+                    word_graph[word1][word2]["weight"] += rarity
+                else:
+                    word_graph.add_edge(word1, word2, weight=rarity)
+    return word_graph
+
+def partition_words(words, max_size=CLUSTER_SIZE, seed=None):
+    """Return a list of clusters (lists of words) that between them have every word exactly once, biggest first"""
+    word_graph = get_word_graph(words)
+    clusters = []
+    todo = [set(component) for component in nx.connected_components(word_graph)]
+    while len(todo) > 0:
+        cluster = todo.pop()
+        if len(cluster) <= max_size:
+            clusters.append(sorted(cluster, key=words.index))
+            continue
+        subgraph = word_graph.subgraph(cluster)
+        parts = nx.community.louvain_communities(subgraph, weight="weight", seed=seed)
+        if len(parts) == 1: # one tight knot, so just cut it in two
+            parts = nx.community.kernighan_lin_bisection(subgraph, weight="weight", seed=seed)
+        for part in parts:
+            todo.extend(set(component) for component in nx.connected_components(word_graph.subgraph(part)))
+    clusters.sort(key=len, reverse=True)
+    return clusters
+
+def get_single_word_grid(word):
+    single_grid = grid.Grid()
+    single_grid.add_word(word, 0, 0, grid.EAST)
+    return single_grid
+
+def _solve_cluster(words, layouts, timeout, seed, max_width, max_height):
+    """Return up to layouts of the best layouts of words, best first (runs in a worker process)"""
+    from crossgen import command
+    if len(words) == 1:
+        return [get_single_word_grid(words[0])]
+    crosswords = command.create_crosswords(list(words), max=layouts * 4, timeout=timeout, seed=seed, verbose=False,
+            max_width=max_width, max_height=max_height)
+    return [crossword for score, crossword in crosswords[:layouts]]
+
+def solve_clusters(clusters, layouts=LAYOUTS_PER_CLUSTER, timeout=5.0, seed=None, workers=None, max_width=None,
+        max_height=None):
+    """Return, for each cluster, a list of up to layouts layouts of it (grid.Grids), best first
+
+    Clusters are solved in parallel in workers processes (default: one per CPU), each for up to timeout seconds.
+    A cluster with no layouts gets an empty list."""
+    workers = workers or os.cpu_count() or 1
+    seeds = [walker.derive_seed(seed, i) if seed is not None else None for i in range(len(clusters))]
+    args = [(cluster, layouts, timeout, cluster_seed, max_width, max_height) for cluster, cluster_seed in zip(clusters, seeds)]
+    if workers == 1 or len(clusters) == 1:
+        return [_solve_cluster(*cluster_args) for cluster_args in args]
+    with concurrent.futures.ProcessPoolExecutor(max_workers=min(workers, len(clusters))) as pool:
+        return list(pool.map(_solve_cluster, *zip(*args)))
+
+class ClusterMerger:
+    """Joins layouts of separate clusters into one crossword
+
+    Attributes:
+        pieces = for each cluster, a list of its layouts (grid.Grids) to choose from
+        rng = random.Random that picks between the best bridges
+        max_width, max_height = if not None, the most cells wide/tall the crossword can be
+    """
+    def __init__(self, pieces, rng=None, max_width=None, max_height=None):
+        self.pieces = pieces
+        self.rng = rng if rng is not None else random.Random()
+        self.max_width = max_width
+        self.max_height = max_height
+        self.options = [self.get_options(layouts) for layouts in pieces]
+
+    def get_options(self, layouts):
+        """Return a (layout, cells) pair for every layout in layouts and its transpose, i.e. every way a piece can be
+        placed, where cells are the (x, y, letter) of every cell of the layout"""
+        options = []
+        for layout in layouts:
+            for option in (layout, layout.transposed()):
+                options.append((option, [(x, y, letter) for (x, y), letter in option.index.items()]))
+        return options
+
+    def get_open_cells(self, base):
+        """Return a map from letter to the (x, y, orientation) of each cell of base with that letter that only one
+        word goes through, i.e. where a bridge could cross"""
+        open_cells = {}
+        for word, data in base.words.items():
+            (x, y) = data["coords"]
+            (dx, dy) = data["orientation"]
+            for i, letter in enumerate(word):
+                if base.counts[(x + dx * i, y + dy * i)] == 1:
+                    open_cells.setdefault(letter, []).append((x + dx * i, y + dy * i, data["orientation"]))
+        return open_cells
+
+    def get_bridges(self, base, open_cells, piece, cells):
+        """Return a list of (crossings, growth, dx, dy) for every offset that would put piece on base so that one of
+        its words crosses a perpendicular word of base at one of open_cells (see get_open_cells), and no letters clash;
+        piece isn't checked against the rest of the can_add_word rules yet"""
+        offsets = set()
+        for word, data in piece.words.items():
+            (x, y) = data["coords"]
+            (dx, dy) = data["orientation"]
+            for i, letter in enumerate(word):
+                for base_x, base_y, orientation in open_cells.get(letter, ()):
+                    if orientation != data["orientation"]:
+                        offsets.add((base_x - x - dx * i, base_y - y - dy * i))
+        bridges = []
+        index = base.index
+        (width, height) = base.get_size()
+        for offset_x, offset_y in offsets:
+            crossings = 0
+            for x, y, letter in cells:
+                existing = index.get((x + offset_x, y + offset_y))
+                if existing is not None:
+                    if existing != letter:
+                        break
+                    crossings += 1
+            else:
+                (new_width, new_height) = base.get_size_with(piece.xmin + offset_x, piece.ymin + offset_y,
+                        piece.xmax + offset_x, piece.ymax + offset_y)
+                if (self.max_width is None or new_width <= self.max_width) and (self.max_height is None or new_height <= self.max_height):
+                    bridges.append((crossings, new_width * new_height - width * height, offset_x, offset_y))
+        return bridges
+
+    def attach(self, base, piece, offset_x, offset_y):
+        """Return a copy of base with piece added at the offset, or None if any of piece's words can't go there"""
+        merged = base.copy()
+        for word, data in piece.words.items():
+            if word in merged.words:
+                return None
+            (x, y) = data["coords"]
+            if not merged.can_add_word(word, x + offset_x, y + offset_y, data["orientation"]):
+                return None
+            merged.add_word(word, x + offset_x, y + offset_y, data["orientation"])
+        return merged
+
+    def attach_best(self, base, open_cells, options):
+        """Return base with one of the piece layouts in options attached by one of its best bridges,
+        or None if none of them can be attached anywhere; open_cells are base's (see get_open_cells)"""
+        candidates = []
+        for piece, cells in options:
+            for crossings, growth, offset_x, offset_y in self.get_bridges(base, open_cells, piece, cells):
+                candidates.append((-crossings, growth, self.rng.random(), piece, offset_x, offset_y))
+        candidates.sort(key=lambda candidate: candidate[:3])
+        merged_options = []
+        for crossings, growth, noise, piece, offset_x, offset_y in candidates:
+            merged = self.attach(base, piece, offset_x, offset_y)
+            if merged is not None:
+                merged_options.append(merged)
+                if len(merged_options) == TOP_CHOICES:
+                    break
+        if len(merged_options) == 0:
+            return None
+        return self.rng.choice(merged_options)
+
+    def merge(self, deadline=None):
+        """Return one crossword with every piece, or None if some word couldn't be attached (or deadline passed)"""
+        pending = [options for options in self.options if len(options) > 0]
+        pending.sort(key=lambda options: len(options[0][0].words), reverse=True)
+        first_options = pending.pop(0)
+        merged = self.rng.choice(first_options[:2])[0].copy() # the best layout or its transpose
+        merged.max_width = self.max_width
+        merged.max_height = self.max_height
+        while len(pending) > 0:
+            if deadline is not None and time.monotonic() > deadline:
+                return None
+            open_cells = self.get_open_cells(merged)
+            for i, options in enumerate(pending): # biggest pieces first, since they get harder to fit in later
+                new_merged = self.attach_best(merged, open_cells, options)
+                if new_merged is not None:
+                    merged = new_merged
+                    pending.pop(i)
+                    break
+            else: # nothing fits as a whole, so break the biggest piece up into single words
+                options = pending.pop(0)
+                if len(options[0][0].words) == 1:
+                    return None
+                pending.extend(self.get_options([get_single_word_grid(word)]) for word in options[0][0].words)
+        return merged
+
+def create_clustered_crosswords(words, max=10, cluster_size=CLUSTER_SIZE, layouts=LAYOUTS_PER_CLUSTER, workers=None,
+        cluster_timeout=5.0, timeout=None, seed=None, max_width=None, max_height=None, stats=None, result_callback=None,
+        err=sys.stderr):
+    """Return a list of up to max (score, crossword_grid) tuples using every one of words, best first, laid out
+    by clusters (see above); words should already be preprocessed
+
+    cluster_timeout = seconds to spend on each cluster
+    timeout = seconds to spend merging (on top of solving the clusters)
+    stats = dict to put the cluster sizes, the time spent on each phase and the number of failed merges in
+    result_callback = function called with (score, crossword) for each new crossword as soon as it is found
+    """
+    rng = walker.make_rng(seed)
+    if not walker.can_generate_crosswords(words, max_width, max_height):
+        return []
+    start_time = time.perf_counter()
+    clusters = partition_words(words, max_size=cluster_size, seed=rng.getrandbits(32))
+    print(f"Split {len(words)} words into {len(clusters)} clusters of {', '.join(str(len(cluster)) for cluster in clusters)} words", file=err)
+    pieces = solve_clusters(clusters, layouts=layouts, timeout=cluster_timeout, seed=rng.getrandbits(64), workers=workers,
+            max_width=max_width, max_height=max_height)
+    unsolved = 0
+    for cluster, layouts_found in zip(clusters, pieces):
+        if len(layouts_found) == 0: # merged word by word instead
+            unsolved += 1
+            logging.info(f"found no layout for the cluster {cluster}")
+            pieces.extend([get_single_word_grid(word)] for word in cluster)
+    pieces = [layouts_found for layouts_found in pieces if len(layouts_found) > 0]
+    solve_time = time.perf_counter() - start_time
+    print(f"Solved the clusters in {solve_time:.2f}s", file=err)
+
+    merger = ClusterMerger(pieces, rng=rng, max_width=max_width, max_height=max_height)
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    crosswords = []
+    seen = set()
+    failed_merges = 0
+    for attempt in range(10 * max):
+        if len(crosswords) == max or deadline is not None and time.monotonic() > deadline:
+            break
+        crossword = merger.merge(deadline=deadline)
+        if crossword is None:
+            failed_merges += 1
+            continue
+        key = crossword.get_canonical_key(True)
+        if key not in seen:
+            seen.add(key)
+            score = pretty.be_judgmental(crossword)
+            crosswords.append((score, crossword))
+            if result_callback is not None:
+                result_callback(score, crossword)
+            print(".", end="", file=err, flush=True)
+    total_time = time.perf_counter() - start_time
+    print(f"\nGenerated {len(crosswords)} crosswords in {total_time:.2f}s", file=err)
+    if stats is not None:
+        stats["clusters"] = {"count" : len(clusters), "sizes" : sorted((len(cluster) for cluster in clusters), reverse=True),
+                "unsolved" : unsolved}
+        stats["solve_time"] = solve_time
+        stats["merge_time"] = total_time - solve_time
+        stats["failed_merges"] = failed_merges
+    return sorted(crosswords, key=lambda x: x[0], reverse=True)
+
+def main():
+    from crossgen import scaling
+    words = [word.upper() for word in scaling.load_corpus("science")][:60]
+    for score, crossword in create_clustered_crosswords(words, max=1, seed=0, cluster_timeout=2.0):
+        print(f"score: {score:.2f}")
+        print(crossword)
+
+if __name__ == "__main__":
+    main()
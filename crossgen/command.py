@@ -1,92 +1,731 @@
 import logging
 import argparse
+import copy
+import inspect
+import os
+import signal
 import sys
+import threading
+import time
 
 from crossgen import walker
+from crossgen import grid
 from crossgen import pretty
+from crossgen import compact
+from crossgen import trace
+from crossgen import warmstart
+from crossgen.estimate import estimate_search, suggest_settings
+from crossgen.stopping import AnyStopping, DroughtStopping, CoverageStopping
+from crossgen.restarts import BatchRestarts, make_restarts, restart_policies
+from crossgen.store import ResultStore
+from crossgen.seen import ExactSeenSet, canonical_hash, seen_set_types
+from crossgen.checkpoint import Checkpointer, load_checkpoint
 
 # Helper functions
 
-def create_crosswords(words, max=100, batch=5, debug=False, progress_callback=None,
-            capitalize=True, remove_spaces=True, no_progress_timeout=5):
-    """progress_callback should be of the form `lambda num_crosswords : int`
+class PrecheckError(Exception):
+    """Raised inside create_crosswords when the words can't make a crossword at all"""
+
+class OptionsError(ValueError):
+    """Raised by create_crosswords for options that don't go together or don't fit the words,
+    e.g. a checkpoint for another word list"""
+
+class CreateOptions:
+    """Options for create_crosswords, shared by all of its generation modes
+
+    progress_callback should be of the form `lambda num_crosswords : int`; if it also accepts an
+        `eta` keyword argument, it gets the estimated seconds remaining (or None if unknown)
     capitalize = uppercase everything
     remove_spaces = remove spaces from within words
     no_progress_timeout = abort generation of crosswords if this many batches
         elapse without generating a single additional crossword; put -1 for no timeout
+    store = path of a store.ResultStore file to append results to instead of keeping them
+        in memory; if the file already exists, generation resumes from the results in it
+    dedupe_transposes = treat a layout and its transpose (every EAST swapped for SOUTH) as the same
+        crossword, and keep whichever of the two scores better
+    seen = set of canonical hashes of the crosswords seen so far, used for deduplication
+        (see crossgen.seen); defaults to a new seen.ExactSeenSet
+    stats = if given a dict, it is filled in with search statistics (see walker.SearchStats.as_dict)
+    tracer = trace.SearchTracer to record structured search events to
+    timeout = stop generating after this many seconds
+    seed = int seed or random.Random, so that identical inputs give identical results; each batch
+        gets its own sub-seed drawn from it
+    auto_tune = estimate the search tree size first (see crossgen.estimate), and use that to pick
+        batch and no_progress_timeout instead of the given values, the restart policy if restarts is None,
+        and exhaustive enumeration instead of sampling if the tree is small enough
+    stopping = rule for stopping early (see crossgen.stopping); defaults to
+        stopping.DroughtStopping(no_progress_timeout), which is also kept alongside any other rule given, since
+        it's what stops a search that can't find anything at all
+    restarts = restart policy (see crossgen.restarts); defaults to restarts.BatchRestarts, i.e. restarting
+        from scratch after every `batch` results
+    exhaustive = enumerate every distinct layout (see walker.ExhaustiveSearch) instead of sampling them;
+        max then only limits how many of the best ones are returned, not how many are generated, and
+        batch, restarts and auto_tune are ignored. Only practical for small word lists.
+    result_callback = called as result_callback(score, crossword) for every new crossword as soon as it
+        is found, e.g. to stream results out
+    max_width, max_height = only generate crosswords that fit in a grid this size; placements that don't fit
+        are rejected during the search, so oversized layouts are never explored
+    cancel = threading.Event (or anything with is_set()); generation stops soon after it is set, e.g. from
+        another thread, and returns the results so far
+    verbose = print progress to stderr
+    cache = cache.ResultCache to look the word list up in first, and to save the results to afterwards; if it has
+        at least max crosswords for the same words and options, they are returned without searching at all
+        (ignored if store is given)
+    top_up = with cache, generate max new crosswords on top of the cached ones, instead of just making up
+        the numbers
+    warm_start = with cache, if there is nothing cached for these words, start the search from the best cached
+        layouts of the most similar cached word list, minus the words that aren't in this one (see crossgen.warmstart);
+        ignored if exhaustive
+    initial_grid = grid.Grid of some of the (preprocessed) words to keep where they are; only the rest of the words
+        are searched, by adding them to it in every possible way until that runs out (see walker.ExhaustiveSearch).
+        The results aren't swapped for their transposes, so the kept words stay the way they were. batch, restarts,
+        auto_tune, cache and exhaustive can't be used with it.
+    checkpoint = path to save the state of the search to (see crossgen.checkpoint) every checkpoint_interval seconds
+        or so, and when generation stops; if the file already exists, generation resumes from it instead of starting
+        over. The words must be the same, and the search options (exhaustive, dedupe_transposes, max_width, max_height,
+        batch, stopping and restarts) are taken from the checkpoint. Searches carry on exactly where they were,
+        except that with the default restarts, an interrupted batch is started over with a new sub-seed. Stop with
+        cancel rather than KeyboardInterrupt to save a final checkpoint; after a KeyboardInterrupt the search may be
+        halfway through a step, so the last periodic checkpoint is kept instead.
+    cluster_size = for long word lists: split the words into clusters of at most this many words, lay out each
+        cluster separately in cluster_timeout seconds, using workers worker processes, and then join the pieces
+        (see crossgen.cluster); timeout then only limits the joining, and the other search options apart from max,
+        seed, max_width, max_height, stats and result_callback are ignored
+
+    create_crosswords works on a copy of its options, and fills in that copy as it goes along, e.g. with the
+    settings picked by auto_tune or taken from a checkpoint.
+    """
+    def __init__(self, max=100, batch=5, debug=False, progress_callback=None, capitalize=True, remove_spaces=True,
+            no_progress_timeout=5, store=None, dedupe_transposes=True, seen=None, stats=None, tracer=None, timeout=None,
+            seed=None, auto_tune=False, stopping=None, restarts=None, exhaustive=False, result_callback=None,
+            max_width=None, max_height=None, cancel=None, verbose=True, cache=None, top_up=False, warm_start=False,
+            initial_grid=None, checkpoint=None, checkpoint_interval=60.0, cluster_size=None, cluster_timeout=5.0,
+            workers=None):
+        self.max = max
+        self.batch = batch
+        self.debug = debug
+        self.progress_callback = progress_callback
+        self.capitalize = capitalize
+        self.remove_spaces = remove_spaces
+        self.no_progress_timeout = no_progress_timeout
+        self.store = store
+        self.dedupe_transposes = dedupe_transposes
+        self.seen = seen
+        self.stats = stats
+        self.tracer = tracer
+        self.timeout = timeout
+        self.seed = seed
+        self.auto_tune = auto_tune
+        self.stopping = stopping
+        self.restarts = restarts
+        self.exhaustive = exhaustive
+        self.result_callback = result_callback
+        self.max_width = max_width
+        self.max_height = max_height
+        self.cancel = cancel
+        self.verbose = verbose
+        self.cache = cache
+        self.top_up = top_up
+        self.warm_start = warm_start
+        self.initial_grid = initial_grid
+        self.checkpoint = checkpoint
+        self.checkpoint_interval = checkpoint_interval
+        self.cluster_size = cluster_size
+        self.cluster_timeout = cluster_timeout
+        self.workers = workers
+
+def create_crosswords(words, options=None, **kwargs):
+    """Generate crosswords out of words, with either a CreateOptions or the keyword arguments for one
+    (see CreateOptions for what each option does)
 
     Returns a list of the form (score, crossword_grid).
+    If store is given, only the top `max` results of the store are returned (or all of them if max is None).
 
     Note: if capitalize or remove_spaces is enabled, words will be preprocessed in-place.
 
     If could not generate any crosswords, progress_callback called with -1.
     """
+    if options is None:
+        options = CreateOptions(**kwargs)
+    elif len(kwargs) > 0:
+        raise TypeError("create_crosswords takes either options or keyword arguments, not both")
+    else:
+        options = copy.copy(options)
+
     # debourg
 
-    if debug:
+    if options.debug:
         logging.basicConfig(level=logging.DEBUG)
         logging.getLogger().setLevel(logging.DEBUG)
 
     # batch is at most max
 
-    if batch > max:
-        batch = max
-
-    # progress callback
-
-    if progress_callback is None: # replace it with a no-op lambda so that we don't have to check it every time
-        progress_callback = lambda num_done : None
+    if options.max is not None and options.batch > options.max:
+        options.batch = options.max
 
     # input cleaning
 
     for i in range(len(words)):
-        if capitalize:
+        if options.capitalize:
             words[i] = words[i].upper()
-        if remove_spaces:
+        if options.remove_spaces:
             words[i] = words[i].replace(" ", "")
 
+    if options.initial_grid is not None:
+        if options.exhaustive:
+            raise OptionsError("initial_grid can't be used with exhaustive")
+        unknown_words = [word for word in options.initial_grid.words if word not in words]
+        if len(unknown_words) > 0:
+            raise OptionsError(f"initial grid has words that aren't in the word list: {unknown_words}")
+        options.cache = None
+        options.auto_tune = False
+
+    if options.cluster_size is not None:
+        return _create_clustered_crosswords(words, options)
+
+    resume_state = _read_checkpoint(words, options)
+
     # create
 
-    crosswords = {} # dictionary of (crossword_grid -> score) instances
+    generation = Generation(words, options, resume_state)
+    cached = generation.load_cache()
+    if cached is not None:
+        return cached
     try:
-        print("Press Ctrl+C to stop at any time", file=sys.stderr)
-        drought_count = 0 # number of batches without any new crosswords
-                          # hacky fix to prevent infinite loop in case crossword not possible with words given
-        if not walker.can_generate_crosswords(words):
-            raise ValueError()
-
-        while max is None or len(crosswords) < max:
-            for crossword in walker.generate_crosswords(words, max=batch):
-                if crossword not in crosswords: # hopefully this should prevent duplicates
-                    print(".", end="", file=sys.stderr, flush=True)
-                    crosswords[crossword] = pretty.be_judgmental(crossword)
-                    drought_count = -1 # reset
-                progress_callback(len(crosswords))
-                if len(crosswords) == max:
-                    break
-            drought_count += 1
-            if drought_count > 0:
-                 print("x", end="", file=sys.stderr, flush=True)
-
-            if drought_count == no_progress_timeout: # use == so that -1 timeout means no timeout
-                print(file=sys.stderr)
-                logging.info(f"{drought_count} batches without any new crosswords, so stopping early")
-                progress_callback(len(crosswords))
-                break
+        print("Press Ctrl+C to stop at any time", file=generation.err)
+        if not walker.can_generate_crosswords(words, options.max_width, options.max_height):
+            raise PrecheckError()
+        if resume_state is None:
+            generation.start()
+        else:
+            generation.resume(resume_state)
+        generation.run()
     except KeyboardInterrupt: # graceful interrupt
+        generation.interrupted = True
+    except PrecheckError:
         pass
-    except ValueError: # prechecks failed
+    return generation.finish()
+
+def _create_clustered_crosswords(words, options):
+    """The cluster_size mode of create_crosswords (see crossgen.cluster)"""
+    from crossgen import cluster
+    if options.max is None:
+        raise OptionsError("cluster_size needs a max")
+    return cluster.create_clustered_crosswords(words, max=options.max, cluster_size=options.cluster_size,
+            workers=options.workers, cluster_timeout=options.cluster_timeout, timeout=options.timeout, seed=options.seed,
+            max_width=options.max_width, max_height=options.max_height, stats=options.stats,
+            result_callback=options.result_callback, err=sys.stderr if options.verbose else _NullWriter())
+
+def _read_checkpoint(words, options):
+    """Return the search state saved in options.checkpoint, after taking the search options from it, or None if
+    there's no checkpoint to resume"""
+    if options.checkpoint is None or not os.path.exists(options.checkpoint):
+        return None
+    try:
+        (checkpoint_words, checkpoint_options, resume_state) = load_checkpoint(options.checkpoint)
+    except (OSError, ValueError, EOFError) as e:
+        raise OptionsError(f"could not read checkpoint {options.checkpoint}: {e}") from e
+    if checkpoint_words != words:
+        raise OptionsError(f"checkpoint {options.checkpoint} is for a different word list")
+    options.exhaustive = checkpoint_options["exhaustive"] # the rest of the state depends on these
+    options.dedupe_transposes = checkpoint_options["dedupe_transposes"]
+    options.max_width = checkpoint_options["max_width"]
+    options.max_height = checkpoint_options["max_height"]
+    options.cache = None
+    options.auto_tune = False
+    return resume_state
+
+class Generation:
+    """One create_crosswords run: the results so far, and the main loop that collects them from whichever mode
+    (SampledMode, ExhaustiveMode or LockedMode) is searching
+
+    Attributes:
+        words = the preprocessed words
+        options = the run's CreateOptions, filled in with the settings actually used
+        err = where progress is printed
+        search_stats = walker.SearchStats shared by every search of the run
+        rng = random.Random that the searches' sub-seeds are drawn from
+        deadline = time.monotonic() value to stop at, or None
+        seen = set of canonical hashes of the crosswords found so far (see crossgen.seen)
+        crosswords = list of (score, crossword_grid) tuples found so far, unless they go to store
+        store = store.ResultStore the results go to, or None
+        cached, cache_key = crosswords loaded from options.cache and the key they were under (None without a cache)
+        seeds = partial grids to warm start from (see crossgen.warmstart)
+        checkpointer = checkpoint.Checkpointer, or None
+        limit = number of crosswords to stop at, counting the ones already seen, or None to search until done
+        mode = the mode doing the searching, or None before the run starts
+        eta = estimated seconds left, or None if unknown
+        searching, interrupted = whether the run got as far as searching, and whether a KeyboardInterrupt stopped it
+    """
+    def __init__(self, words, options, resume_state=None):
+        self.words = words
+        self.options = options
+        self.err = sys.stderr if options.verbose else _NullWriter()
+        progress_callback = options.progress_callback
+        if progress_callback is None: # replace it with a no-op lambda so that we don't have to check it every time
+            progress_callback = lambda num_done : None
+        if _accepts_eta(progress_callback):
+            self.report_progress = progress_callback
+        else:
+            self.report_progress = lambda num_done, eta=None : progress_callback(num_done)
+        self.eta = None
+        self.search_stats = walker.SearchStats()
+        self.rng = walker.make_rng(options.seed)
+        self.deadline = None
+        if options.timeout is not None:
+            self.deadline = time.monotonic() + options.timeout
+        self.crosswords = [] # list of (score, crossword_grid) instances, unless they go to the store
+        self.seen = options.seen if options.seen is not None else ExactSeenSet()
+        self.checkpointer = None
+        if options.checkpoint is not None:
+            self.checkpointer = Checkpointer(options.checkpoint, interval=options.checkpoint_interval)
+        if resume_state is not None:
+            self.search_stats = resume_state["search_stats"]
+            self.rng = resume_state["rng"]
+            self.seen = resume_state["seen"]
+            if options.store is None:
+                self.crosswords = resume_state["crosswords"]
+            print(f"Resuming from {options.checkpoint} with {len(self.seen)} crosswords", file=self.err)
+        self.store = None
+        if options.store is not None:
+            try:
+                self.store = ResultStore(options.store, words)
+            except (OSError, ValueError) as e:
+                raise OptionsError(f"could not use store {options.store}: {e}") from e
+            for score, crossword in self.store:
+                self.seen.add(canonical_hash(crossword.get_canonical_key(options.dedupe_transposes)))
+        self.cached = []
+        self.cache_key = None
+        self.seeds = []
+        self.limit = options.max
+        self.mode = None
+        self.searching = False
+        self.interrupted = False
+
+    def load_cache(self):
+        """Look the words up in options.cache; return the cached crosswords, best first, if there are enough of them
+        that there's no need to search, or else add them to the results so far and return None"""
+        options = self.options
+        cache = options.cache
+        if cache is None or self.store is not None:
+            return None
+        cache_options = {"capitalize" : options.capitalize, "remove_spaces" : options.remove_spaces,
+                "dedupe_transposes" : options.dedupe_transposes, "max_width" : options.max_width,
+                "max_height" : options.max_height, "exhaustive" : options.exhaustive}
+        from crossgen.cache import get_cache_key
+        self.cache_key = get_cache_key(self.words, cache_options)
+        self.cached = cache.get(self.cache_key) or []
+        max = options.max
+        if len(self.cached) > 0 and not options.top_up and (options.exhaustive or max is None or len(self.cached) >= max):
+            print(f"Loaded {len(self.cached)} crosswords from the cache", file=self.err)
+            self.report_progress(len(self.cached), eta=0)
+            if options.stats is not None:
+                options.stats["cache"] = {"hit" : True, "cached" : len(self.cached)}
+            crosswords_list = sorted(self.cached, key=lambda x: x[0], reverse=True)
+            return crosswords_list[:max] if max is not None else crosswords_list
+        for score, crossword in self.cached:
+            self.seen.add(canonical_hash(crossword.get_canonical_key(options.dedupe_transposes)))
+        self.crosswords.extend(self.cached)
+        if options.warm_start and len(self.cached) == 0 and not options.exhaustive:
+            similar_key = cache.find_similar(self.words, cache_options)
+            if similar_key is not None:
+                self.seeds = warmstart.get_seed_grids(cache.get(similar_key) or [], self.words, options.max_width,
+                        options.max_height)
+                logging.info(f"warm starting from {len(self.seeds)} cached layouts of a similar word list")
+        return None
+
+    def start(self):
+        """Pick the settings (auto-tuning them if asked to) and the mode of a new run"""
+        options = self.options
+        if options.auto_tune:
+            search_estimate = estimate_search(self.words, rng=walker.spawn_rng(self.rng), max_width=options.max_width,
+                    max_height=options.max_height)
+            settings = suggest_settings(search_estimate, options.max)
+            logging.info(f"estimated {search_estimate['tree_size']:.3g} search nodes and "
+                    f"{search_estimate['solutions']:.3g} solutions, so using {settings}")
+            options.batch = settings["batch"]
+            options.no_progress_timeout = settings["no_progress_timeout"]
+            if options.restarts is None:
+                options.restarts = make_restarts(settings["restarts"], settings["restart_nodes"])
+            options.exhaustive = options.exhaustive or settings["exhaustive"]
+            self.eta = settings["eta"]
+            self.report_progress(len(self.seen), eta=self.eta)
+        if options.stopping is None: # hacky fix to prevent infinite loop in case crossword not possible with words given
+            options.stopping = DroughtStopping(options.no_progress_timeout)
+        elif not isinstance(options.stopping, DroughtStopping):
+            options.stopping = AnyStopping(options.stopping, DroughtStopping(options.no_progress_timeout))
+        if options.restarts is None:
+            options.restarts = BatchRestarts()
+        if options.top_up and options.max is not None:
+            self.limit = len(self.cached) + options.max
+        if options.initial_grid is not None:
+            self.mode = LockedMode(self)
+        elif options.exhaustive:
+            self.limit = None
+            self.mode = ExhaustiveMode(self)
+        else:
+            self.mode = SampledMode(self)
+
+    def resume(self, state):
+        """Carry on from the state saved in a checkpoint (see save_checkpoint)"""
+        options = self.options
+        options.stopping = state["stopping"]
+        options.restarts = state["restarts"]
+        options.batch = state["batch"]
+        self.limit = state["limit"]
+        if options.exhaustive:
+            self.mode = ExhaustiveMode(self, state)
+        elif state["locked"]:
+            self.mode = LockedMode(self, state)
+        else:
+            self.mode = SampledMode(self, state)
+        if options.tracer is not None:
+            options.tracer.start(self.words)
+            for searcher in self.mode.get_searchers():
+                searcher.tracer = options.tracer
+
+    def run(self):
+        """Collect crosswords from the mode until there are enough, the mode runs out, the stopping rule says so,
+        the deadline passes or options.cancel is set"""
+        options = self.options
+        stopping = options.stopping
+        generation_start = time.perf_counter()
+        self.searching = True
+
+        while self.limit is None or len(self.seen) < self.limit:
+            if self.deadline is not None and time.monotonic() > self.deadline:
+                logging.info(f"stopping after the {options.timeout} second timeout")
+                break
+            if options.cancel is not None and options.cancel.is_set():
+                break
+            run = self.mode.next_run()
+            if run is None:
+                break
+            found_new = False
+            for crossword in run:
+                is_new = self.add(crossword)
+                stopping.observe(is_new)
+                if is_new:
+                    found_new = True
+                    if self.limit is not None: # extrapolate from the results so far
+                        self.eta = (self.limit - len(self.seen)) * (time.perf_counter() - generation_start) / len(self.seen)
+                self.report_progress(len(self.seen), eta=self.eta)
+                if len(self.seen) == self.limit or stopping.should_stop():
+                    break
+            if self.mode.batches:
+                stopping.end_batch(found_new)
+            if not found_new:
+                 print("x", end="", file=self.err, flush=True)
+            if self.checkpointer is not None and self.checkpointer.is_due():
+                self.save_checkpoint()
+
+            if stopping.should_stop():
+                print(file=self.err)
+                logging.info(f"stopping early: {stopping.report()}")
+                self.report_progress(len(self.seen), eta=0)
+                break
+
+    def add(self, crossword):
+        """Score crossword and keep it, unless it has been seen before; return whether it was new"""
+        options = self.options
+        if not self.seen.add(canonical_hash(crossword.get_canonical_key(options.dedupe_transposes))):
+            return False
+        print(".", end="", file=self.err, flush=True)
+        start_time = time.perf_counter()
+        score = pretty.be_judgmental(crossword)
+        if options.dedupe_transposes and self.mode.swap_transposes:
+            transposed = crossword.transposed()
+            transposed_score = pretty.be_judgmental(transposed)
+            if transposed_score > score and transposed.fits(options.max_width, options.max_height):
+                (score, crossword) = (transposed_score, transposed)
+        self.search_stats.phase_times["scoring"] += time.perf_counter() - start_time
+        if self.store is None:
+            self.crosswords.append((score, crossword))
+        else:
+            self.store.append(score, crossword)
+        if options.result_callback is not None:
+            options.result_callback(score, crossword)
+        return True
+
+    def save_checkpoint(self):
+        options = self.options
+        state = {
+            "search_stats" : self.search_stats,
+            "rng" : self.rng,
+            "seen" : self.seen,
+            "crosswords" : self.crosswords if self.store is None else None,
+            "stopping" : options.stopping,
+            "restarts" : options.restarts,
+            "batch" : options.batch,
+            "limit" : self.limit,
+            "locked" : False,
+        }
+        state.update(self.mode.get_state())
+        self.checkpointer.save(self.words, {"max" : options.max, "batch" : options.batch, "capitalize" : options.capitalize,
+                "remove_spaces" : options.remove_spaces, "dedupe_transposes" : options.dedupe_transposes,
+                "exhaustive" : options.exhaustive, "max_width" : options.max_width, "max_height" : options.max_height}, state)
+
+    def finish(self):
+        """Report on the run, save the last checkpoint, fill in options.stats, update the cache, and return the
+        results, best first"""
+        options = self.options
+        err = self.err
+        print(f"\nGenerated {len(self.seen)} crosswords", file=err)
+
+        if self.checkpointer is not None and self.interrupted:
+            print(f"Interrupted in the middle of the search, so keeping the last checkpoint in {options.checkpoint}", file=err)
+        elif self.checkpointer is not None and self.searching:
+            self.save_checkpoint()
+            print(f"Saved a checkpoint to {options.checkpoint} ({self.checkpointer.size} bytes, "
+                    f"{self.checkpointer.save_time:.3g}s spent saving)", file=err)
+
+        exhaustive_report = None
+        if isinstance(self.mode, ExhaustiveMode):
+            exhaustive_report = get_exhaustive_report(self.mode.searchers)
+            print(format_exhaustive_report(exhaustive_report), file=err)
+
+        stats = options.stats
+        if stats is not None:
+            stats.update(self.search_stats.as_dict())
+            if options.stopping is not None:
+                stats["stopping"] = options.stopping.report()
+            if exhaustive_report is not None:
+                stats["exhaustive"] = exhaustive_report
+            if self.cache_key is not None:
+                stats["cache"] = {"hit" : False, "cached" : len(self.cached), "seeds" : len(self.seeds)}
+            if self.checkpointer is not None:
+                stats["checkpoint"] = self.checkpointer.report()
+
+        if self.cache_key is not None and len(self.crosswords) > len(self.cached):
+            if exhaustive_report is None or exhaustive_report["complete"]: # partial enumerations would look complete
+                options.cache.put(self.cache_key, self.words, self.crosswords)
+
+        # sort results in descending order by score
+
+        if self.store is not None:
+            crosswords_list = self.store.top_k(options.max)
+            self.store.close()
+            return crosswords_list
+
+        crosswords_list = sorted(self.crosswords, key=lambda x: x[0], reverse=True) # (score, crossword)
+        if options.exhaustive and options.max is not None:
+            crosswords_list = crosswords_list[:options.max]
+        return crosswords_list
+
+class SampledMode:
+    """Samples layouts with walker.CrosswordTreeSearch, restarting according to options.restarts: a new search of
+    `batch` results at a time, or one search restarted every so often. Warm start seeds are searched first, until
+    there's nothing left under them.
+
+    Interface (shared by ExhaustiveMode and LockedMode):
+        + batches: whether each run counts as a batch for the stopping rule
+        + swap_transposes: whether results can be swapped for their transposes
+        + next_run(): iterator over the crosswords of the next run, or None once there's nothing left to search
+        + get_state(): dict of the mode's searchers, for the checkpoint
+        + get_searchers(): list of the mode's searchers
+
+    Attributes:
+        searcher = the search kept for the whole run with a persistent restart policy, or None
+        seed_searcher = the search from the warm start seeds, or None once it's done (or if there aren't any)
+    """
+    batches = True
+    swap_transposes = True
+
+    def __init__(self, generation, state=None):
+        self.generation = generation
+        if state is not None:
+            self.searcher = state["searcher"]
+            self.seed_searcher = state["seed_searcher"]
+            return
+        (words, options) = (generation.words, generation.options)
+        self.searcher = None
+        self.seed_searcher = None
+        if options.restarts.persistent:
+            self.searcher = walker.CrosswordTreeSearch(words, stats=generation.search_stats, tracer=options.tracer,
+                    rng=walker.spawn_rng(generation.rng), max_width=options.max_width, max_height=options.max_height)
+        if len(generation.seeds) > 0: # searched until exhausted before anything else, rather than on every restart
+            self.seed_searcher = walker.CrosswordTreeSearch(words, stats=generation.search_stats, tracer=options.tracer,
+                    rng=walker.spawn_rng(generation.rng), max_width=options.max_width, max_height=options.max_height,
+                    seeds=generation.seeds, search_root=False)
+
+    def next_run(self):
+        generation = self.generation
+        options = generation.options
+        if self.seed_searcher is not None and self.seed_searcher.is_complete():
+            self.seed_searcher = None
+        if self.seed_searcher is not None: # carries on from where it stopped
+            return self.seed_searcher.search(deadline=generation.deadline, cancel=options.cancel,
+                    node_limit=warmstart.NODE_LIMIT)
+        if self.searcher is None:
+            return walker.generate_crosswords(generation.words, max=options.batch, stats=generation.search_stats,
+                    tracer=options.tracer, deadline=generation.deadline, rng=walker.spawn_rng(generation.rng),
+                    max_width=options.max_width, max_height=options.max_height, cancel=options.cancel)
+        if self.searcher.is_complete():
+            logging.info("searched the whole search tree, so stopping")
+            return None
+        self.searcher.restart()
+        return self.searcher.search(deadline=generation.deadline, cancel=options.cancel, **options.restarts.next_run())
+
+    def get_state(self):
+        return {"searcher" : self.searcher, "seed_searcher" : self.seed_searcher}
+
+    def get_searchers(self):
+        return [searcher for searcher in (self.searcher, self.seed_searcher) if searcher is not None]
+
+class ExhaustiveMode:
+    """Enumerates every layout with walker.ExhaustiveSearch, carrying on from where the last run stopped each time
+    (see SampledMode for the interface)
+
+    Attributes:
+        searchers = the searches that between them find every layout (see walker.ExhaustiveSearch for why there can be two)
+        searcher = the one being searched
+        pending_searchers = the ones still to search after it
+        node_limit = most nodes per run, so that there's a chance to save a checkpoint now and then, or None
+    """
+    batches = False # going a while without new layouts is no reason to stop
+    swap_transposes = True
+
+    def __init__(self, generation, state=None):
+        self.generation = generation
+        options = generation.options
+        self.node_limit = None
+        if generation.checkpointer is not None:
+            self.node_limit = generation.checkpointer.node_limit
+        if state is not None:
+            self.searchers = state["exhaustive_searchers"]
+            self.searcher = state["searcher"]
+            self.pending_searchers = state["pending_searchers"]
+            return
+        root_orientations = [grid.EAST]
+        if options.max_width != options.max_height: # some layouts only fit with the first word down (see walker.ExhaustiveSearch)
+            root_orientations.append(grid.SOUTH)
+        self.searchers = [walker.ExhaustiveSearch(generation.words, stats=generation.search_stats, tracer=options.tracer,
+                transposes=not options.dedupe_transposes, max_width=options.max_width, max_height=options.max_height,
+                root_orientation=orientation) for orientation in root_orientations]
+        self.searcher = self.searchers[0]
+        self.pending_searchers = self.searchers[1:]
+
+    def next_run(self):
+        if self.searcher.is_complete() and len(self.pending_searchers) > 0:
+            self.searcher = self.pending_searchers.pop(0)
+        if self.searcher.is_complete():
+            logging.info("searched the whole search tree, so stopping")
+            return None
+        return self.searcher.search(deadline=self.generation.deadline, cancel=self.generation.options.cancel,
+                node_limit=self.node_limit)
+
+    def get_state(self):
+        return {"searcher" : self.searcher, "exhaustive_searchers" : self.searchers,
+                "pending_searchers" : self.pending_searchers}
+
+    def get_searchers(self):
+        return list(self.searchers)
+
+class LockedMode:
+    """Adds the rest of the words to options.initial_grid in every possible way (see walker.ExhaustiveSearch) until
+    that runs out; the kept words have to stay the way they are, so results aren't swapped for their transposes
+    (see SampledMode for the interface)
+
+    Attributes:
+        searcher = the walker.ExhaustiveSearch from the initial grid
+    """
+    batches = True
+    swap_transposes = False
+
+    def __init__(self, generation, state=None):
+        self.generation = generation
+        if state is not None:
+            self.searcher = state["seed_searcher"]
+            return
+        options = generation.options
+        self.searcher = walker.ExhaustiveSearch(generation.words, stats=generation.search_stats, tracer=options.tracer,
+                max_width=options.max_width, max_height=options.max_height, initial_grid=options.initial_grid)
+
+    def next_run(self):
+        if self.searcher.is_complete():
+            logging.info("tried every way of adding the rest of the words, so stopping")
+            return None
+        return self.searcher.search(deadline=self.generation.deadline, cancel=self.generation.options.cancel,
+                node_limit=warmstart.NODE_LIMIT)
+
+    def get_state(self):
+        return {"locked" : True, "seed_searcher" : self.searcher}
+
+    def get_searchers(self):
+        return [self.searcher]
+
+def get_exhaustive_report(searchers):
+    """Return a dict summarizing how much of the tree some walker.ExhaustiveSearches (sharing their stats) searched and pruned"""
+    stats = searchers[0].stats
+    generated = stats.states_pushed + stats.transposition_hits # every grid built, before pruning duplicates
+    return {
+        "complete" : all(searcher.is_complete() for searcher in searchers),
+        "layouts" : stats.solutions,
+        "nodes_expanded" : stats.nodes_expanded,
+        "duplicates_pruned" : stats.transposition_hits,
+        "pruned_fraction" : stats.transposition_hits / generated if generated > 0 else 0.0,
+        "dead_ends" : sum(searcher.dead_ends for searcher in searchers),
+    }
+
+def format_exhaustive_report(report):
+    status = "finished" if report["complete"] else "stopped before the end"
+    return (f"Exhaustive search {status}: {report['layouts']} layouts from {report['nodes_expanded']} nodes; "
+            f"{report['duplicates_pruned']} duplicate partial grids pruned ({100 * report['pruned_fraction']:.1f}% of those generated), "
+            f"{report['dead_ends']} dead ends")
+
+def get_kept_grid(path, index, keep, words, preprocess=True):
+    """Return the grid of the words to keep from the index-th (from 1) crossword of a compact JSONL file
+
+    keep = words to keep, or None for all of the crossword's words that are in words"""
+    with open(path, "r", encoding="utf-8") as infile:
+        (file_words, crosswords) = compact.read_jsonl(infile)
+        for i, (score, crossword) in enumerate(crosswords, 1):
+            if i == index:
+                break
+        else:
+            raise ValueError(f"{path} has fewer than {index} crosswords")
+    if keep is None:
+        keep = [word for word in crossword.words if word in words]
+    elif preprocess:
+        keep = [word.upper().replace(" ", "") for word in keep]
+    missing_words = [word for word in keep if word not in crossword.words]
+    if len(missing_words) > 0:
+        raise ValueError(f"crossword {index} doesn't have {missing_words}")
+    return crossword.subgrid(keep)
+
+def read_words(infile):
+    """Read newline-separated words from infile, up to the first empty line"""
+    words = []
+    for word in infile:
+        word = word.strip()
+        if len(word) == 0:
+            break
+        words.append(word)
+    return words
+
+class _NullWriter:
+    """File-like object that throws away everything written to it"""
+    def write(self, text):
         pass
-    
-    print(f"\nGenerated {len(crosswords)} crosswords", file=sys.stderr)
 
-    # sort results in descending order by score
+    def flush(self):
+        pass
 
-    crosswords_list = [(item[1], item[0]) for item in crosswords.items()]
-        # (score, crossword)
-    crosswords_list = sorted(crosswords_list, key=lambda x: x[0], reverse=True)
+def _stop_on_signal(cancel):
+    """Return a SIGINT/SIGTERM handler that stops create_crosswords through cancel, at a point where the search
+    state is consistent enough to checkpoint; a second signal interrupts it straight away"""
+    def handler(signum, frame):
+        if cancel.is_set():
+            raise KeyboardInterrupt()
+        cancel.set()
+    return handler
 
-    return crosswords_list
+def _accepts_eta(callback):
+    try:
+        parameters = inspect.signature(callback).parameters.values()
+    except (TypeError, ValueError): # e.g. some builtins don't have signatures
+        return False
+    return any(p.name == "eta" or p.kind == inspect.Parameter.VAR_KEYWORD for p in parameters)
 
 # Argparse stuff
 
@@ -94,6 +733,12 @@ class main:
     command_names = [
         "test",
         "create",
+        "estimate",
+        "serve",
+        "batch",
+        "index-pool",
+        "fill",
+        "fill-template",
     ]
 
     def run(self, argv):
@@ -148,30 +793,81 @@ class test:
 
 class create:
     def build_parser(self, subparser):
+        from crossgen.cache import default_cache_dir
         subparser.add_argument("-i", "--from-file", metavar="PATH", default="-", help="file from which to read newline-separated words (use '-' to indicate stdin)")
         subparser.add_argument("--no-preprocess", action="store_true", help="turn off default preprocessing, which folds all words to uppercase and removes spaces")
         subparser.add_argument("-o", metavar="PATH", default="crosswords.html", help="output results to this path (will add a sequential number to path if file already exists)")
         subparser.add_argument("--overwrite", action="store_true", help="overwrite existing output file")
+        subparser.add_argument("-j", "--jsonl", metavar="PATH", default=None, help="also write the results to this path in the compact JSONL placement format (see crossgen.compact)")
         # subparser.add_argument("-l", metavar="PATH", default="crosswords.log", help="output log to this path") # TODO
         subparser.add_argument("-x", "--max", metavar="MAX", default=100, type=int, help="output at most this many crosswords")
+        subparser.add_argument("--exhaustive", action="store_true", help="enumerate every distinct layout instead of a random sample; --max then only limits how many of the best are output. Only practical for small word lists (up to 10 or so words)")
+        subparser.add_argument("--stream", metavar="PATH", default=None, help="write every crossword to this path in the compact JSONL placement format as soon as it is found")
+        subparser.add_argument("--max-width", metavar="INT", default=None, type=int, help="only generate crosswords at most this many cells wide")
+        subparser.add_argument("--max-height", metavar="INT", default=None, type=int, help="only generate crosswords at most this many cells tall")
+        subparser.add_argument("--keep-transposes", action="store_true", help="keep a layout and its transpose (every across word swapped for down) as separate results")
+        subparser.add_argument("--seen", metavar="TYPE", default="exact", choices=sorted(seen_set_types), help="how to remember already generated crosswords for deduplication: 'exact' packed hashes, or an approximate 'bloom' filter that uses a few bytes per crossword")
+        subparser.add_argument("--seen-error-rate", metavar="RATE", default=0.001, type=float, help="false positive rate of the bloom seen set, i.e. the chance of discarding a new crossword as a duplicate")
+        subparser.add_argument("--cache", metavar="DIR", nargs="?", default=None, const=default_cache_dir(), help=f"look the word list up in this result cache (default if no DIR given: {default_cache_dir()}) and return the cached crosswords if there are enough; new results are added to it")
+        subparser.add_argument("--cache-size", metavar="MB", default=64, type=float, help="evict the least recently used cache entries once the cache is bigger than this")
+        subparser.add_argument("--top-up", action="store_true", help="with --cache, generate --max new crosswords on top of the cached ones")
+        subparser.add_argument("--warm-start", action="store_true", help="with --cache, start from the cached crosswords of the most similar word list if there aren't any for this one")
+        subparser.add_argument("--keep-from", metavar="PATH", default=None, help="keep words where they are in a crossword from this file (in the compact JSONL format written by --jsonl or --stream) and only regenerate the rest")
+        subparser.add_argument("--keep-index", metavar="INT", default=1, type=int, help="which crossword in the --keep-from file to use, counting from 1")
+        subparser.add_argument("--keep", metavar="WORD", nargs="+", default=None, help="with --keep-from, the words to keep (default: all of the crossword's words that are still in the word list)")
+        subparser.add_argument("--store", metavar="PATH", default=None, help="append results to this on-disk result store instead of keeping them in memory; resumes the store if it already exists")
+        subparser.add_argument("--cluster-size", metavar="INT", default=None, type=int, help="for long word lists (100 words or so and up): split the words into clusters of at most this many words that share rare letters, lay out each cluster separately, and then join the pieces (see crossgen.cluster); --timeout then only limits the joining, and most other search options are ignored")
+        subparser.add_argument("--cluster-timeout", metavar="SECONDS", default=5.0, type=float, help="with --cluster-size, seconds to spend laying out each cluster")
+        subparser.add_argument("-w", "--workers", metavar="INT", default=os.cpu_count() or 1, type=int, help="with --cluster-size, number of worker processes to lay out clusters in")
+        subparser.add_argument("--checkpoint", metavar="PATH", default=None, help="save the state of the search to this file every now and then, and when stopped (including by SIGTERM); if the file already exists, carry on from it")
+        subparser.add_argument("--checkpoint-interval", metavar="SECONDS", default=60.0, type=float, help="seconds between checkpoints, at least")
+        subparser.add_argument("--resume", metavar="PATH", default=None, help="carry on from this checkpoint, with its word list and options, and keep checkpointing to it; no words are read")
+        subparser.add_argument("-t", "--timeout", metavar="SECONDS", default=None, type=float, help="stop generating after this many seconds")
+        subparser.add_argument("--auto-tune", action="store_true", help="estimate the size of the search first, and pick --batch, the early stopping settings, the restart policy (unless --restarts is given) and whether to search --exhaustive from that")
+        subparser.add_argument("--stop-rate", metavar="RATE", default=None, type=float, help="instead of stopping after a number of batches without new crosswords, stop once the estimated number of new crosswords per second drops below this (based on how many recent results were duplicates)")
+        subparser.add_argument("-s", "--seed", metavar="INT", default=None, type=int, help="seed for the random search order, to make runs reproducible")
+        subparser.add_argument("--stats", action="store_true", help="print search statistics (nodes expanded, rejected joins, time per phase etc.) when done")
+        subparser.add_argument("--trace", metavar="PATH", default=None, help="write a structured JSONL trace of the search to this path (see crossgen.trace)")
+        subparser.add_argument("--trace-sample", metavar="RATE", default=1.0, type=float, help="fraction of push/pop/join events to keep in the trace")
         subparser.add_argument("-d", "--debug", action="store_true", help="print debug stuff")
         subparser.add_argument("-b", "--batch", metavar="INT", default=5, type=int, help="because it's DFS, results don't really show that much diversity; so, this just tells the program to restart from scratch after every X crosswords generated")
+        subparser.add_argument("--restarts", metavar="POLICY", default=None, choices=sorted(restart_policies), help="restart policy: 'batch' restarts from scratch after every --batch crosswords; 'luby' and 'random' restart after a number of search nodes, keeping the transposition table; 'lds' does limited discrepancy search (default: 'batch', or picked by --auto-tune)")
+        subparser.add_argument("--restart-nodes", metavar="INT", default=None, type=int, help="search nodes per restart for the 'random' policy, or the unit of the 'luby' sequence")
 
     def run(self, args):
         """Read in words from stdout, terminated with an empty newline, and then generate crosswords.
         
         Output is in plain text format."""
 
+        # resumed runs take the words and options from the checkpoint
+
+        if args.resume is not None:
+            try:
+                (words, options, state) = load_checkpoint(args.resume)
+            except (OSError, ValueError, EOFError) as e:
+                print(f"could not read checkpoint {args.resume}: {e}", file=sys.stderr)
+                return 1
+            args.checkpoint = args.resume
+            args.max = options["max"]
+            args.batch = options["batch"]
+            args.no_preprocess = not options["capitalize"]
+            args.keep_transposes = not options["dedupe_transposes"]
+            args.exhaustive = options["exhaustive"]
+            args.max_width = options["max_width"]
+            args.max_height = options["max_height"]
+            args.keep_from = None
+            args.auto_tune = False
+
         # input stream
         infile = sys.stdin
         inpath = args.from_file
-        if inpath != "-":
+        if inpath != "-" and args.resume is None:
             try:
                 infile = open(inpath, "r")
             except IOError:
                 print(f"could not open file {infile}")
                 return 1
-        else:
+        elif args.resume is None:
             print("Please input a newline separated list of words, terminated with an empty line:")
 
         # pretty output stream
@@ -203,18 +899,74 @@ class create:
 
         # input
 
-        words = []
-
-        for word in infile:
-            word = word.strip()
-            if len(word) == 0:
-                break
-            words.append(word)
+        if args.resume is None:
+            words = read_words(infile)
 
         # generate crosswords
 
-        crosswords = create_crosswords(words=words, max=args.max, batch=args.batch, debug=args.debug,
-                capitalize=not args.no_preprocess, remove_spaces=not args.no_preprocess)
+        if args.seen == "bloom":
+            seen = seen_set_types[args.seen](error_rate=args.seen_error_rate)
+        else:
+            seen = seen_set_types[args.seen]()
+        stats = {} if args.stats else None
+        restarts = None
+        if args.restarts is not None:
+            restarts = make_restarts(args.restarts, args.restart_nodes)
+        stopping = None
+        if args.stop_rate is not None:
+            stopping = CoverageStopping(min_rate=args.stop_rate)
+        tracer = None
+        if args.trace is not None:
+            tracer = trace.SearchTracer(open(args.trace, "w", encoding="utf-8"), sample_rate=args.trace_sample)
+
+        cache = None
+        if args.cache is not None:
+            from crossgen.cache import ResultCache
+            cache = ResultCache(args.cache, max_bytes=int(args.cache_size * (1 << 20)))
+        initial_grid = None
+        if args.keep_from is not None:
+            if not args.no_preprocess:
+                words = [word.upper().replace(" ", "") for word in words]
+            try:
+                initial_grid = get_kept_grid(args.keep_from, args.keep_index, args.keep, words, not args.no_preprocess)
+            except (OSError, ValueError) as e:
+                print(f"could not read the crossword to keep: {e}", file=sys.stderr)
+                return 1
+        stream = None
+        result_callback = None
+        if args.stream is not None:
+            if not args.no_preprocess: # the words have to be known up front for the header
+                words = [word.upper().replace(" ", "") for word in words]
+            stream = compact.JsonlWriter(open(args.stream, "w", encoding="utf-8"), words)
+            result_callback = stream.write
+
+        cancel = None
+        if args.checkpoint is not None:
+            cancel = threading.Event()
+            signal.signal(signal.SIGINT, _stop_on_signal(cancel))
+            signal.signal(signal.SIGTERM, _stop_on_signal(cancel))
+        options = CreateOptions(max=args.max, batch=args.batch, debug=args.debug,
+                capitalize=not args.no_preprocess, remove_spaces=not args.no_preprocess, store=args.store,
+                dedupe_transposes=not args.keep_transposes, seen=seen, stats=stats, tracer=tracer,
+                timeout=args.timeout, seed=args.seed,
+                auto_tune=args.auto_tune, stopping=stopping, restarts=restarts,
+                exhaustive=args.exhaustive, result_callback=result_callback,
+                max_width=args.max_width, max_height=args.max_height, cache=cache, top_up=args.top_up, warm_start=args.warm_start,
+                initial_grid=initial_grid, checkpoint=args.checkpoint, checkpoint_interval=args.checkpoint_interval,
+                cancel=cancel, cluster_size=args.cluster_size, cluster_timeout=args.cluster_timeout, workers=args.workers)
+        try:
+            crosswords = create_crosswords(words, options)
+        except OptionsError as e:
+            print(e, file=sys.stderr)
+            return 1
+
+        if tracer is not None:
+            tracer.out.close()
+        if stream is not None:
+            stream.out.close()
+
+        if args.stats:
+            print(walker.format_stats(stats), file=sys.stderr)
 
         # print results
         
@@ -228,3 +980,219 @@ class create:
 
         pretty_printer = pretty.HtmlGridPrinter(outfile)
         pretty_printer.print_crosswords(crosswords, words)
+
+        if args.jsonl is not None:
+            with open(args.jsonl, "w", encoding="utf-8") as jsonl_file:
+                compact.write_jsonl(jsonl_file, words, crosswords)
+
+class estimate:
+    def build_parser(self, subparser):
+        subparser.add_argument("-i", "--from-file", metavar="PATH", default="-", help="file from which to read newline-separated words (use '-' to indicate stdin)")
+        subparser.add_argument("--no-preprocess", action="store_true", help="turn off default preprocessing, which folds all words to uppercase and removes spaces")
+        subparser.add_argument("-x", "--max", metavar="MAX", default=100, type=int, help="number of crosswords that would be generated, for the suggested settings")
+        subparser.add_argument("--budget", metavar="SECONDS", default=0.5, type=float, help="time to spend probing the search tree")
+        subparser.add_argument("--stop-rate", metavar="RATE", default=None, type=float, help="instead of stopping after a number of batches without new crosswords, stop once the estimated number of new crosswords per second drops below this (based on how many recent results were duplicates)")
+        subparser.add_argument("-s", "--seed", metavar="INT", default=None, type=int, help="seed for the random probes")
+
+    def run(self, args):
+        """Estimate how big the search for a word list is, and suggest settings for create.
+
+        Words are read the same way as for create."""
+        infile = sys.stdin
+        if args.from_file != "-":
+            try:
+                infile = open(args.from_file, "r")
+            except IOError:
+                print(f"could not open file {args.from_file}")
+                return 1
+        words = read_words(infile)
+        if not args.no_preprocess:
+            words = [word.upper().replace(" ", "") for word in words]
+        if not walker.can_generate_crosswords(words):
+            return 1
+
+        search_estimate = estimate_search(words, time_budget=args.budget, rng=args.seed)
+        settings = suggest_settings(search_estimate, args.max)
+        for key, value in list(search_estimate.items()) + list(settings.items()):
+            print(f"{key}: {value:.4g}" if isinstance(value, float) else f"{key}: {value}")
+
+class serve:
+    def build_parser(self, subparser):
+        from crossgen.cache import default_cache_dir
+        subparser.add_argument("--host", metavar="HOST", default="127.0.0.1", help="address to listen on")
+        subparser.add_argument("-p", "--port", metavar="INT", default=8080, type=int, help="port to listen on")
+        subparser.add_argument("-w", "--workers", metavar="INT", default=os.cpu_count() or 1, type=int, help="number of worker processes")
+        subparser.add_argument("-q", "--queue-size", metavar="INT", default=16, type=int, help="number of requests that can wait for a worker; requests past that get a 503")
+        subparser.add_argument("-t", "--timeout", metavar="SECONDS", default=5.0, type=float, help="timeout for requests that don't give one")
+        subparser.add_argument("--max-timeout", metavar="SECONDS", default=30.0, type=float, help="longest timeout a request can ask for")
+        subparser.add_argument("--cache", metavar="DIR", nargs="?", default=None, const=default_cache_dir(), help=f"result cache shared by the workers (default if no DIR given: {default_cache_dir()})")
+
+    def run(self, args):
+        """Run a local HTTP server that generates crosswords (see crossgen.server).
+
+        POST a JSON object like {"words" : [...], "max" : 10, "timeout" : 5} to /generate."""
+        from crossgen import server
+        server.serve(host=args.host, port=args.port, workers=args.workers, queue_size=args.queue_size,
+                default_timeout=args.timeout, max_timeout=args.max_timeout, cache_dir=args.cache)
+
+class batch:
+    def build_parser(self, subparser):
+        from crossgen.cache import default_cache_dir
+        subparser.add_argument("-i", "--from-file", metavar="PATH", default="-", help="JSONL file with one word list per line, e.g. {\"id\" : \"puzzle-1\", \"words\" : [...]}, optionally with per-list options as for serve (use '-' to indicate stdin)")
+        subparser.add_argument("-o", metavar="PATH", default="results.jsonl", help="append one line of results per list to this path; lists that already have results in it are skipped")
+        subparser.add_argument("-w", "--workers", metavar="INT", default=os.cpu_count() or 1, type=int, help="number of worker processes")
+        subparser.add_argument("-x", "--max", metavar="MAX", default=100, type=int, help="generate at most this many crosswords per list")
+        subparser.add_argument("-b", "--batch", metavar="INT", default=5, type=int, help="restart the search after every this many crosswords")
+        subparser.add_argument("--exhaustive", action="store_true", help="enumerate every distinct layout instead of a random sample")
+        subparser.add_argument("--max-width", metavar="INT", default=None, type=int, help="only generate crosswords at most this many cells wide")
+        subparser.add_argument("--max-height", metavar="INT", default=None, type=int, help="only generate crosswords at most this many cells tall")
+        subparser.add_argument("--keep-transposes", action="store_true", help="keep a layout and its transpose as separate results")
+        subparser.add_argument("-t", "--timeout", metavar="SECONDS", default=10.0, type=float, help="seconds per list, for lists that don't give one; each list's clock starts when a worker picks it up")
+        subparser.add_argument("--max-timeout", metavar="SECONDS", default=60.0, type=float, help="longest timeout a list can ask for")
+        subparser.add_argument("-s", "--seed", metavar="INT", default=None, type=int, help="seed for the random search order of every list, to make runs reproducible")
+        subparser.add_argument("--cache", metavar="DIR", nargs="?", default=None, const=default_cache_dir(), help=f"result cache shared by the workers (default if no DIR given: {default_cache_dir()})")
+
+    def run(self, args):
+        """Generate crosswords for many word lists from a JSONL file, in parallel (see crossgen.batch).
+
+        Results are appended to the output file as each list finishes, so rerunning an interrupted batch
+        with the same output file carries on where it stopped."""
+        from crossgen.batch import run_batch
+        infile = sys.stdin
+        if args.from_file != "-":
+            try:
+                infile = open(args.from_file, "r", encoding="utf-8")
+            except IOError:
+                print(f"could not open file {args.from_file}", file=sys.stderr)
+                return 1
+        defaults = {"max" : args.max, "batch" : args.batch, "exhaustive" : args.exhaustive,
+                "max_width" : args.max_width, "max_height" : args.max_height, "keep_transposes" : args.keep_transposes,
+                "seed" : args.seed}
+        summary = run_batch(infile, args.o, workers=args.workers, defaults=defaults, default_timeout=args.timeout,
+                max_timeout=args.max_timeout, cache_dir=args.cache)
+        print(f"{summary['done']} lists done ({summary['crosswords']} crosswords), {summary['skipped']} already done, "
+                f"{summary['errors']} failed, in {summary['time']:.1f}s", file=sys.stderr)
+        if summary.get("interrupted"):
+            return 130
+        return 1 if summary["errors"] > 0 else 0
+
+class index_pool:
+    def build_parser(self, subparser):
+        subparser.add_argument("-i", "--from-file", metavar="PATH", default="-", help="file with one word per line (use '-' to indicate stdin); blank lines are skipped")
+        subparser.add_argument("-o", metavar="PATH", default="pool.xgpl", help="write the index to this path")
+        subparser.add_argument("--no-preprocess", action="store_true", help="turn off default preprocessing, which folds all words to uppercase and removes spaces")
+
+    def run(self, args):
+        """Index a pool of words for fill (see crossgen.pool)."""
+        from crossgen.pool import build_index
+        infile = sys.stdin
+        if args.from_file != "-":
+            try:
+                infile = open(args.from_file, "r", encoding="utf-8")
+            except IOError:
+                print(f"could not open file {args.from_file}", file=sys.stderr)
+                return 1
+        words = [line.strip() for line in infile if line.strip()]
+        if not args.no_preprocess:
+            words = [word.upper().replace(" ", "") for word in words]
+        build_index(words, args.o)
+        print(f"Indexed {len(set(words))} words to {args.o}", file=sys.stderr)
+
+class fill:
+    def build_parser(self, subparser):
+        subparser.add_argument("--pool", metavar="PATH", required=True, help="pool index written by index-pool")
+        subparser.add_argument("-n", "--words", metavar="INT", default=20, type=int, help="number of words in each crossword")
+        subparser.add_argument("-x", "--max", metavar="MAX", default=10, type=int, help="output at most this many crosswords")
+        subparser.add_argument("-o", metavar="PATH", default=None, help="also output the results to this HTML file")
+        subparser.add_argument("--max-width", metavar="INT", default=None, type=int, help="only generate crosswords at most this many cells wide")
+        subparser.add_argument("--max-height", metavar="INT", default=None, type=int, help="only generate crosswords at most this many cells tall")
+        subparser.add_argument("--min-length", metavar="INT", default=3, type=int, help="only use pool words at least this long")
+        subparser.add_argument("--max-length", metavar="INT", default=None, type=int, help="only use pool words at most this long")
+        subparser.add_argument("-t", "--timeout", metavar="SECONDS", default=None, type=float, help="stop generating after this many seconds")
+        subparser.add_argument("-s", "--seed", metavar="INT", default=None, type=int, help="seed for the random choices, to make runs reproducible")
+
+    def run(self, args):
+        """Generate crosswords out of words chosen from a large pool of words (see crossgen.pool).
+
+        Index the pool with index-pool first."""
+        from crossgen.pool import PoolIndex, fill_crosswords
+        try:
+            index = PoolIndex(args.pool)
+        except (OSError, ValueError) as e:
+            print(f"could not open pool index {args.pool}: {e}", file=sys.stderr)
+            return 1
+        crosswords = fill_crosswords(index, args.words, max=args.max, seed=args.seed, timeout=args.timeout,
+                max_width=args.max_width, max_height=args.max_height, min_length=args.min_length,
+                max_length=args.max_length)
+        print(f"Generated {len(crosswords)} crosswords", file=sys.stderr)
+        for i, (score, crossword) in enumerate(crosswords):
+            print(f"===CROSSWORD {i+1}, score:{score:.2f}===")
+            print(crossword)
+            print("===END===")
+            print()
+        if args.o is not None:
+            words = sorted({word for score, crossword in crosswords for word in crossword.words})
+            with open(args.o, "w", encoding="utf-8") as outfile:
+                pretty.HtmlGridPrinter(outfile).print_crosswords(crosswords, words)
+        if len(crosswords) == 0:
+            return 1
+
+class fill_template:
+    def build_parser(self, subparser):
+        subparser.add_argument("--template", metavar="PATH", required=True, help="block pattern to fill, one row per line: '#' for a block, '.' for a cell to fill in, or a letter that has to go there")
+        subparser.add_argument("-i", "--from-file", metavar="PATH", default=None, help="file with one word per line to fill the template from (use '-' to indicate stdin)")
+        subparser.add_argument("--pool", metavar="PATH", default=None, help="fill the template from this pool index (written by index-pool) instead")
+        subparser.add_argument("--no-preprocess", action="store_true", help="turn off default preprocessing, which folds all words and template letters to uppercase and removes spaces from words")
+        subparser.add_argument("-x", "--max", metavar="MAX", default=1, type=int, help="output at most this many different fills")
+        subparser.add_argument("-o", metavar="PATH", default=None, help="also output the results to this HTML file")
+        subparser.add_argument("-t", "--timeout", metavar="SECONDS", default=None, type=float, help="stop looking after this many seconds")
+        subparser.add_argument("-s", "--seed", metavar="INT", default=None, type=int, help="seed for the random word order, to make runs reproducible")
+
+    def run(self, args):
+        """Fill a fixed block-pattern template with words, American-style (see crossgen.template)."""
+        from crossgen import template
+        if (args.from_file is None) == (args.pool is None):
+            print("give either -i or --pool", file=sys.stderr)
+            return 1
+        try:
+            with open(args.template, "r", encoding="utf-8") as template_file:
+                template_text = template_file.read()
+            pattern = template.Template.from_string(template_text if args.no_preprocess else template_text.upper())
+        except (OSError, ValueError) as e:
+            print(f"could not read template {args.template}: {e}", file=sys.stderr)
+            return 1
+        lengths = {length for x, y, orientation, length in pattern.slots}
+        if args.pool is not None:
+            from crossgen.pool import PoolIndex
+            try:
+                pool_index = PoolIndex(args.pool)
+            except (OSError, ValueError) as e:
+                print(f"could not open pool index {args.pool}: {e}", file=sys.stderr)
+                return 1
+            index = template.PatternIndex.from_pool(pool_index, lengths)
+        else:
+            infile = sys.stdin
+            if args.from_file != "-":
+                try:
+                    infile = open(args.from_file, "r", encoding="utf-8")
+                except IOError:
+                    print(f"could not open file {args.from_file}", file=sys.stderr)
+                    return 1
+            words = [line.strip() for line in infile if line.strip()]
+            if not args.no_preprocess:
+                words = [word.upper().replace(" ", "") for word in words]
+            index = template.PatternIndex(words, lengths)
+
+        crosswords = template.fill_template(pattern, index, max=args.max, seed=args.seed, timeout=args.timeout)
+        print(f"Generated {len(crosswords)} crosswords", file=sys.stderr)
+        for i, (score, crossword) in enumerate(crosswords):
+            print(f"===CROSSWORD {i+1}, score:{score:.2f}===")
+            print(crossword)
+            print("===END===")
+            print()
+        if args.o is not None:
+            words = sorted({word for score, crossword in crosswords for word in crossword.words})
+            with open(args.o, "w", encoding="utf-8") as outfile:
+                pretty.HtmlGridPrinter(outfile).print_crosswords(crosswords, words)
+        if len(crosswords) == 0:
+            return 1
@@ -0,0 +1,209 @@
+"""Compact placement-based encoding of crossword grids.
+
+A crossword is stored as its placements, i.e. one (word_id, x, y, orientation) tuple per word
+(see grid.Grid.get_placements), where word_id indexes into a word list shared by every crossword
+in the same file. Rendering can then be deferred until the crossword is actually needed.
+
+Two forms are supported:
+
+- JSONL: a header line {"words": [...]}, then one {"score": ..., "placements": [...]} line per crossword
+- binary: a header with the word list, then one fixed-width record per crossword,
+  consisting of the score (float64) and the packed placements
+"""
+
+import json
+import struct
+
+from crossgen import grid
+
+MAGIC = b"XGEN"
+VERSION = 1
+
+HEADER = struct.Struct("<4sBH")
+"""magic, version, number of words"""
+
+WORD_LENGTH = struct.Struct("<H")
+"""length prefix of each utf-8 encoded word in the binary header"""
+
+PLACEMENT = struct.Struct("<Hhh")
+"""word_id (with the orientation in the top bit), x, y"""
+
+SCORE = struct.Struct("<d")
+
+ORIENTATION_BIT = 0x8000
+"""Also one more than the largest word_id the binary form can hold"""
+
+def get_word_ids(words):
+    """Return a map from word to its index in words"""
+    return {word : i for i, word in enumerate(words)}
+
+def get_record_size(words):
+    """Size in bytes of one binary record for a crossword that uses every word in words"""
+    return SCORE.size + PLACEMENT.size * len(words)
+
+def pack_placements(placements):
+    """Pack a sequence of (word_id, x, y, orientation) placements into bytes"""
+    buf = bytearray(PLACEMENT.size * len(placements))
+    for i, (word_id, x, y, orientation) in enumerate(placements):
+        if word_id >= ORIENTATION_BIT:
+            raise ValueError(f"word_id {word_id} is too big for the binary form (at most {ORIENTATION_BIT - 1})")
+        if orientation:
+            word_id |= ORIENTATION_BIT
+        PLACEMENT.pack_into(buf, i * PLACEMENT.size, word_id, x, y)
+    return bytes(buf)
+
+def unpack_placements(data):
+    """Inverse of pack_placements; data can be any bytes-like object"""
+    placements = []
+    for word_id, x, y in PLACEMENT.iter_unpack(data):
+        placements.append((word_id & ~ORIENTATION_BIT, x, y, 1 if word_id & ORIENTATION_BIT else 0))
+    return placements
+
+def pack_grid(crossword, word_ids):
+    return pack_placements(crossword.get_placements(word_ids))
+
+def unpack_grid(data, words):
+    return grid.Grid.from_placements(words, unpack_placements(data))
+
+def pack_record(score, crossword, word_ids):
+    """Return the binary record for a (score, crossword) pair"""
+    return SCORE.pack(score) + pack_grid(crossword, word_ids)
+
+def unpack_record(data, words):
+    """Inverse of pack_record; returns (score, crossword)"""
+    (score,) = SCORE.unpack_from(data)
+    return (score, unpack_grid(memoryview(data)[SCORE.size:], words))
+
+def to_json(score, crossword, word_ids):
+    """Return the JSON-serializable form of a (score, crossword) pair"""
+    return {"score" : score, "placements" : crossword.get_placements(word_ids)}
+
+def from_json(obj, words):
+    """Inverse of to_json; returns (score, crossword)"""
+    return (obj.get("score"), grid.Grid.from_placements(words, obj["placements"]))
+
+class JsonlWriter:
+    """Writes the header on construction, and then one line per write() call"""
+    def __init__(self, outfile, words):
+        self.out = outfile
+        self.words = list(words)
+        self.word_ids = get_word_ids(self.words)
+        self.out.write(json.dumps({"words" : self.words}, separators=(",", ":")) + "\n")
+
+    def write(self, score, crossword):
+        line = json.dumps(to_json(score, crossword, self.word_ids), separators=(",", ":"))
+        self.out.write(line + "\n")
+
+def write_jsonl(outfile, words, crosswords):
+    """crosswords should be a sequence of (score, crossword_grid) tuples"""
+    writer = JsonlWriter(outfile, words)
+    for score, crossword in crosswords:
+        writer.write(score, crossword)
+
+def read_jsonl(infile):
+    """Return (words, crosswords), where crosswords is an iterator over (score, crossword_grid) tuples"""
+    header = json.loads(infile.readline())
+    words = header["words"]
+    def crosswords():
+        for line in infile:
+            if line.strip():
+                yield from_json(json.loads(line), words)
+    return (words, crosswords())
+
+def pack_header(words):
+    if len(words) > ORIENTATION_BIT:
+        raise ValueError(f"the binary form holds at most {ORIENTATION_BIT} words, not {len(words)}")
+    header = bytearray(HEADER.pack(MAGIC, VERSION, len(words)))
+    for word in words:
+        data = word.encode("utf-8")
+        header += WORD_LENGTH.pack(len(data)) + data
+    return bytes(header)
+
+def unpack_header(data):
+    """Return (words, header_size) for the binary header at the start of data"""
+    (magic, version, word_count) = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("not a crossgen binary file")
+    if version != VERSION:
+        raise ValueError(f"unsupported crossgen binary version {version}")
+    offset = HEADER.size
+    words = []
+    for i in range(word_count):
+        (length,) = WORD_LENGTH.unpack_from(data, offset)
+        offset += WORD_LENGTH.size
+        words.append(bytes(data[offset:offset+length]).decode("utf-8"))
+        offset += length
+    return (words, offset)
+
+def read_header(infile):
+    """Return the word list from the binary header at the start of infile, without reading any records
+
+    Leaves infile at the first record, so infile.tell() is then the size of the header."""
+    data = bytearray(infile.read(HEADER.size))
+    if len(data) < HEADER.size:
+        raise ValueError("not a crossgen binary file")
+    (magic, version, word_count) = HEADER.unpack(data)
+    if magic != MAGIC:
+        raise ValueError("not a crossgen binary file")
+    if version != VERSION:
+        raise ValueError(f"unsupported crossgen binary version {version}")
+    for i in range(word_count):
+        length_data = infile.read(WORD_LENGTH.size)
+        (length,) = WORD_LENGTH.unpack(length_data)
+        data += length_data + infile.read(length)
+    return unpack_header(data)[0]
+
+class BinaryWriter:
+    """Writes the header on construction, and then one fixed-width record per write() call
+
+    outfile should be opened in binary mode."""
+    def __init__(self, outfile, words):
+        self.out = outfile
+        self.words = list(words)
+        self.word_ids = get_word_ids(self.words)
+        self.out.write(pack_header(self.words))
+
+    def write(self, score, crossword):
+        self.out.write(pack_record(score, crossword, self.word_ids))
+
+def write_binary(outfile, words, crosswords):
+    """crosswords should be a sequence of (score, crossword_grid) tuples"""
+    writer = BinaryWriter(outfile, words)
+    for score, crossword in crosswords:
+        writer.write(score, crossword)
+
+def read_binary(infile):
+    """Return (words, crosswords), where crosswords is a list of (score, crossword_grid) tuples"""
+    data = infile.read()
+    (words, offset) = unpack_header(data)
+    record_size = get_record_size(words)
+    view = memoryview(data)
+    crosswords = []
+    for start in range(offset, len(data) - record_size + 1, record_size):
+        crosswords.append(unpack_record(view[start:start+record_size], words))
+    return (words, crosswords)
+
+def main():
+    import io
+    words = ["REIMU", "MARISA", "SANAE"]
+    g = grid.Grid()
+    g.add_word("REIMU", 0, 0, grid.EAST)
+    g.add_word("MARISA", 3, 0, grid.SOUTH)
+    g.add_word("SANAE", 2, 5, grid.EAST)
+
+    text = io.StringIO()
+    write_jsonl(text, words, [(1.0, g)])
+    print(text.getvalue())
+    text.seek(0)
+    (_, crosswords) = read_jsonl(text)
+    assert list(crosswords)[0][1] == g
+
+    data = io.BytesIO()
+    write_binary(data, words, [(1.0, g)])
+    print(f"{len(data.getvalue())} bytes")
+    data.seek(0)
+    (_, crosswords) = read_binary(data)
+    print(crosswords[0][1])
+
+if __name__ == "__main__":
+    main()
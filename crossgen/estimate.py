@@ -0,0 +1,121 @@
+"""Estimate the size of the CrosswordTreeSearch tree for a word list, to pick generation settings.
+
+Uses Knuth's estimator: each probe walks from the root down a random path, expanding each node
+it passes. If the nodes on the path have b1, b2, ... children, the tree is estimated to have
+1 + b1 + b1*b2 + ... nodes, and reaching a finished crossword at the end of the path estimates
+b1*b2*... solutions. Averaging over many probes gives unbiased estimates, although the variance
+is high for lopsided trees, so treat the numbers as orders of magnitude.
+"""
+
+import math
+import time
+
+from crossgen import walker
+
+def estimate_search(words, time_budget=0.2, max_probes=1000, rng=None, max_width=None, max_height=None):
+    """Run random probes down the search tree for words until time_budget seconds or max_probes are used up
+
+    max_width and max_height limit the grid size, as in walker.CrosswordTreeSearch
+
+    Returns a dict with:
+        probes = number of probes done
+        tree_size = estimated number of nodes in the search tree
+        solutions = estimated number of finished crosswords in the tree (counting duplicates)
+        solution_density = solutions / tree_size
+        mean_depth = average length of a probe
+        nodes_per_second = how fast nodes were expanded during probing
+    """
+    rng = walker.make_rng(rng)
+    searcher = walker.CrosswordTreeSearch(words, rng=walker.spawn_rng(rng), max_width=max_width, max_height=max_height)
+    root = searcher.stack[0]
+    deadline = time.monotonic() + time_budget
+
+    total_size = 0.0
+    total_solutions = 0.0
+    total_depth = 0
+    probes = 0
+    start_time = time.perf_counter()
+    while probes < max_probes and (probes == 0 or time.monotonic() < deadline):
+        (size, solutions, depth) = _probe(searcher, root, rng)
+        total_size += size
+        total_solutions += solutions
+        total_depth += depth
+        probes += 1
+    elapsed = time.perf_counter() - start_time
+
+    tree_size = total_size / probes
+    solutions = total_solutions / probes
+    return {
+        "probes" : probes,
+        "tree_size" : tree_size,
+        "solutions" : solutions,
+        "solution_density" : solutions / tree_size,
+        "mean_depth" : total_depth / probes,
+        "nodes_per_second" : searcher.stats.nodes_expanded / elapsed if elapsed > 0 else 0.0,
+    }
+
+def _probe(searcher, state, rng):
+    """Return (estimated tree size, estimated solutions, depth) from one random root-to-leaf path"""
+    weight = 1.0
+    size = 1.0
+    depth = 0
+    while True:
+        searcher.stack = []
+        if searcher.expand(state) is not None:
+            return (size, weight, depth)
+        children = searcher.stack
+        if len(children) == 0:
+            return (size, 0.0, depth)
+        weight *= len(children)
+        size += weight
+        depth += 1
+        state = rng.choice(children)
+
+EXHAUSTIVE_TREE_SIZE = 1e7
+"""Estimated tree sizes up to this get walker.ExhaustiveSearch from suggest_settings, which enumerates trees this size
+in a second or two (its own tree of partial grids is far smaller than the CrosswordTreeSearch tree estimated here)"""
+
+LUBY_NODES_PER_SOLUTION = 1000
+"""Trees with more estimated nodes per solution than this get restarted by node count (restarts.LubyRestarts) rather
+than after every batch of results, so that a run can't get stuck in a part of the tree with nothing in it"""
+
+def suggest_settings(estimate, max=100):
+    """Return a dict of create_crosswords settings ("exhaustive", "restarts", "restart_nodes", "batch",
+    "no_progress_timeout"), plus "eta" in seconds (or None if max is None or there don't seem to be any
+    solutions), for the given estimate; restarts is a name from restarts.restart_policies
+
+    Heuristics:
+    - if the tree is small enough, enumerate it exhaustively instead of sampling it
+    - if no probe found a solution, fall back to the create_crosswords defaults
+    - if solutions are rare, restart after a number of nodes (in the Luby sequence, with a unit of about
+      one solution's worth of nodes) rather than after every batch
+    - if the whole tree holds only a few times max solutions, restarting just re-finds the same ones,
+      so use one big batch and give up quickly once nothing new turns up
+    - otherwise, restart more often the more solutions there are, since DFS results within a batch
+      tend to be near-duplicates of each other
+    """
+    solutions = estimate["solutions"]
+    target = max if max is not None else 100
+    settings = {"exhaustive" : False, "restarts" : "batch", "restart_nodes" : None}
+    if estimate["tree_size"] <= EXHAUSTIVE_TREE_SIZE:
+        settings["exhaustive"] = True
+    if solutions <= 0: # none of the probes got anywhere, so there's nothing to go on
+        settings.update({"batch" : 5, "no_progress_timeout" : 5, "eta" : None})
+        return settings
+
+    nodes_per_solution = estimate["tree_size"] / solutions
+    if solutions < 4 * target:
+        settings.update({"batch" : target, "no_progress_timeout" : 2})
+    else:
+        batch = min(round(target / math.log10(solutions)), 50, target)
+        if batch < 2:
+            batch = 2
+        settings.update({"batch" : batch, "no_progress_timeout" : 5})
+    if not settings["exhaustive"] and nodes_per_solution > LUBY_NODES_PER_SOLUTION:
+        settings["restarts"] = "luby"
+        settings["restart_nodes"] = round(nodes_per_solution)
+
+    settings["eta"] = None
+    if max is not None and estimate["nodes_per_second"] > 0:
+        settings["eta"] = max * nodes_per_solution / estimate["nodes_per_second"]
+    return settings
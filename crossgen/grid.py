@@ -14,6 +14,18 @@ WEST = (-1, 0)
 NORTH = (0, -1)
 """Convenience direction constants"""
 
+REJECT_MISSING_PARENT = "missing parent"
+REJECT_OVERLAP = "overlap"
+REJECT_BEFORE = "cell before"
+REJECT_AFTER = "cell after"
+REJECT_MISMATCH = "mismatch"
+REJECT_SIDE = "side contact"
+REJECT_TOO_BIG = "too big"
+"""Reasons returned by Grid.get_add_word_rejection and Grid.get_join_word_rejection"""
+
+ORIENTATIONS = (EAST, SOUTH)
+"""Orientation codes used by placements: ORIENTATIONS[0] = EAST, ORIENTATIONS[1] = SOUTH"""
+
 def add(v1, v2):
     """Add two tuples elementwise"""
     return tuple(a + b for a, b in zip(v1, v2))
@@ -50,8 +62,19 @@ def switch_orientation(orientation):
         raise ValueError(f"unsupported orientation {orientation}")
 
 class Grid: # for now, assume no duplicate words
-    """Grid of words, using screen coordinates"""
-    def __init__(self):
+    """Grid of words, using screen coordinates
+
+    xmin, xmax, ymin, ymax = bounds of the grid (always including the origin), kept up to date as words are added
+    max_width, max_height = if not None, words that would make the grid wider/taller than this can't be added
+    """
+    def __init__(self, max_width=None, max_height=None):
+        self.max_width = max_width
+        self.max_height = max_height
+        self.xmin = 0
+        self.xmax = 0
+        self.ymin = 0
+        self.ymax = 0
+
         self.index = {}
         """sparse matrix such that index[(x,y)] = letter"""
 
@@ -61,8 +84,136 @@ class Grid: # for now, assume no duplicate words
         self.words = {}
         """map from word to {"coords" : (x, y), "orientation" : <int>} object"""
 
+    @classmethod
+    def from_placements(cls, words, placements):
+        """Build a grid from a sequence of (word_id, x, y, orientation) placements
+
+        word_id indexes into words, and orientation indexes into ORIENTATIONS.
+        This skips the can_add_word checks, so the placements should come from a valid grid.
+        """
+        new_grid = cls()
+        index = new_grid.index
+        counts = new_grid.counts
+        for word_id, x, y, orientation in placements:
+            word = words[word_id]
+            direction = ORIENTATIONS[orientation]
+            new_grid.words[word] = {"coords" : (x, y), "orientation" : direction}
+            (dx, dy) = direction
+            for ch in word:
+                pos = (x, y)
+                if pos in index:
+                    if index[pos] != ch:
+                        raise ValueError(f"tried to put '{ch}' at {pos}, which already contains '{index[pos]}'")
+                    counts[pos] += 1
+                else:
+                    index[pos] = ch
+                    counts[pos] = 1
+                x += dx
+                y += dy
+        new_grid._recalc_bounds()
+        return new_grid
+
+    def get_placements(self, word_ids):
+        """Return a list of (word_id, x, y, orientation) placements, sorted by word_id
+
+        word_ids is a map from word to its index in the word list (see also from_placements)
+        """
+        placements = []
+        for word, data in self.words.items():
+            (x, y) = data["coords"]
+            placements.append((word_ids[word], x, y, ORIENTATIONS.index(data["orientation"])))
+        placements.sort()
+        return placements
+
+    def get_canonical_key(self, transpose=False):
+        """Return a hashable key that identifies the layout regardless of its offset from the origin
+
+        If transpose is True, the layout and its transpose (every EAST swapped for SOUTH)
+        get the same key.
+        """
+        if len(self.words) == 0:
+            return ()
+        # words only extend east/south, so their starting coords give the bounds
+        xmin = min(data["coords"][0] for data in self.words.values())
+        ymin = min(data["coords"][1] for data in self.words.values())
+        key = tuple(sorted((word, data["coords"][0] - xmin, data["coords"][1] - ymin, data["orientation"] == SOUTH)
+                for word, data in self.words.items()))
+        if transpose:
+            transposed_key = tuple(sorted((word, data["coords"][1] - ymin, data["coords"][0] - xmin, data["orientation"] == EAST)
+                    for word, data in self.words.items()))
+            key = min(key, transposed_key)
+        return key
+
+    def transposed(self):
+        """Return a copy of this grid reflected along its diagonal, i.e. with every EAST swapped for SOUTH"""
+        new_grid = type(self)()
+        for word, data in self.words.items():
+            (x, y) = data["coords"]
+            new_grid.add_word(word, y, x, switch_orientation(data["orientation"]))
+        return new_grid
+
+    def subgrid(self, words):
+        """Return a new grid with just the words in words that are in this grid, in the same places"""
+        new_grid = type(self)(self.max_width, self.max_height)
+        for word in words:
+            if word in self.words:
+                data = self.words[word]
+                new_grid.add_word(word, *data["coords"], data["orientation"])
+        return new_grid
+
+    def translated_to_origin(self, max_width=None, max_height=None):
+        """Return a copy of this grid moved so that its top left corner is at the origin, with new size limits"""
+        new_grid = type(self)(max_width, max_height)
+        if len(self.words) == 0:
+            return new_grid
+        xmin = min(data["coords"][0] for data in self.words.values())
+        ymin = min(data["coords"][1] for data in self.words.values())
+        for word, data in self.words.items():
+            (x, y) = data["coords"]
+            new_grid.add_word(word, x - xmin, y - ymin, data["orientation"])
+        return new_grid
+
+    def get_components(self):
+        """Return a list of the groups of words that are connected to each other by crossings, biggest first"""
+        neighbours = {word : set() for word in self.words}
+        cells = {} # map from (x, y) to the words at that cell
+        for word, data in self.words.items():
+            (x, y) = data["coords"]
+            (dx, dy) = data["orientation"]
+            for i in range(len(word)):
+                cell_words = cells.setdefault((x + dx * i, y + dy * i), [])
+                for other in cell_words:
+                    neighbours[word].add(other)
+                    neighbours[other].add(word)
+                cell_words.append(word)
+        components = []
+        done = set()
+        for word in sorted(neighbours):
+            if word in done:
+                continue
+            component = []
+            todo = [word]
+            done.add(word)
+            while len(todo) > 0:
+                current = todo.pop()
+                component.append(current)
+                for other in neighbours[current]:
+                    if other not in done:
+                        done.add(other)
+                        todo.append(other)
+            components.append(component)
+        components.sort(key=len, reverse=True) # stable, so ties stay in word order
+        return components
+
+    def is_connected(self):
+        return len(self.get_components()) <= 1
+
     def copy(self):
-        new_grid = Grid()
+        new_grid = type(self)(self.max_width, self.max_height)
+        new_grid.xmin = self.xmin
+        new_grid.xmax = self.xmax
+        new_grid.ymin = self.ymin
+        new_grid.ymax = self.ymax
         new_grid.index = self.index.copy()
         new_grid.counts = self.counts.copy()
         new_grid.words = self.words.copy()
@@ -94,26 +245,33 @@ class Grid: # for now, assume no duplicate words
             self.counts[pos] -= 1
             if self.counts[pos] == 0:
                 del self.index[pos]
+                self._recalc_bounds()
 
     def can_join_word(self, parent_word, parent_index, child_word, child_index):
         """Return true if can join child_word at letter child_index to existing parent_word at parent_index"""
+        return self.get_join_word_rejection(parent_word, parent_index, child_word, child_index) is None
+
+    def get_join_word_rejection(self, parent_word, parent_index, child_word, child_index):
+        """Like can_join_word, but return None if the join is allowed, or else the REJECT_* reason why not"""
         if parent_word not in self.words:
-            logging.debug(f"  {parent_word} not in self.words")
-            return False
-        parent_coords = self.words[parent_word]["coords"]
-        parent_orientation = self.words[parent_word]["orientation"]
-        child_orientation = switch_orientation(parent_orientation)
-        join_coords = add(parent_coords, scale(parent_orientation, parent_index))
-        child_coords = sub(join_coords, scale(child_orientation, child_index))
-        return self.can_add_word(child_word, child_coords[0], child_coords[1], child_orientation)
+            logging.debug("  %s not in self.words", parent_word)
+            return REJECT_MISSING_PARENT
+        (child_x, child_y, child_orientation) = self.get_join_position(parent_word, parent_index, child_index)
+        return self.get_add_word_rejection(child_word, child_x, child_y, child_orientation)
 
     def join_word(self, parent_word, parent_index, child_word, child_index):
-        parent_coords = self.words[parent_word]["coords"]
-        parent_orientation = self.words[parent_word]["orientation"]
-        child_orientation = switch_orientation(parent_orientation)
-        join_coords = add(parent_coords, scale(parent_orientation, parent_index))
-        child_coords = sub(join_coords, scale(child_orientation, child_index))
-        self.add_word(child_word, child_coords[0], child_coords[1], child_orientation)
+        (child_x, child_y, child_orientation) = self.get_join_position(parent_word, parent_index, child_index)
+        self.add_word(child_word, child_x, child_y, child_orientation)
+
+    def get_join_position(self, parent_word, parent_index, child_index):
+        """Return (x, y, orientation) of a child word whose letter child_index crosses parent_word at parent_index"""
+        parent_data = self.words[parent_word]
+        (parent_x, parent_y) = parent_data["coords"]
+        (parent_dx, parent_dy) = parent_data["orientation"]
+        child_orientation = switch_orientation(parent_data["orientation"])
+        (child_dx, child_dy) = child_orientation
+        return (parent_x + parent_dx * parent_index - child_dx * child_index,
+                parent_y + parent_dy * parent_index - child_dy * child_index, child_orientation)
 
     def can_add_word(self, word, x, y, direction):
         """Boundary checks:
@@ -124,25 +282,31 @@ class Grid: # for now, assume no duplicate words
         - cell past end must be empty
         - should not subsume any existing words;
           e.g. if there is "AAA", adding "AAAA" on top of that should not be allowed
+        - grid must still fit within max_width and max_height, if they are set
         """
+        return self.get_add_word_rejection(word, x, y, direction) is None
 
-        pos = (x, y)
-        normals = normal(direction)
+    def get_add_word_rejection(self, word, x, y, direction):
+        """Like can_add_word, but return None if the word can be added, or else the REJECT_* reason why not"""
+
+        (dx, dy) = direction
+        length = len(word)
+
+        # checked first, since it's cheap and prunes the most when the grid is tight
+        if self.max_width is not None or self.max_height is not None:
+            (width, height) = self.get_size_with(x, y, x + dx * (length - 1), y + dy * (length - 1))
+            if self.max_width is not None and width > self.max_width or self.max_height is not None and height > self.max_height:
+                return REJECT_TOO_BIG
 
         # make sure word does not overwrite a shorter word in the same direction
         # no need to check for a shorter word overwriting a longer word because the other
         # checks should catch that
         
         for other_word, other_data in self.words.items(): # TODO: is there a nicer way of checking for this?
-            other_coords = other_data['coords']
-            other_orientation = other_data['orientation']
-            if other_word != word and other_orientation == direction:
+            if other_word != word and other_data['orientation'] == direction:
                 # check if they overlap
-        
-                start = pos
-                end = add(pos, scale(direction, len(word)))
-                start2 = other_coords
-                end2 = add(other_coords, scale(direction, len(other_word)))
+                (x2, y2) = other_data['coords']
+                length2 = len(other_word)
 
                 # either s <= s2 < e:
                 #     s ----- e
@@ -152,50 +316,52 @@ class Grid: # for now, assume no duplicate words
                 #        s ----- e
                 #     s2 --- e2
 
-                if direction == EAST and start[1] == start2[1]: # same row
-                    if start[0] <= start2[0] and start2[0] < end[0] or start2[0] <= start[0] and start[0] < end2[0]:
-                        return False
-                elif direction == SOUTH and start[0] == start2[0]: # same column
-                    if start[1] <= start2[1] and start2[1] < end[1] or start2[1] <= start[1] and start[1] < end2[1]:
-                        return False
-   
+                if direction == EAST and y == y2: # same row
+                    if x <= x2 < x + length or x2 <= x < x2 + length2:
+                        return REJECT_OVERLAP
+                elif direction == SOUTH and x == x2: # same column
+                    if y <= y2 < y + length or y2 <= y < y2 + length2:
+                        return REJECT_OVERLAP
+
+        # plain ints rather than add() and friends, since this is the innermost loop of the search
+        index = self.index
+        ((nx1, ny1), (nx2, ny2)) = normal(direction)
+        (px, py) = (x, y)
         for i, ch in enumerate(word):
             # cell before beginning must be empty
-            if i == 0:
-                if self.has_letter_at(sub(pos, direction)):
-                    return False
+            if i == 0 and (px - dx, py - dy) in index:
+                return REJECT_BEFORE
 
             # cell past end must be empty
-            if i == len(word) - 1:
-                if self.has_letter_at(add(pos, direction)):
-                    return False
+            if i == length - 1 and (px + dx, py + dy) in index:
+                return REJECT_AFTER
 
             # all cells in path must be either empty or match word
-            if self.has_letter_at(pos):
-                if self.index[pos] != ch:
-                    return False
+            existing = index.get((px, py))
+            if existing is not None:
+                if existing != ch:
+                    return REJECT_MISMATCH
 
             # cannot touch any cells on either side unless crossing a path
-            if not self.has_letter_at(pos):
-                if self.has_letter_at(add(pos, normals[0])):
-                    return False
-                if self.has_letter_at(add(pos, normals[1])):
-                    return False
+            elif (px + nx1, py + ny1) in index or (px + nx2, py + ny2) in index:
+                return REJECT_SIDE
 
             # increment
-            pos = add(pos, direction)
-        return True
+            px += dx
+            py += dy
+        return None
         
     def add_word(self, word, x, y, direction):
         if word in self.words:
             raise ValueError(f"word '{word}' is already in grid'")
         self.words[word] = {"coords" : (x, y), "orientation" : direction}
 
-        pos = (x, y)
-
+        (dx, dy) = direction
+        self._extend_bounds(x, y, x + dx * (len(word) - 1), y + dy * (len(word) - 1))
         for ch in word:
-            self.add_letter(ch, pos)
-            pos = add(pos, direction)
+            self.add_letter(ch, (x, y))
+            x += dx
+            y += dy
 
     def get_cross_count(self):
         cross_count = 0
@@ -205,15 +371,22 @@ class Grid: # for now, assume no duplicate words
 
     def get_size(self):
         """return (width, height) of smallest grid that bounds words"""
-        self._recalc_bounds()
         return (self.xmax + 1 - self.xmin, self.ymax + 1 - self.ymin)
 
+    def get_size_with(self, x1, y1, x2, y2):
+        """Return what get_size would be if the grid also covered the cells from (x1, y1) to (x2, y2)"""
+        return (max(self.xmax, x1, x2) + 1 - min(self.xmin, x1, x2), max(self.ymax, y1, y2) + 1 - min(self.ymin, y1, y2))
+
+    def fits(self, max_width=None, max_height=None):
+        """Return True if the grid is at most max_width wide and max_height tall (None means no limit)"""
+        (width, height) = self.get_size()
+        return (max_width is None or width <= max_width) and (max_height is None or height <= max_height)
+
     def get_grid_numbers(self):
         """Return a map from (grid_x, grid_y) to number (1-indexed), relative to printed grid
 
         Numbers are in ascending order from top to bottom, left to right.
         """
-        self._recalc_bounds()
         word_starts = []
         for data in self.words.values():
             (x, y) = data["coords"]
@@ -229,7 +402,6 @@ class Grid: # for now, assume no duplicate words
         return word_numbers
 
     def __str__(self):
-        self._recalc_bounds()
         grid = []
         for y in range(self.ymin, self.ymax+1):
             grid.append([])
@@ -241,6 +413,12 @@ class Grid: # for now, assume no duplicate words
             lines.append(''.join(line))
         return '\n'.join(lines)
     
+    def _extend_bounds(self, x1, y1, x2, y2):
+        self.xmin = min(self.xmin, x1, x2)
+        self.xmax = max(self.xmax, x1, x2)
+        self.ymin = min(self.ymin, y1, y2)
+        self.ymax = max(self.ymax, y1, y2)
+
     def _recalc_bounds(self):
         self.xmin = 0
         self.xmax = 0
@@ -252,6 +430,16 @@ class Grid: # for now, assume no duplicate words
             self.ymin = min(self.ymin, coords[1])
             self.ymax = max(self.ymax, coords[1])
 
+    def __getstate__(self):
+        """Pickle just the words, since everything else can be worked out from them (e.g. for crossgen.checkpoint)"""
+        return (self.max_width, self.max_height, [(word, data["coords"], data["orientation"]) for word, data in self.words.items()])
+
+    def __setstate__(self, state):
+        (max_width, max_height, words) = state
+        self.__init__(max_width, max_height)
+        for word, (x, y), orientation in words:
+            self.add_word(word, x, y, orientation)
+
     def __hash__(self):
         repr_str = str(self)
         return hash(repr_str)
@@ -259,6 +447,166 @@ class Grid: # for now, assume no duplicate words
     def __eq__(self, other):
         return str(self) == str(other)
 
+def _window(mask, start):
+    """Return mask shifted so that bit start ends up at bit 0 (start can be negative)"""
+    return mask >> start if start >= 0 else mask << -start
+
+def _bit_indices(mask):
+    """Yield the indices of the set bits of mask, lowest first"""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+class BitGrid(Grid):
+    """Grid that also keeps which cells are filled as an integer bitmask per row and per column, so that
+    can_add_word is a few bitwise operations per word instead of several dict lookups per letter
+
+    It's a drop-in replacement for Grid (index, counts and words are all still there, and the rejection
+    reasons are the same), so it can be passed to anything that takes a Grid. It's quicker for long words
+    and grids with many words, since Grid.can_add_word also loops over every word to check for overlaps.
+
+    Bit i of a row mask is the cell at x = x0 + i, and bit i of a column mask the cell at y = y0 + i; the
+    origins move (and every mask is shifted) when a word goes past them.
+
+    Attributes:
+        x0, y0 = coordinates of bit 0 of the row and column masks
+        rows, cols = map from y (x) to the mask of the filled cells in that row (column)
+        across, down = map from y (x) to the mask of the cells in that row (column) covered by EAST (SOUTH) words
+    """
+    MARGIN = 32
+    """How far the origins start out left of and above (0, 0), and how far past a word they move when a word goes
+    past them, so that they seldom have to move"""
+
+    def __init__(self, max_width=None, max_height=None):
+        super().__init__(max_width, max_height)
+        self.x0 = -self.MARGIN
+        self.y0 = -self.MARGIN
+        self.rows = {}
+        self.cols = {}
+        self.across = {}
+        self.down = {}
+
+    @classmethod
+    def from_placements(cls, words, placements):
+        new_grid = super().from_placements(words, placements)
+        new_grid._rebuild_masks()
+        return new_grid
+
+    def copy(self):
+        new_grid = super().copy()
+        new_grid.x0 = self.x0
+        new_grid.y0 = self.y0
+        new_grid.rows = self.rows.copy()
+        new_grid.cols = self.cols.copy()
+        new_grid.across = self.across.copy()
+        new_grid.down = self.down.copy()
+        return new_grid
+
+    def remove_letter(self, pos):
+        super().remove_letter(pos)
+        if pos not in self.index:
+            (x, y) = pos
+            if x >= self.x0 and y >= self.y0:
+                self.rows[y] = self.rows.get(y, 0) & ~(1 << (x - self.x0))
+                self.cols[x] = self.cols.get(x, 0) & ~(1 << (y - self.y0))
+
+    def add_word(self, word, x, y, direction):
+        super().add_word(word, x, y, direction)
+        if x < self.x0 or y < self.y0:
+            self._rebuild_masks()
+            return
+        self._add_to_masks(word, x, y, direction)
+
+    def _add_to_masks(self, word, x, y, direction):
+        length = len(word)
+        if direction == EAST:
+            span = ((1 << length) - 1) << (x - self.x0)
+            self.rows[y] = self.rows.get(y, 0) | span
+            self.across[y] = self.across.get(y, 0) | span
+            bit = 1 << (y - self.y0)
+            cols = self.cols
+            for px in range(x, x + length):
+                cols[px] = cols.get(px, 0) | bit
+        else:
+            span = ((1 << length) - 1) << (y - self.y0)
+            self.cols[x] = self.cols.get(x, 0) | span
+            self.down[x] = self.down.get(x, 0) | span
+            bit = 1 << (x - self.x0)
+            rows = self.rows
+            for py in range(y, y + length):
+                rows[py] = rows.get(py, 0) | bit
+
+    def _rebuild_masks(self):
+        """Work the masks out again from index and words, with the origins moved to fit every word"""
+        if len(self.words) > 0:
+            self.x0 = min(self.x0, min(data["coords"][0] for data in self.words.values()) - self.MARGIN)
+            self.y0 = min(self.y0, min(data["coords"][1] for data in self.words.values()) - self.MARGIN)
+        self.across = {}
+        self.down = {}
+        for word, data in self.words.items():
+            (x, y) = data["coords"]
+            span = ((1 << len(word)) - 1) << (x - self.x0 if data["orientation"] == EAST else y - self.y0)
+            if data["orientation"] == EAST:
+                self.across[y] = self.across.get(y, 0) | span
+            else:
+                self.down[x] = self.down.get(x, 0) | span
+        # go by index for the filled cells, since letters taken out with remove_letter are still covered by their words
+        self.rows = {}
+        self.cols = {}
+        for (x, y) in self.index:
+            self.rows[y] = self.rows.get(y, 0) | 1 << (x - self.x0)
+            self.cols[x] = self.cols.get(x, 0) | 1 << (y - self.y0)
+
+    def get_add_word_rejection(self, word, x, y, direction):
+        if word in self.words: # only Grid's check skips the word's own placement for overlaps
+            return super().get_add_word_rejection(word, x, y, direction)
+
+        (dx, dy) = direction
+        length = len(word)
+
+        if self.max_width is not None or self.max_height is not None:
+            (width, height) = self.get_size_with(x, y, x + dx * (length - 1), y + dy * (length - 1))
+            if self.max_width is not None and width > self.max_width or self.max_height is not None and height > self.max_height:
+                return REJECT_TOO_BIG
+
+        # the line the word goes along, the lines on either side of it, and the cells of it covered by words
+        # in the same direction, all shifted so that bit 0 is the cell before the word
+        if direction == EAST:
+            start = x - self.x0 - 1
+            line = _window(self.rows.get(y, 0), start)
+            sides = _window(self.rows.get(y - 1, 0) | self.rows.get(y + 1, 0), start)
+            same = _window(self.across.get(y, 0), start)
+        else:
+            start = y - self.y0 - 1
+            line = _window(self.cols.get(x, 0), start)
+            sides = _window(self.cols.get(x - 1, 0) | self.cols.get(x + 1, 0), start)
+            same = _window(self.down.get(x, 0), start)
+        cells = ((1 << length) - 1) << 1
+
+        if same & cells:
+            return REJECT_OVERLAP
+        if line & 1:
+            return REJECT_BEFORE
+
+        filled = line & cells
+        mismatched = 0
+        index = self.index
+        for i in _bit_indices(filled >> 1):
+            if index[(x + dx * i, y + dy * i)] != word[i]:
+                mismatched |= 1 << i
+        bad = mismatched | (sides & ~filled & cells) >> 1
+
+        # same order as Grid: the first bad letter, except that the cell after the word is checked before the last letter
+        first_bad = (bad & -bad).bit_length() - 1
+        if 0 <= first_bad < length - 1:
+            return REJECT_MISMATCH if mismatched >> first_bad & 1 else REJECT_SIDE
+        if line >> (length + 1) & 1:
+            return REJECT_AFTER
+        if first_bad >= 0:
+            return REJECT_MISMATCH if mismatched >> first_bad & 1 else REJECT_SIDE
+        return None
+
 def main():
     grid = Grid()
     grid.add_word("television", 0, 0, EAST)
@@ -1,4 +1,5 @@
 from PyQt5.QtCore import (
+	Qt,
 	QSize,
 	QObject,
 	QThread,
@@ -29,6 +30,9 @@ from PyQt5.QtWidgets import (
 	QSpinBox,
 	QCheckBox,
 	QAbstractScrollArea,
+	QListWidget,
+	QListWidgetItem,
+	QDialogButtonBox,
 )
 from PyQt5.QtWebEngineWidgets import (
 	QWebEngineView,
@@ -44,6 +48,7 @@ from io import StringIO
 import sys
 import logging
 
+import crossgen.cache
 import crossgen.command
 import crossgen.grid
 import crossgen.pretty
@@ -97,6 +102,8 @@ class CrossgenQt(QMainWindow):
 		self.capitalize = True
 		self.remove_spaces = True
 		self.no_progress_timeout = 5 # number of batches
+		self.use_cache = True # reuse results from crossgen.cache for word lists generated before
+		self.top_up = False # with the cache, generate new crosswords on top of the cached ones
 		self.words = []
 		self.crosswords = []
 		self.gen_worker = None
@@ -181,6 +188,11 @@ class CrossgenQt(QMainWindow):
 		act_options.triggered.connect(self.show_advanced_options)
 		tools_menu.addAction(act_options)
 
+		act_keep = QAction('&Keep words and regenerate...', self)
+		act_keep.setStatusTip('Keep some of the words of a generated crossword where they are, and regenerate the rest')
+		act_keep.triggered.connect(self.show_keep_words)
+		tools_menu.addAction(act_keep)
+
 		act_debug = QAction('&Debug logging', self)
 		act_debug.setStatusTip('Show debug output for crossword generation')
 		act_debug.triggered.connect(self.show_debug)
@@ -309,7 +321,8 @@ class CrossgenQt(QMainWindow):
 		num_done_updated = pyqtSignal(int)
 		finished = pyqtSignal()
 
-		def __init__(self, words, max, batch, capitalize, remove_spaces, no_progress_timeout):
+		def __init__(self, words, max, batch, capitalize, remove_spaces, no_progress_timeout, cache=None, top_up=False,
+				initial_grid=None):
 			super().__init__()
 			self.words = words
 			self.max = max
@@ -317,6 +330,9 @@ class CrossgenQt(QMainWindow):
 			self.capitalize = capitalize
 			self.remove_spaces = remove_spaces
 			self.no_progress_timeout = no_progress_timeout
+			self.cache = cache
+			self.top_up = top_up
+			self.initial_grid = initial_grid
 			self.crosswords = []
 
 		def run(self):
@@ -325,7 +341,9 @@ class CrossgenQt(QMainWindow):
 
 			self.crosswords = crossgen.command.create_crosswords(words=self.words, max=self.max, batch=self.batch,
 					progress_callback=progress_callback, capitalize=self.capitalize, remove_spaces=self.remove_spaces,
-					no_progress_timeout=self.no_progress_timeout)
+					no_progress_timeout=self.no_progress_timeout, cache=self.cache, top_up=self.top_up,
+					warm_start=self.cache is not None, # so that editing a word or two and regenerating is quick
+					initial_grid=self.initial_grid)
 
 			self.finished.emit()
 
@@ -337,6 +355,10 @@ class CrossgenQt(QMainWindow):
 		self.statusBar().showMessage(f"Generated {num_done}/{self.used_max} crosswords...")
 
 	def on_generate_pressed(self):
+		self.start_generating()
+
+	def start_generating(self, initial_grid=None):
+		"""initial_grid = grid of words to keep where they are, so that only the rest are regenerated"""
 		if not self.can_generate(): # avoid generating while already generating, and prompt if previous crosswords are unsaved
 			return
 
@@ -344,8 +366,14 @@ class CrossgenQt(QMainWindow):
 		self.used_words = list(self.words) # save these values in a separate variable in case they change while generating
 		self.used_max = self.max
 
+		cache = None
+		if self.use_cache and initial_grid is None: # the cache doesn't know about kept words
+			try:
+				cache = crossgen.cache.ResultCache()
+			except OSError:
+				logging.exception("could not open the result cache, so not using it")
 		self.gen_worker = CrossgenQt.GenerateCrosswordsWorker(self.used_words, self.used_max,
-				self.batch, self.capitalize, self.remove_spaces, self.no_progress_timeout)
+				self.batch, self.capitalize, self.remove_spaces, self.no_progress_timeout, cache, self.top_up, initial_grid)
 		self.gen_worker.num_done_updated.connect(self.update_progress)
 		self.gen_worker.finished.connect(self.on_done_generating)
 		self.gen_worker.start()
@@ -616,8 +644,74 @@ class CrossgenQt(QMainWindow):
 			self.no_progress_timeout = num
 		timeout_spinbox.valueChanged.connect(set_no_progress_timeout)
 		options_layout.addRow("No progress timeout (batches):", timeout_spinbox)
+
+		cache_checkbox = QCheckBox()
+		cache_checkbox.setChecked(self.use_cache)
+		def set_use_cache(checked):
+			self.use_cache = checked
+		cache_checkbox.toggled.connect(set_use_cache)
+		options_layout.addRow("Reuse cached crosswords:", cache_checkbox)
+
+		top_up_checkbox = QCheckBox()
+		top_up_checkbox.setChecked(self.top_up)
+		def set_top_up(checked):
+			self.top_up = checked
+		top_up_checkbox.toggled.connect(set_top_up)
+		options_layout.addRow("Add new crosswords to cached ones:", top_up_checkbox)
 		msg.show()
 
+	def show_keep_words(self):
+		if len(self.crosswords) == 0:
+			msg = QMessageBox()
+			msg.setIcon(QMessageBox.Information)
+			msg.setWindowTitle("Keep Words")
+			msg.setText("Generate some crosswords first!")
+			msg.setStandardButtons(QMessageBox.Ok)
+			msg.exec_()
+			return
+
+		dialog = QDialog(parent=self)
+		dialog.setWindowTitle("Keep words and regenerate")
+		dialog.setModal(True)
+
+		options_layout = QFormLayout()
+		dialog.setLayout(options_layout)
+
+		index_spinbox = QSpinBox()
+		index_spinbox.setMinimum(1)
+		index_spinbox.setMaximum(len(self.crosswords))
+		options_layout.addRow("Crossword number:", index_spinbox)
+
+		word_list = QListWidget()
+		def show_words(index):
+			word_list.clear()
+			(score, crossword) = self.crosswords[index - 1]
+			for word in sorted(crossword.words):
+				item = QListWidgetItem(word)
+				item.setFlags(item.flags() | Qt.ItemIsUserCheckable)
+				item.setCheckState(Qt.Checked)
+				word_list.addItem(item)
+		index_spinbox.valueChanged.connect(show_words)
+		show_words(1)
+		options_layout.addRow("Words to keep:", word_list)
+
+		buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+		buttons.button(QDialogButtonBox.Ok).setText("Regenerate the rest")
+		buttons.accepted.connect(dialog.accept)
+		buttons.rejected.connect(dialog.reject)
+		options_layout.addRow(buttons)
+
+		if not dialog.exec_():
+			return
+		(score, crossword) = self.crosswords[index_spinbox.value() - 1]
+		words = crossgen.cache.normalize_words(self.words, self.capitalize, self.remove_spaces)
+		keep = []
+		for i in range(word_list.count()):
+			item = word_list.item(i)
+			if item.checkState() == Qt.Checked and item.text() in words: # skip words taken out of the input since the crossword was generated
+				keep.append(item.text())
+		self.start_generating(initial_grid=crossword.subgrid(keep))
+
 	def show_about(self):
 		msg = QDialog(parent=self)
 		msg.setWindowTitle("About crossgen")
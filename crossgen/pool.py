@@ -0,0 +1,337 @@
+"""Filling crosswords from a large pool of words, choosing which words to use as well as where to put them.
+
+The pool is indexed once (build_index) into a file that maps each (letter, position, length) to the words of that
+length with that letter at that position. PoolIndex memory-maps the file, so opening even a big pool is quick and
+the posting lists are only paged in as they're used.
+
+PoolFiller builds a crossword one word at a time. The cells of placed words that nothing crosses yet are open
+anchors, and each anchor gives a set of slots: every length and offset of a word crossing it. The letters
+already on a slot's path are constraints on which words fit there, so the index gives the candidates for a slot
+by intersecting the posting lists of its constraints. Slots with more constraints make more crossings, so
+choose_next_word takes the candidate for the slot with the most crossings (then the least growth), out of
+a random sample of anchors.
+
+Index file layout (all integers little-endian):
+    header (see HEADER)
+    word offsets: word count + 1 uint32s into the word data, with words sorted by length, then alphabetically
+    word data: the utf-8 encoded words, back to back
+    lengths: one LENGTH entry per word length, giving the range of word ids with that length
+    keys: one KEY entry per (letter, position, length), giving the range of the postings for it
+    postings: uint32 word ids, ascending within each key
+"""
+
+import array
+import bisect
+import mmap
+import os
+import random
+import struct
+import sys
+import time
+
+from crossgen import grid
+from crossgen import pretty
+
+MAGIC = b"XGPL"
+VERSION = 1
+
+HEADER = struct.Struct("<4sBxxxIIII")
+"""magic, version, number of words, size of the word data, number of lengths, number of keys"""
+
+LENGTH = struct.Struct("<HxxII")
+"""word length, first word id, number of words"""
+
+KEY = struct.Struct("<IHHII")
+"""letter (as a code point), position, length, first posting, number of postings"""
+
+ANCHORS_PER_STEP = 8
+"""Open anchors to look at for each word added"""
+
+CANDIDATES_PER_SLOT = 4
+"""Candidates to try for a slot before moving on to the next best slot"""
+
+def _uint32_array(values):
+    data = array.array("I", values)
+    if sys.byteorder == "big":
+        data.byteswap()
+    return data
+
+def build_index(words, path):
+    """Write an index of words (duplicates are dropped) to path; the words should already be preprocessed"""
+    words = sorted(set(words), key=lambda word: (len(word), word))
+    encoded = [word.encode("utf-8") for word in words]
+    offsets = [0]
+    for data in encoded:
+        offsets.append(offsets[-1] + len(data))
+
+    lengths = {} # length: [first id, count]
+    postings = {} # (letter, position, length): [word ids]
+    for word_id, word in enumerate(words):
+        length = len(word)
+        lengths.setdefault(length, [word_id, 0])[1] += 1
+        for position, letter in enumerate(word):
+            postings.setdefault((letter, position, length), []).append(word_id)
+
+    keys = sorted(postings, key=lambda key: (key[2], key[1], key[0]))
+    with open(path, "wb") as outfile:
+        outfile.write(HEADER.pack(MAGIC, VERSION, len(words), offsets[-1], len(lengths), len(keys)))
+        outfile.write(_uint32_array(offsets).tobytes())
+        outfile.write(b"".join(encoded))
+        for length in sorted(lengths):
+            outfile.write(LENGTH.pack(length, *lengths[length]))
+        first = 0
+        for letter, position, length in keys:
+            count = len(postings[(letter, position, length)])
+            outfile.write(KEY.pack(ord(letter), position, length, first, count))
+            first += count
+        outfile.write(b"\0" * (-outfile.tell() % 4)) # so the postings can be cast to uint32s in place
+        for key in keys:
+            outfile.write(_uint32_array(postings[key]).tobytes())
+
+class PoolIndex:
+    """Memory-mapped (letter, position, length) index of a word pool, as written by build_index
+
+    Attributes:
+        path = path of the index file
+        word_count = number of words in the pool
+        lengths = map from word length to the range of ids of the words with that length
+    """
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as infile:
+            self._mmap = mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ)
+        data = self._mmap
+        (magic, version, self.word_count, data_size, length_count, key_count) = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a crossgen pool index")
+        if version != VERSION:
+            raise ValueError(f"unsupported crossgen pool index version {version}")
+        offset = HEADER.size
+        self._offsets = self._view_uint32(offset, self.word_count + 1)
+        offset += 4 * (self.word_count + 1)
+        self._word_data = memoryview(data)[offset:offset+data_size]
+        offset += data_size
+        self.lengths = {}
+        for length, first, count in LENGTH.iter_unpack(data[offset:offset+LENGTH.size*length_count]):
+            self.lengths[length] = range(first, first + count)
+        offset += LENGTH.size * length_count
+        self._keys = {}
+        for letter, position, length, first, count in KEY.iter_unpack(data[offset:offset+KEY.size*key_count]):
+            self._keys[(chr(letter), position, length)] = (first, count)
+        offset += KEY.size * key_count
+        offset += -offset % 4
+        self._postings = self._view_uint32(offset, (len(data) - offset) // 4)
+        self._words = {} # cache of decoded words
+
+    def _view_uint32(self, offset, count):
+        view = memoryview(self._mmap)[offset:offset+4*count]
+        if sys.byteorder == "big": # can't use the file in place
+            values = array.array("I", view)
+            values.byteswap()
+            return values
+        return view.cast("I")
+
+    def __len__(self):
+        return self.word_count
+
+    def get_word(self, word_id):
+        word = self._words.get(word_id)
+        if word is None:
+            word = bytes(self._word_data[self._offsets[word_id]:self._offsets[word_id+1]]).decode("utf-8")
+            self._words[word_id] = word
+        return word
+
+    def lookup(self, letter, position, length):
+        """Return the ids of the words of the given length with letter at position, in ascending order"""
+        (first, count) = self._keys.get((letter, position, length), (0, 0))
+        return self._postings[first:first+count]
+
+    def match(self, length, constraints):
+        """Return the ids of the words of the given length that fit every (position, letter) in constraints,
+        as a sequence in ascending order"""
+        if len(constraints) == 0:
+            return self.lengths.get(length, range(0))
+        lists = sorted((self.lookup(letter, position, length) for position, letter in constraints), key=len)
+        if len(lists) == 1 or len(lists[0]) == 0:
+            return lists[0]
+        matches = []
+        for word_id in lists[0]:
+            for other in lists[1:]: # binary search, since the lists are sorted
+                i = bisect.bisect_left(other, word_id)
+                if i == len(other) or other[i] != word_id:
+                    break
+            else:
+                matches.append(word_id)
+        return matches
+
+    def close(self):
+        self._offsets = self._word_data = self._postings = None
+        self._mmap.close()
+
+class PoolFiller:
+    """Builds crosswords of a given number of words chosen from a PoolIndex
+
+    Attributes:
+        index = the PoolIndex to take words from
+        rng = random.Random that picks the first word and breaks ties
+        max_width, max_height = if not None, the most cells wide/tall the crosswords can be
+        min_length, max_length = lengths of the pool words to use
+        anchors_per_step = open anchors to look at for each word added
+    """
+    def __init__(self, index, rng=None, max_width=None, max_height=None, min_length=3, max_length=None,
+            anchors_per_step=ANCHORS_PER_STEP):
+        self.index = index
+        self.rng = rng if rng is not None else random.Random()
+        self.max_width = max_width
+        self.max_height = max_height
+        max_length = max_length or max(index.lengths, default=0)
+        self.word_lengths = [length for length in sorted(index.lengths) if min_length <= length <= max_length]
+        self.anchors_per_step = anchors_per_step
+
+    def fill(self, size, initial_grid=None, deadline=None):
+        """Return a grid.Grid of size words, starting from a random word (or initial_grid, whose words are kept
+        where they are), or None if it got stuck or deadline (a time.monotonic() value) passed first"""
+        if initial_grid is not None:
+            this_grid = initial_grid.copy()
+        else:
+            this_grid = grid.Grid(self.max_width, self.max_height)
+            first_word = self.get_first_word()
+            if first_word is None:
+                return None
+            this_grid.add_word(first_word, 0, 0, grid.EAST)
+        while len(this_grid.words) < size:
+            if deadline is not None and time.monotonic() > deadline:
+                return None
+            placement = self.choose_next_word(this_grid)
+            if placement is None:
+                return None
+            this_grid.add_word(*placement)
+        return this_grid
+
+    def get_first_word(self):
+        """Return a random word from the longer half of the lengths allowed, since long words leave more anchors"""
+        lengths = [length for length in self.word_lengths if self.fits(length, 1) or self.fits(1, length)]
+        lengths = lengths[len(lengths) // 2:]
+        if len(lengths) == 0:
+            return None
+        word_ids = self.index.lengths[self.rng.choice(lengths)]
+        word = self.index.get_word(self.rng.choice(word_ids))
+        return word if self.fits(len(word), 1) else None
+
+    def fits(self, width, height):
+        return (self.max_width is None or width <= self.max_width) and (self.max_height is None or height <= self.max_height)
+
+    def get_anchors(self, this_grid):
+        """Return the (x, y, orientation) of every open anchor of this_grid: cells that only one word goes through,
+        with the orientation of a word that would cross it"""
+        anchors = []
+        for word, data in this_grid.words.items():
+            (x, y) = data["coords"]
+            (dx, dy) = data["orientation"]
+            orientation = grid.switch_orientation(data["orientation"])
+            for i in range(len(word)):
+                if this_grid.counts[(x + dx * i, y + dy * i)] == 1:
+                    anchors.append((x + dx * i, y + dy * i, orientation))
+        return anchors
+
+    def get_slots(self, this_grid, anchor):
+        """Return a list of (crossings, growth, length, x, y, constraints) for every slot through anchor that a word
+        could go in without touching anything it doesn't cross, where constraints are the (position, letter) pairs
+        of the letters already on the slot's path"""
+        (ax, ay, orientation) = anchor
+        (dx, dy) = orientation
+        ((nx1, ny1), (nx2, ny2)) = grid.normal(orientation)
+        index = this_grid.index
+        (width, height) = this_grid.get_size()
+        slots = []
+        for length in self.word_lengths:
+            for offset in range(length):
+                (x, y) = (ax - dx * offset, ay - dy * offset)
+                (end_x, end_y) = (x + dx * (length - 1), y + dy * (length - 1))
+                if (x - dx, y - dy) in index or (end_x + dx, end_y + dy) in index:
+                    continue
+                (new_width, new_height) = this_grid.get_size_with(x, y, end_x, end_y)
+                if not self.fits(new_width, new_height):
+                    continue
+                constraints = []
+                (px, py) = (x, y)
+                for position in range(length):
+                    letter = index.get((px, py))
+                    if letter is not None:
+                        constraints.append((position, letter))
+                    elif (px + nx1, py + ny1) in index or (px + nx2, py + ny2) in index:
+                        break
+                    px += dx
+                    py += dy
+                else:
+                    growth = new_width * new_height - width * height
+                    slots.append((len(constraints), growth, length, x, y, constraints))
+        return slots
+
+    def choose_next_word(self, this_grid):
+        """Return a (word, x, y, orientation) placement of a pool word that isn't in this_grid yet, crossing as many
+        of its letters as possible, or None if none of the anchors looked at have anything that fits"""
+        anchors = self.get_anchors(this_grid)
+        self.rng.shuffle(anchors)
+        for start in range(0, len(anchors), self.anchors_per_step): # only look further if the first anchors are stuck
+            slots = []
+            for anchor in anchors[start:start+self.anchors_per_step]:
+                slots.extend((slot, anchor[2]) for slot in self.get_slots(this_grid, anchor))
+            self.rng.shuffle(slots) # so that sorting breaks ties randomly
+            slots.sort(key=lambda item: (-item[0][0], item[0][1]))
+            for (crossings, growth, length, x, y, constraints), orientation in slots:
+                placement = self.fill_slot(this_grid, length, x, y, orientation, constraints)
+                if placement is not None:
+                    return placement
+        return None
+
+    def fill_slot(self, this_grid, length, x, y, orientation, constraints):
+        """Return a placement of a random word that fits the slot, or None if the few tried don't"""
+        word_ids = self.index.match(length, constraints)
+        for i in range(min(CANDIDATES_PER_SLOT, len(word_ids))):
+            word = self.index.get_word(word_ids[self.rng.randrange(len(word_ids))])
+            if word not in this_grid.words and this_grid.can_add_word(word, x, y, orientation):
+                return (word, x, y, orientation)
+        return None
+
+def fill_crosswords(index, size, max=10, seed=None, timeout=None, max_width=None, max_height=None, min_length=3,
+        max_length=None, initial_grid=None, attempts=None):
+    """Return a list of up to max (score, crossword_grid) tuples, sorted by score, each with size words from index
+
+    Stops early once timeout seconds have passed, or after attempts fills (default: 10 per crossword asked for)."""
+    rng = random.Random(seed)
+    filler = PoolFiller(index, rng=rng, max_width=max_width, max_height=max_height, min_length=min_length,
+            max_length=max_length)
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    attempts = attempts if attempts is not None else 10 * max
+    crosswords = []
+    seen = set()
+    for attempt in range(attempts):
+        if len(crosswords) == max or deadline is not None and time.monotonic() > deadline:
+            break
+        crossword = filler.fill(size, initial_grid=initial_grid, deadline=deadline)
+        if crossword is None:
+            continue
+        key = crossword.get_canonical_key(True)
+        if key in seen:
+            continue
+        seen.add(key)
+        crosswords.append((pretty.be_judgmental(crossword), crossword))
+    return sorted(crosswords, key=lambda x: x[0], reverse=True)
+
+def main():
+    import tempfile
+    from crossgen import scaling
+    words = [word.upper() for name in scaling.list_corpora() for word in scaling.load_corpus(name)]
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "pool.xgpl")
+        build_index(words, path)
+        index = PoolIndex(path)
+        for score, crossword in fill_crosswords(index, 12, max=3, seed=0):
+            print(f"score: {score:.2f}")
+            print(crossword)
+            print()
+        index.close()
+
+if __name__ == "__main__":
+    main()
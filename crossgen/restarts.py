@@ -0,0 +1,82 @@
+"""Restart policies for create_crosswords.
+
+Because the search is a DFS, the results within one run tend to be near-duplicates of each other,
+so generation periodically restarts from the root in a new random order.
+
+Interface:
+    + persistent: if False, every run is a brand new walker.CrosswordTreeSearch that stops after
+        `batch` results (the original behaviour); if True, one search is kept for the whole generation,
+        together with its transposition table, and restarted with CrosswordTreeSearch.restart()
+    + next_run(): dict of keyword arguments for CrosswordTreeSearch.search for the next run
+"""
+
+def luby(i):
+    """Return the i-th (1-indexed) term of the Luby sequence: 1, 1, 2, 1, 1, 2, 4, 1, 1, 2, 1, 1, 2, 4, 8, ..."""
+    k = 1
+    while (1 << k) - 1 < i:
+        k += 1
+    while i != (1 << k) - 1:
+        i -= (1 << (k - 1)) - 1
+        k = 1
+        while (1 << k) - 1 < i:
+            k += 1
+    return 1 << (k - 1)
+
+class BatchRestarts:
+    """Restart from scratch after every `batch` results (batch size is handled by create_crosswords)"""
+    persistent = False
+
+    def next_run(self):
+        return {}
+
+class LubyRestarts:
+    """Restart after unit * luby(i) nodes on the i-th run, which is within a log factor of the best
+    fixed restart interval without having to know it in advance"""
+    persistent = True
+
+    def __init__(self, unit=200):
+        self.unit = unit
+        self.runs = 0
+
+    def next_run(self):
+        self.runs += 1
+        return {"node_limit" : self.unit * luby(self.runs)}
+
+class RandomRestarts:
+    """Restart in a new random order after every `nodes` nodes"""
+    persistent = True
+
+    def __init__(self, nodes=1000):
+        self.nodes = nodes
+
+    def next_run(self):
+        return {"node_limit" : self.nodes}
+
+class DiscrepancyRestarts:
+    """Limited discrepancy search: the k-th run (from 0) only follows paths that deviate from the
+    preferred child at most k times, so results that differ early in the search come first; every run
+    tries the children of each node in the same order (see walker.CrosswordTreeSearch.search)"""
+    persistent = True
+
+    def __init__(self):
+        self.runs = 0
+
+    def next_run(self):
+        self.runs += 1
+        return {"max_discrepancies" : self.runs - 1}
+
+restart_policies = {
+    "batch" : BatchRestarts,
+    "luby" : LubyRestarts,
+    "random" : RandomRestarts,
+    "lds" : DiscrepancyRestarts,
+}
+
+def make_restarts(name, nodes=None):
+    """Return a new restart policy from its name in restart_policies, with nodes as the node count of the 'random'
+    policy or the unit of the 'luby' one (if not None)"""
+    if nodes is not None and name == "luby":
+        return LubyRestarts(unit=nodes)
+    if nodes is not None and name == "random":
+        return RandomRestarts(nodes=nodes)
+    return restart_policies[name]()
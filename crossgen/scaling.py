@@ -0,0 +1,185 @@
+"""End-to-end scaling benchmarks for crossword generation over word-list size.
+
+Run with `python -m crossgen.scaling`. For each word-list size, engine and configuration, runs
+generation under a fixed seed and deadline and records:
+
+- time to first result, results/sec and nodes/sec
+- peak traced memory (via tracemalloc, which also slows the run down somewhat)
+- best score
+
+Word lists are either generated deterministically (with controlled length distribution and letter
+overlap) or taken from one of the bundled corpora in crossgen/corpora. The report can be written
+as CSV and/or JSON, to compare across commits.
+"""
+
+import argparse
+import contextlib
+import csv
+import io
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+from crossgen import command
+
+LETTER_FREQUENCY_ORDER = "ETAOINSHRDLCUMWFGYPBVKJXQZ"
+
+CORPORA_DIR = os.path.join(os.path.dirname(__file__), "corpora")
+
+def generate_word_list(size, seed=0, min_length=3, max_length=10, overlap=0.5):
+    """Return a deterministic list of size distinct random words
+
+    Word lengths are uniform between min_length and max_length. overlap (0 to 1) controls how many
+    letters words have in common: at 0, letters come from the whole alphabet, and at 1, only from
+    the 4 most common letters.
+    """
+    alphabet = LETTER_FREQUENCY_ORDER[:max(4, round(26 - overlap * 22))]
+    rng = random.Random(seed)
+    words = []
+    seen = set()
+    while len(words) < size:
+        word = "".join(rng.choice(alphabet) for i in range(rng.randint(min_length, max_length)))
+        if word not in seen:
+            seen.add(word)
+            words.append(word)
+    return words
+
+def list_corpora():
+    return sorted(name[:-len(".txt")] for name in os.listdir(CORPORA_DIR) if name.endswith(".txt"))
+
+def load_corpus(name, size=None, seed=0):
+    """Return size words picked from the bundled corpus with the given name (all of them if size is None)"""
+    with open(os.path.join(CORPORA_DIR, name + ".txt"), "r", encoding="utf-8") as infile:
+        words = [line.strip() for line in infile if line.strip()]
+    if size is not None:
+        if size > len(words):
+            raise ValueError(f"corpus '{name}' only has {len(words)} words")
+        words = random.Random(seed).sample(words, size)
+    return words
+
+def run_walker(words, config, seed, timeout):
+    """Engine that runs command.create_crosswords; config is a dict of extra keyword arguments for it
+
+    Returns (crosswords, stats, time to first result)."""
+    first_result_time = None
+    start_time = time.perf_counter()
+    def progress_callback(num_done):
+        nonlocal first_result_time
+        if num_done > 0 and first_result_time is None:
+            first_result_time = time.perf_counter() - start_time
+    stats = {}
+    kwargs = {"max" : None, "no_progress_timeout" : -1, "seed" : seed}
+    kwargs.update(config)
+    crosswords = command.create_crosswords(list(words), progress_callback=progress_callback,
+            stats=stats, timeout=timeout, **kwargs)
+    return (crosswords, stats, first_result_time)
+
+engines = {
+    "walker" : run_walker,
+}
+
+def run_one(words, engine, config, seed, timeout):
+    """Run a single benchmark and return its result dict"""
+    with contextlib.redirect_stderr(io.StringIO()): # create_crosswords reports progress on stderr
+        tracemalloc.start()
+        start_time = time.perf_counter()
+        try:
+            (crosswords, stats, first_result_time) = engines[engine](words, config, seed, timeout)
+            elapsed = time.perf_counter() - start_time
+            (_, peak_memory) = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    return {
+        "engine" : engine,
+        "config" : ",".join(f"{key}={value}" for key, value in sorted(config.items())),
+        "words" : len(words),
+        "seed" : seed,
+        "timeout" : timeout,
+        "elapsed" : elapsed,
+        "results" : len(crosswords),
+        "time_to_first_result" : first_result_time,
+        "results_per_second" : len(crosswords) / elapsed if elapsed > 0 else 0.0,
+        "nodes_per_second" : stats.get("nodes_per_second", 0.0),
+        "peak_memory" : peak_memory,
+        "best_score" : crosswords[0][0] if len(crosswords) > 0 else None,
+    }
+
+def run_scaling(sizes, engine_names=("walker",), configs=({},), seed=0, timeout=10.0,
+        corpus=None, min_length=3, max_length=10, overlap=0.5, out=sys.stdout):
+    """Run every combination of size, engine and config, and return a list of result dicts"""
+    results = []
+    for size in sizes:
+        if corpus is not None:
+            words = load_corpus(corpus, size, seed=seed)
+        else:
+            words = generate_word_list(size, seed=seed, min_length=min_length, max_length=max_length, overlap=overlap)
+        for engine in engine_names:
+            for config in configs:
+                result = run_one(words, engine, config, seed, timeout)
+                results.append(result)
+                first = result["time_to_first_result"]
+                first_str = f"{first:.3f}s" if first is not None else "-"
+                print(f"{engine:10} {result['config']:20} {size:5} words: {result['results']:6} results, "
+                        f"first {first_str}, {result['results_per_second']:.1f} results/s, "
+                        f"{result['nodes_per_second']:.0f} nodes/s, peak {result['peak_memory'] / 1e6:.1f} MB, "
+                        f"best {result['best_score']}", file=out)
+    return results
+
+def parse_config(text):
+    """Parse "key=value,key=value" into a dict, converting values that look like ints/floats/bools"""
+    config = {}
+    for item in text.split(","):
+        if not item:
+            continue
+        (key, value) = item.split("=", 1)
+        for convert in (int, float):
+            try:
+                value = convert(value)
+                break
+            except ValueError:
+                pass
+        else:
+            if value in ("True", "False"):
+                value = value == "True"
+        config[key] = value
+    return config
+
+def main():
+    parser = argparse.ArgumentParser(description="Scaling benchmarks for crossword generation over word-list size",
+            formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument("--sizes", metavar="N,N,...", default="5,10,20,50,100,200", help="word-list sizes to run")
+    parser.add_argument("-e", "--engine", metavar="NAME", action="append", choices=sorted(engines), help="engine to run (can be repeated; default: all)")
+    parser.add_argument("-c", "--config", metavar="KEY=VALUE,...", action="append", help="create_crosswords keyword arguments for one configuration (can be repeated)")
+    parser.add_argument("-s", "--seed", metavar="INT", default=0, type=int, help="seed for word lists and generation")
+    parser.add_argument("-t", "--timeout", metavar="SECONDS", default=10.0, type=float, help="deadline for each run")
+    parser.add_argument("--corpus", metavar="NAME", default=None, choices=list_corpora(), help="take words from this bundled corpus instead of generating them")
+    parser.add_argument("--min-length", metavar="INT", default=3, type=int, help="minimum generated word length")
+    parser.add_argument("--max-length", metavar="INT", default=10, type=int, help="maximum generated word length")
+    parser.add_argument("--overlap", metavar="FRACTION", default=0.5, type=float, help="letter overlap between generated words, from 0 (whole alphabet) to 1 (4 letters)")
+    parser.add_argument("--label", metavar="TEXT", default="", help="label to add to every result, e.g. a commit id")
+    parser.add_argument("--csv", metavar="PATH", default=None, help="write the report to this path as CSV")
+    parser.add_argument("--json", metavar="PATH", default=None, help="write the report to this path as JSON")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    engine_names = args.engine or sorted(engines)
+    configs = [parse_config(text) for text in args.config] if args.config else [{}]
+    results = run_scaling(sizes, engine_names, configs, seed=args.seed, timeout=args.timeout, corpus=args.corpus,
+            min_length=args.min_length, max_length=args.max_length, overlap=args.overlap)
+    for result in results:
+        result["label"] = args.label
+
+    if args.csv is not None and len(results) > 0:
+        with open(args.csv, "w", newline="", encoding="utf-8") as outfile:
+            writer = csv.DictWriter(outfile, fieldnames=list(results[0]))
+            writer.writeheader()
+            writer.writerows(results)
+    if args.json is not None:
+        with open(args.json, "w", encoding="utf-8") as outfile:
+            json.dump(results, outfile, indent=2)
+
+if __name__ == "__main__":
+    main()
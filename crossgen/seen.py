@@ -0,0 +1,133 @@
+"""Memory-bounded sets of already-seen crosswords, for deduplicating very long runs.
+
+Crosswords are identified by canonical_hash(), a stable 64-bit hash of grid.Grid.get_canonical_key,
+so the same layout hashes the same way in every process. Two backends share the same interface:
+
+- ExactSeenSet: open-addressing hash set packed into an array of 64-bit ints (roughly 10-20 bytes per hash)
+- BloomSeenSet: scalable Bloom filter with a configurable false positive rate (a couple of bytes per hash);
+  a false positive means a genuinely new crossword gets mistaken for a duplicate and skipped
+
+Interface:
+    + add(h): True if h was not in the set yet (and adds it), False otherwise
+    + __contains__(h)
+    + __len__(): number of hashes added
+"""
+
+import array
+import hashlib
+import math
+
+def canonical_hash(key):
+    """Return a nonzero 64-bit int hash of a canonical key that is stable across processes
+
+    (unlike hash(), which is salted per process for strings)"""
+    digest = hashlib.blake2b(repr(key).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little") or 1
+
+class ExactSeenSet:
+    """Linear-probing hash set of nonzero 64-bit hashes; 0 marks an empty slot"""
+    def __init__(self, capacity=1024, max_load=0.75):
+        size = 1
+        while size * max_load < capacity:
+            size *= 2
+        self.max_load = max_load
+        self.table = array.array("Q", bytes(8 * size))
+        self.mask = size - 1
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, h):
+        table = self.table
+        mask = self.mask
+        i = h & mask
+        while table[i] != 0:
+            if table[i] == h:
+                return True
+            i = (i + 1) & mask
+        return False
+
+    def add(self, h):
+        table = self.table
+        mask = self.mask
+        i = h & mask
+        while table[i] != 0:
+            if table[i] == h:
+                return False
+            i = (i + 1) & mask
+        table[i] = h
+        self.count += 1
+        if self.count > len(table) * self.max_load:
+            self._grow()
+        return True
+
+    def _grow(self):
+        old_table = self.table
+        self.table = array.array("Q", bytes(16 * len(old_table)))
+        self.mask = len(self.table) - 1
+        self.count = 0
+        for h in old_table:
+            if h != 0:
+                self.add(h)
+
+class BloomSeenSet:
+    """Scalable Bloom filter: once a filter is full, a bigger one with a tighter error rate is added,
+    so the overall false positive rate stays below error_rate however many hashes are added"""
+    def __init__(self, error_rate=0.001, capacity=4096):
+        self.error_rate = error_rate
+        self.filters = []
+        self.count = 0
+        self._add_filter(capacity, error_rate / 2)
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, h):
+        return any(self._filter_contains(bloom, h) for bloom in self.filters)
+
+    def add(self, h):
+        if h in self:
+            return False
+        bloom = self.filters[-1]
+        if bloom["count"] >= bloom["capacity"]:
+            bloom = self._add_filter(bloom["capacity"] * 2, bloom["error_rate"] / 2)
+        bits = bloom["bits"]
+        for i in self._bit_indices(bloom, h):
+            bits[i >> 3] |= 1 << (i & 7)
+        bloom["count"] += 1
+        self.count += 1
+        return True
+
+    def _add_filter(self, capacity, error_rate):
+        num_bits = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        num_hashes = max(1, round(num_bits / capacity * math.log(2)))
+        bloom = {
+            "bits" : bytearray((num_bits + 7) // 8),
+            "num_bits" : num_bits,
+            "num_hashes" : num_hashes,
+            "capacity" : capacity,
+            "error_rate" : error_rate,
+            "count" : 0,
+        }
+        self.filters.append(bloom)
+        return bloom
+
+    def _filter_contains(self, bloom, h):
+        bits = bloom["bits"]
+        for i in self._bit_indices(bloom, h):
+            if not bits[i >> 3] & (1 << (i & 7)):
+                return False
+        return True
+
+    def _bit_indices(self, bloom, h):
+        """Double hashing: derive the filter's k bit indices from the two halves of the 64-bit hash"""
+        h1 = h & 0xFFFFFFFF
+        h2 = (h >> 32) | 1
+        num_bits = bloom["num_bits"]
+        return [(h1 + i * h2) % num_bits for i in range(bloom["num_hashes"])]
+
+seen_set_types = {
+    "exact" : ExactSeenSet,
+    "bloom" : BloomSeenSet,
+}
@@ -0,0 +1,232 @@
+"""Local HTTP service for generating crosswords, so that callers don't pay Python startup on every request.
+
+Requests are handed to a persistent pool of worker processes, which import everything up front, so each
+request only pays for the search itself. At most workers + queue_size requests are accepted at once;
+any more get a 503 straight away rather than piling up.
+
+Endpoints:
+    POST /generate: body is a JSON object with
+        words = list of words (required)
+        max, batch, seed, max_width, max_height, exhaustive, keep_transposes, top_up, warm_start = as for the create command
+        timeout = seconds allowed for the request, including time spent waiting in the queue;
+            capped to the server's max_timeout
+        format = "json" (default) or "jsonl"
+    responds with the crosswords in the compact placement format (see crossgen.compact):
+        json: {"words" : [...], "crosswords" : [{"score" : ..., "placements" : [...]}, ...], "stats" : {...}}
+        jsonl: a {"words" : [...]} header line, then one line per crossword, as written by compact.JsonlWriter
+    GET /health: {"workers" : ..., "active" : ..., "capacity" : ...}
+
+Run with `crossgenc serve`; tests/test_server.py puts it under load to check the queue limits.
+"""
+
+import concurrent.futures
+import contextlib
+import http.server
+import io
+import json
+import logging
+import threading
+import time
+
+from crossgen import compact
+
+MAX_BODY_SIZE = 1 << 20
+"""Largest request body accepted, in bytes"""
+
+GRACE_PERIOD = 2.0
+"""Seconds past a request's deadline to wait for its worker before giving up on it"""
+
+OPTIONS = {
+    "max" : int,
+    "batch" : int,
+    "seed" : int,
+    "max_width" : int,
+    "max_height" : int,
+    "exhaustive" : bool,
+    "keep_transposes" : bool,
+    "top_up" : bool,
+    "warm_start" : bool,
+}
+"""Request fields passed on to create_crosswords, and their types"""
+
+class RequestError(Exception):
+    """Raised for requests that should get a 4xx/5xx response; status is the HTTP status code"""
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+def _warm_up():
+    """Worker initializer: import the search modules now, rather than during the first request"""
+    from crossgen import command
+    from crossgen import walker
+
+def _generate(words, options, deadline, cache_dir=None):
+    """Run create_crosswords in a worker process and return (crosswords, stats) in compact form
+
+    deadline is a time.time() value (which, unlike time.monotonic(), is the same in every process).
+    cache_dir is the directory of a cache.ResultCache to use, if any."""
+    from crossgen import command
+    from crossgen.cache import ResultCache
+    timeout = deadline - time.time()
+    if timeout <= 0:
+        return None # expired while waiting in the queue
+    options = dict(options)
+    dedupe_transposes = not options.pop("keep_transposes", False)
+    if cache_dir is not None:
+        options["cache"] = ResultCache(cache_dir)
+    stats = {}
+    with contextlib.redirect_stderr(io.StringIO()): # create_crosswords reports progress on stderr
+        crosswords = command.create_crosswords(list(words), timeout=timeout, stats=stats,
+                dedupe_transposes=dedupe_transposes, **options)
+    word_ids = compact.get_word_ids([word.upper().replace(" ", "") for word in words])
+    return ([compact.to_json(score, crossword, word_ids) for score, crossword in crosswords], stats)
+
+class CrosswordServer(http.server.ThreadingHTTPServer):
+    """HTTP server with a pool of worker processes
+
+    Attributes:
+        pool = concurrent.futures.ProcessPoolExecutor that runs the searches
+        workers = number of worker processes
+        capacity = number of requests that can be accepted at once (running or queued)
+        slots = semaphore with one slot per request that can be accepted; a slot is only given back once the worker
+            is done with the request, even if the request has already timed out, since a running worker can't be stopped
+        active = number of requests accepted and not yet answered
+        default_timeout, max_timeout = request timeout when none is given, and the most allowed
+        cache_dir = directory of the cache.ResultCache shared by the workers, or None for no caching
+    """
+    daemon_threads = True
+
+    def __init__(self, address, workers=2, queue_size=8, default_timeout=5.0, max_timeout=30.0, cache_dir=None):
+        super().__init__(address, CrosswordRequestHandler)
+        self.workers = workers
+        self.capacity = workers + queue_size
+        self.slots = threading.BoundedSemaphore(self.capacity)
+        self.active = 0
+        self.active_lock = threading.Lock()
+        self.default_timeout = default_timeout
+        self.max_timeout = max_timeout
+        self.cache_dir = cache_dir
+        self.pool = concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=_warm_up)
+        for future in [self.pool.submit(_warm_up) for i in range(workers)]: # start every worker now
+            future.result()
+
+    def generate(self, request):
+        """Run a /generate request and return (words, crosswords, stats), or raise RequestError"""
+        (words, options, timeout) = parse_request(request, self.default_timeout, self.max_timeout)
+        deadline = time.time() + timeout
+        if not self.slots.acquire(blocking=False):
+            raise RequestError(503, "too many requests queued")
+        with self.active_lock:
+            self.active += 1
+        try:
+            try:
+                future = self.pool.submit(_generate, words, options, deadline, self.cache_dir)
+            except BaseException:
+                self.slots.release()
+                raise
+            future.add_done_callback(lambda future: self.slots.release())
+            try:
+                result = future.result(timeout=deadline - time.time() + GRACE_PERIOD)
+            except concurrent.futures.TimeoutError:
+                future.cancel() # only works if it hasn't started; otherwise its slot stays taken until it's done
+                raise RequestError(504, "request timed out")
+            except Exception as e:
+                logging.exception("generating crosswords failed")
+                raise RequestError(500, f"generating crosswords failed: {e}") from e
+            if result is None:
+                raise RequestError(504, "request timed out while queued")
+            (crosswords, stats) = result
+            return (words, crosswords, stats)
+        finally:
+            with self.active_lock:
+                self.active -= 1
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+def parse_request(request, default_timeout, max_timeout):
+    """Return (words, create_crosswords options, timeout) for a /generate request body, or raise RequestError"""
+    if not isinstance(request, dict):
+        raise RequestError(400, "request must be a JSON object")
+    words = request.get("words")
+    if not isinstance(words, list) or len(words) == 0 or not all(isinstance(word, str) for word in words):
+        raise RequestError(400, "'words' must be a non-empty list of strings")
+    options = {}
+    for key, kind in OPTIONS.items():
+        if request.get(key) is not None:
+            if not isinstance(request[key], kind) or kind is int and isinstance(request[key], bool):
+                raise RequestError(400, f"'{key}' must be of type {kind.__name__}")
+            options[key] = request[key]
+    timeout = request.get("timeout", default_timeout)
+    if not isinstance(timeout, (int, float)) or timeout <= 0:
+        raise RequestError(400, "'timeout' must be a positive number")
+    return (words, options, min(timeout, max_timeout))
+
+class CrosswordRequestHandler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != "/health":
+            self.send_json(404, {"error" : "not found"})
+            return
+        server = self.server
+        self.send_json(200, {"workers" : server.workers, "active" : server.active, "capacity" : server.capacity})
+
+    def do_POST(self):
+        if self.path != "/generate":
+            self.send_json(404, {"error" : "not found"})
+            return
+        try:
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+            except ValueError:
+                raise RequestError(400, "invalid Content-Length")
+            if length < 0:
+                raise RequestError(400, "invalid Content-Length")
+            if length > MAX_BODY_SIZE:
+                raise RequestError(413, "request body too large")
+            try:
+                request = json.loads(self.rfile.read(length))
+            except ValueError:
+                raise RequestError(400, "request body is not valid JSON")
+            output_format = request.get("format", "json") if isinstance(request, dict) else "json"
+            if output_format not in ("json", "jsonl"):
+                raise RequestError(400, "'format' must be 'json' or 'jsonl'")
+            (words, crosswords, stats) = self.server.generate(request)
+        except RequestError as e:
+            self.send_json(e.status, {"error" : str(e)})
+            return
+
+        words = [word.upper().replace(" ", "") for word in words]
+        if output_format == "jsonl":
+            lines = [{"words" : words}] + crosswords
+            body = "".join(json.dumps(line, separators=(",", ":")) + "\n" for line in lines)
+            self.send_body(200, body.encode("utf-8"), "application/x-ndjson")
+        else:
+            self.send_json(200, {"words" : words, "crosswords" : crosswords, "stats" : stats})
+
+    def send_json(self, status, obj):
+        self.send_body(status, json.dumps(obj, separators=(",", ":")).encode("utf-8"), "application/json")
+
+    def send_body(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if status == 503:
+            self.send_header("Retry-After", "1")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logging.debug("%s - %s", self.address_string(), format % args)
+
+def serve(host="127.0.0.1", port=8080, workers=2, queue_size=8, default_timeout=5.0, max_timeout=30.0, cache_dir=None):
+    """Run a CrosswordServer until interrupted"""
+    server = CrosswordServer((host, port), workers=workers, queue_size=queue_size,
+            default_timeout=default_timeout, max_timeout=max_timeout, cache_dir=cache_dir)
+    logging.info(f"serving on http://{host}:{server.server_address[1]} with {workers} workers")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
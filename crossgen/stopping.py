@@ -0,0 +1,127 @@
+"""Rules for deciding when create_crosswords should stop looking for more crosswords.
+
+Interface:
+    + observe(is_new): called for every crossword the search finds, with whether it was new or a duplicate
+    + end_batch(found_new): called after every batch, with whether the batch found anything new
+    + should_stop(): True once generation should stop
+    + report(): dict of statistics to include in the create_crosswords stats
+"""
+
+import collections
+import math
+import time
+
+class DroughtStopping:
+    """Stop once no_progress_timeout batches in a row produce nothing new; -1 means never"""
+    def __init__(self, no_progress_timeout=5):
+        self.no_progress_timeout = no_progress_timeout
+        self.drought_count = 0
+
+    def observe(self, is_new):
+        pass
+
+    def end_batch(self, found_new):
+        if found_new:
+            self.drought_count = 0
+        else:
+            self.drought_count += 1
+
+    def should_stop(self):
+        return self.drought_count == self.no_progress_timeout # use == so that -1 timeout means no timeout
+
+    def report(self):
+        return {"drought_count" : self.drought_count}
+
+class CoverageStopping:
+    """Stop once the expected number of new crosswords per second drops below min_rate
+
+    The last `window` crosswords found are used to estimate the chance that the next one is new.
+    Its complement estimates the coverage, i.e. the fraction of the (sampled) solution space seen
+    so far, in the spirit of Good-Turing/capture-recapture estimates, and dividing the number of
+    distinct crosswords by it estimates how many distinct layouts there are in total.
+    The expected gain per second is the number of new crosswords in the window divided by the
+    time since the window started, so it also drops while the search finds nothing at all.
+    """
+    def __init__(self, min_rate=1.0, window=100, min_samples=20):
+        self.min_rate = min_rate
+        self.min_samples = min_samples
+        self.window = collections.deque(maxlen=window)
+        self.start_time = time.monotonic()
+        self.samples = 0
+        self.distinct = 0
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["saved_at"] = time.monotonic()
+        return state
+
+    def __setstate__(self, state):
+        # monotonic() values mean nothing in another process, so shift them as if no time passed while stopped
+        shift = time.monotonic() - state.pop("saved_at")
+        self.__dict__.update(state)
+        self.start_time += shift
+        self.window = collections.deque(((t + shift, is_new) for t, is_new in self.window), maxlen=self.window.maxlen)
+
+    def observe(self, is_new):
+        self.window.append((time.monotonic(), is_new))
+        self.samples += 1
+        if is_new:
+            self.distinct += 1
+
+    def end_batch(self, found_new):
+        pass
+
+    def get_new_fraction(self):
+        """Estimated probability that the next crossword found is new"""
+        if len(self.window) == 0:
+            return 1.0
+        return sum(1 for t, is_new in self.window if is_new) / len(self.window)
+
+    def get_coverage(self):
+        return 1.0 - self.get_new_fraction()
+
+    def get_estimated_total(self):
+        coverage = self.get_coverage()
+        return self.distinct / coverage if coverage > 0 else math.inf
+
+    def get_gain_rate(self):
+        """Expected new crosswords per second"""
+        if len(self.window) == 0:
+            return math.inf
+        window_start = self.window[0][0] if len(self.window) == self.window.maxlen else self.start_time
+        elapsed = time.monotonic() - window_start
+        new_count = sum(1 for t, is_new in self.window if is_new)
+        return new_count / elapsed if elapsed > 0 else math.inf
+
+    def should_stop(self):
+        return self.samples >= self.min_samples and self.get_gain_rate() < self.min_rate
+
+    def report(self):
+        return {
+            "coverage" : self.get_coverage(),
+            "estimated_total" : self.get_estimated_total(),
+            "gain_rate" : self.get_gain_rate(),
+            "samples" : self.samples,
+        }
+
+class AnyStopping:
+    """Stop as soon as any of rules would"""
+    def __init__(self, *rules):
+        self.rules = rules
+
+    def observe(self, is_new):
+        for rule in self.rules:
+            rule.observe(is_new)
+
+    def end_batch(self, found_new):
+        for rule in self.rules:
+            rule.end_batch(found_new)
+
+    def should_stop(self):
+        return any(rule.should_stop() for rule in self.rules)
+
+    def report(self):
+        report = {}
+        for rule in self.rules:
+            report.update(rule.report())
+        return report
@@ -0,0 +1,135 @@
+"""On-disk store of generated crosswords, for runs too large to keep in memory.
+
+The file uses the binary form from crossgen.compact, i.e. a header with the word list followed
+by fixed-width (score, packed placements) records. Records are appended as they are generated,
+and queries go through an mmap of the file, so only the records that are actually asked for
+get turned back into grid.Grids.
+
+Reopening an existing file resumes it: new records are appended after the old ones.
+"""
+
+import heapq
+import mmap
+import os
+import random
+
+from crossgen import compact
+
+class ResultStore:
+    """Append-only store of (score, crossword_grid) records backed by a file
+
+    Attributes:
+        path = path of the backing file
+        words = word list shared by every crossword in the store
+        record_size = size of each record in bytes
+        offset = size of the header in bytes, i.e. where the first record starts
+    """
+    def __init__(self, path, words=None):
+        """Open the store at path, creating it if it doesn't exist yet
+
+        words can be omitted when reopening an existing store; if it is given,
+        it has to match the word list the store was created with.
+        """
+        self.path = path
+        self._mmap = None
+        self._mapped_size = 0
+
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            with open(path, "rb") as infile:
+                stored_words = compact.read_header(infile)
+                self.offset = infile.tell()
+            if words is not None and list(words) != stored_words:
+                raise ValueError(f"{path} was created for a different word list: {stored_words}")
+            self.words = stored_words
+            self._file = open(path, "r+b")
+            self.record_size = compact.get_record_size(self.words)
+            self.count = (os.path.getsize(path) - self.offset) // self.record_size
+            # drop any partial record left behind by an interrupted write
+            self._file.truncate(self.offset + self.count * self.record_size)
+            self._file.seek(0, os.SEEK_END)
+        else:
+            if words is None:
+                raise ValueError(f"need a word list to create a new store at {path}")
+            self.words = list(words)
+            self._file = open(path, "w+b")
+            header = compact.pack_header(self.words)
+            self._file.write(header)
+            self.offset = len(header)
+            self.record_size = compact.get_record_size(self.words)
+            self.count = 0
+
+        self.word_ids = compact.get_word_ids(self.words)
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        for i in range(self.count):
+            yield self[i]
+
+    def __getitem__(self, i):
+        """Return the i-th (score, crossword_grid) record"""
+        if i < 0:
+            i += self.count
+        if not 0 <= i < self.count:
+            raise IndexError(f"record {i} out of range")
+        start = self._record_offset(i)
+        view = memoryview(self._view())[start:start+self.record_size]
+        return compact.unpack_record(view, self.words)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def append(self, score, crossword):
+        self._file.write(compact.pack_record(score, crossword, self.word_ids))
+        self.count += 1
+
+    def score(self, i):
+        """Return the score of the i-th record without decoding its grid"""
+        return compact.SCORE.unpack_from(self._view(), self._record_offset(i))[0]
+
+    def top_k(self, k=None):
+        """Return the k best (score, crossword_grid) records in descending order by score
+
+        Scores are read directly out of the mmap, so only the k returned records get decoded.
+        If k is None, return all of them.
+        """
+        view = self._view()
+        score_at = compact.SCORE.unpack_from
+        indices = range(self.count)
+        key = lambda i: score_at(view, self._record_offset(i))[0]
+        if k is None:
+            best = sorted(indices, key=key, reverse=True)
+        else:
+            best = heapq.nlargest(k, indices, key=key)
+        return [self[i] for i in best]
+
+    def sample(self, k, rng=random):
+        """Return k (score, crossword_grid) records chosen uniformly at random"""
+        return [self[i] for i in rng.sample(range(self.count), min(k, self.count))]
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        self._file.close()
+
+    def _record_offset(self, i):
+        return self.offset + i * self.record_size
+
+    def _view(self):
+        """Return an mmap covering every record appended so far, remapping if the file has grown"""
+        size = self._record_offset(self.count)
+        if self._mmap is None or self._mapped_size < size:
+            self._file.flush()
+            if self._mmap is not None:
+                self._mmap.close()
+            self._mmap = mmap.mmap(self._file.fileno(), size, access=mmap.ACCESS_READ)
+            self._mapped_size = size
+        return self._mmap
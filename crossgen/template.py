@@ -0,0 +1,287 @@
+"""Filling fixed block-pattern templates, as in American-style crosswords, rather than growing a freeform layout.
+
+A template is a rectangle of cells written one row per line: '#' for a block, '.' for a cell to fill in, or a
+letter for a cell that has to have that letter. Every run of 2 or more cells across or down between blocks is a
+slot, and filling the template means picking a different word for each slot so that crossing slots agree on the
+letter they share.
+
+TemplateFiller treats this as a constraint problem over the slots. PatternIndex keeps a bitset (a Python int) of
+the words of each length that have each letter at each position, so the words that still fit a slot (its domain)
+are a bitset too, and narrowing a domain down is a handful of ANDs and ORs. After each choice, arc consistency
+(AC-3) takes out the words in crossing slots that no longer have anything to cross with, and the next slot to fill
+is the one with the fewest words left (MRV). A slot with nothing left means backtracking.
+
+Fills come out as grid.Grids with a word per slot, so pretty.HtmlGridPrinter and pretty.be_judgmental work on them
+as usual (blocks are just gaps).
+"""
+
+import random
+import time
+
+from crossgen import grid
+from crossgen import pretty
+
+BLOCK = "#"
+EMPTY = "."
+
+NODE_LIMIT = 10000
+"""Default number of choices one fill attempt can make before giving up and starting over with another order"""
+
+def popcount(bits):
+    return bin(bits).count("1")
+
+def get_bit_indices(bits):
+    """Return the indices of the set bits of bits, in ascending order"""
+    return [i for i, bit in enumerate(reversed(bin(bits)[2:])) if bit == "1"]
+
+class Template:
+    """Block pattern to fill
+
+    Attributes:
+        width, height = size of the template in cells
+        cells = map from (x, y) to the letter that has to go there, or None, for every cell that isn't a block
+        slots = list of (x, y, orientation, length), for every run of 2 or more cells across or down
+    """
+    def __init__(self, rows):
+        """rows = list of strings, one per row, in the format described above"""
+        rows = [row.strip() for row in rows if row.strip()]
+        if len(rows) == 0:
+            raise ValueError("empty template")
+        self.height = len(rows)
+        self.width = len(rows[0])
+        if any(len(row) != self.width for row in rows):
+            raise ValueError("template rows must all be the same length")
+        self.cells = {}
+        for y, row in enumerate(rows):
+            for x, ch in enumerate(row):
+                if ch != BLOCK:
+                    self.cells[(x, y)] = None if ch == EMPTY else ch
+        self.slots = []
+        for orientation in grid.ORIENTATIONS:
+            (dx, dy) = orientation
+            for (x, y) in sorted(self.cells, key=lambda pos: (pos[1], pos[0])):
+                if (x - dx, y - dy) in self.cells:
+                    continue # not the start of a run
+                length = 1
+                while (x + dx * length, y + dy * length) in self.cells:
+                    length += 1
+                if length >= 2:
+                    self.slots.append((x, y, orientation, length))
+        covered = set()
+        for x, y, (dx, dy), length in self.slots:
+            covered.update((x + dx * i, y + dy * i) for i in range(length))
+        if len(covered) < len(self.cells):
+            raise ValueError(f"template has cells that aren't part of any word: {sorted(set(self.cells) - covered)}")
+
+    @classmethod
+    def from_string(cls, text):
+        return cls(text.splitlines())
+
+    def __str__(self):
+        return "\n".join("".join(BLOCK if (x, y) not in self.cells else self.cells[(x, y)] or EMPTY
+                for x in range(self.width)) for y in range(self.height))
+
+class PatternIndex:
+    """Bitsets of the words of each length with each letter at each position
+
+    Attributes:
+        words = map from length to the list of words of that length; a word's bit is its index in the list
+        bits = map from (length, position, letter) to the bitset of the words of that length with letter at position
+        letters = map from (length, position) to a list of (letter, bitset) pairs, i.e. bits grouped by position
+    """
+    def __init__(self, words, lengths=None):
+        """Index the distinct words in words, or only those with one of the given lengths"""
+        self.words = {}
+        for word in sorted(set(words)):
+            if lengths is None or len(word) in lengths:
+                self.words.setdefault(len(word), []).append(word)
+        self.bits = {}
+        self.letters = {}
+        for length, length_words in self.words.items():
+            for position in range(length):
+                positions = {} # letter: bytearray bitset
+                for i, word in enumerate(length_words):
+                    letter_bits = positions.get(word[position])
+                    if letter_bits is None:
+                        letter_bits = positions[word[position]] = bytearray((len(length_words) + 7) // 8)
+                    letter_bits[i >> 3] |= 1 << (i & 7)
+                self.letters[(length, position)] = []
+                for letter, letter_bits in positions.items():
+                    bits = int.from_bytes(letter_bits, "little")
+                    self.bits[(length, position, letter)] = bits
+                    self.letters[(length, position)].append((letter, bits))
+
+    @classmethod
+    def from_pool(cls, index, lengths):
+        """Index the words of a pool.PoolIndex with the given lengths"""
+        return cls([index.get_word(word_id) for length in lengths for word_id in index.lengths.get(length, ())], lengths)
+
+    def all_words(self, length):
+        return (1 << len(self.words.get(length, ()))) - 1
+
+class TemplateFiller:
+    """Fills a Template with words from a PatternIndex
+
+    Attributes:
+        template = the Template to fill
+        index = the PatternIndex to take words from
+        rng = random.Random that orders the words tried for each slot
+        crossings = for each slot, a list of (position, other slot, position in the other slot) for each slot crossing it
+        nodes = number of choices made by the last fill
+    """
+    def __init__(self, template, index, rng=None):
+        self.template = template
+        self.index = index
+        self.rng = rng if rng is not None else random.Random()
+        slot_at = {} # map from (x, y, orientation) to (slot, position)
+        for slot, (x, y, orientation, length) in enumerate(template.slots):
+            (dx, dy) = orientation
+            for position in range(length):
+                slot_at[(x + dx * position, y + dy * position, orientation)] = (slot, position)
+        self.crossings = []
+        for slot, (x, y, orientation, length) in enumerate(template.slots):
+            (dx, dy) = orientation
+            crossings = []
+            for position in range(length):
+                other = slot_at.get((x + dx * position, y + dy * position, grid.switch_orientation(orientation)))
+                if other is not None:
+                    crossings.append((position,) + other)
+            self.crossings.append(crossings)
+        self.nodes = 0
+
+    def get_initial_domains(self):
+        """Return the domain of each slot before anything is filled in: every word of the right length that fits
+        the letters given by the template"""
+        domains = []
+        for x, y, (dx, dy), length in self.template.slots:
+            domain = self.index.all_words(length)
+            for position in range(length):
+                letter = self.template.cells[(x + dx * position, y + dy * position)]
+                if letter is not None:
+                    domain &= self.index.bits.get((length, position, letter), 0)
+            domains.append(domain)
+        return domains
+
+    def fill(self, deadline=None, node_limit=NODE_LIMIT):
+        """Return a grid.Grid with the template filled in, or None if there's no way to fill it, or if node_limit
+        choices have been made (or deadline, a time.monotonic() value, has passed) without finding one"""
+        self.nodes = 0
+        domains = self.get_initial_domains()
+        if 0 in domains or not self.propagate(domains, list(range(len(domains)))):
+            return None
+        assigned = self.search(domains, [None] * len(domains), deadline, node_limit)
+        if assigned is None:
+            return None
+        filled_grid = grid.Grid()
+        for (x, y, orientation, length), word_index in zip(self.template.slots, assigned):
+            filled_grid.add_word(self.index.words[length][word_index], x, y, orientation)
+        return filled_grid
+
+    def search(self, domains, assigned, deadline, node_limit):
+        """Depth-first search for the rest of the slots; return the word index for every slot, or None"""
+        unassigned = [slot for slot in range(len(domains)) if assigned[slot] is None]
+        if len(unassigned) == 0:
+            return assigned
+        counts = {slot : popcount(domains[slot]) for slot in unassigned}
+        fewest = min(counts.values())
+        slot = self.rng.choice([slot for slot in unassigned if counts[slot] == fewest])
+        length = self.template.slots[slot][3]
+        word_indices = get_bit_indices(domains[slot])
+        self.rng.shuffle(word_indices)
+        for word_index in word_indices:
+            if node_limit is not None and self.nodes >= node_limit:
+                return None
+            if deadline is not None and time.monotonic() > deadline:
+                return None
+            self.nodes += 1
+            word_bit = 1 << word_index
+            new_domains = list(domains)
+            new_domains[slot] = word_bit
+            new_assigned = list(assigned)
+            new_assigned[slot] = word_index
+            changed = [slot]
+            for other in unassigned: # every slot gets a different word
+                if other != slot and self.template.slots[other][3] == length and new_domains[other] & word_bit:
+                    new_domains[other] &= ~word_bit
+                    if new_domains[other] == 0:
+                        break
+                    changed.append(other)
+            else:
+                if self.propagate(new_domains, changed):
+                    result = self.search(new_domains, new_assigned, deadline, node_limit)
+                    if result is not None:
+                        return result
+        return None
+
+    def propagate(self, domains, changed):
+        """AC-3: narrow down domains (in place) until every word left in a slot has a word left in each crossing slot
+        that agrees with it, starting from the slots in changed; return False if a slot has nothing left"""
+        slots = self.template.slots
+        letters = self.index.letters
+        bits = self.index.bits
+        queue = list(changed)
+        queued = set(queue)
+        while len(queue) > 0:
+            slot = queue.pop()
+            queued.discard(slot)
+            domain = domains[slot]
+            length = slots[slot][3]
+            for position, other, other_position in self.crossings[slot]:
+                other_length = slots[other][3]
+                allowed = 0 # words of other that have a letter at the crossing that some word of slot has too
+                for letter, letter_bits in letters.get((length, position), ()):
+                    if domain & letter_bits:
+                        allowed |= bits.get((other_length, other_position, letter), 0)
+                new_domain = domains[other] & allowed
+                if new_domain != domains[other]:
+                    if new_domain == 0:
+                        return False
+                    domains[other] = new_domain
+                    if other not in queued:
+                        queue.append(other)
+                        queued.add(other)
+        return True
+
+def fill_template(template, index, max=1, seed=None, timeout=None, node_limit=NODE_LIMIT, attempts=None):
+    """Return a list of up to max distinct (score, crossword_grid) fills of template from a PatternIndex,
+    best first
+
+    Each attempt searches in a new random order, for up to node_limit choices; stops after attempts attempts
+    (default: 10 per fill asked for), or once timeout seconds have passed."""
+    filler = TemplateFiller(template, index, rng=random.Random(seed))
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    attempts = attempts if attempts is not None else 10 * max
+    crosswords = []
+    seen = set()
+    for attempt in range(attempts):
+        if len(crosswords) == max or deadline is not None and time.monotonic() > deadline:
+            break
+        crossword = filler.fill(deadline=deadline, node_limit=node_limit)
+        if crossword is None:
+            if filler.nodes < (node_limit or float("inf")) and (deadline is None or time.monotonic() <= deadline):
+                break # searched everything, so there's no fill at all
+            continue
+        key = crossword.get_canonical_key()
+        if key not in seen:
+            seen.add(key)
+            crosswords.append((pretty.be_judgmental(crossword), crossword))
+    return sorted(crosswords, key=lambda x: x[0], reverse=True)
+
+def main():
+    template = Template.from_string("""
+        T..
+        ...
+        ...
+    """)
+    words = ["THE", "WOE", "OWL", "TWO", "HOW", "EEL", "WHY", "HOE", "OPT", "WHO", "HOP", "YET", "TOE", "HEN", "ERA",
+            "ONE", "ELK", "TOO", "HOT", "ENE", "ARE", "ATE", "TEN", "EAR", "NET", "TAN", "ANT", "NAP", "PEA"]
+    index = PatternIndex(words)
+    print(template)
+    print()
+    for score, crossword in fill_template(template, index, max=3, seed=0):
+        print(f"score: {score:.2f}")
+        print(crossword)
+        print()
+
+if __name__ == "__main__":
+    main()
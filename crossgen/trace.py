@@ -0,0 +1,115 @@
+"""Structured trace of a CrosswordTreeSearch, for offline analysis of slow or pathological word lists.
+
+The trace is JSONL, one event per line. Grids are recorded in the compact placement form
+(see crossgen.compact), with word ids relative to the word list of the most recent "start" event.
+
+Event kinds:
+    start: a new search started; {"words"}
+    push: a state was pushed onto the stack; {"grid", "mode"}
+    pop: a state was popped off the stack to be expanded; {"grid", "mode", "depth"}
+    join: a word was successfully tried against the grid; {"grid", "parent", "parent_index", "child", "child_index"}
+    reject: like join, but the grid didn't allow it; also has {"reason"} (one of the grid.REJECT_* values)
+    solution: a complete grid was found; {"grid"}
+
+Every event also has "e" (the kind) and "n" (its sequence number, counting events that were sampled out).
+"""
+
+import json
+import random
+import sys
+
+from crossgen import compact
+from crossgen import grid
+
+class SearchTracer:
+    """Pass to CrosswordTreeSearch (or create_crosswords) to record trace events to outfile
+
+    sample_rate = fraction of push/pop/join/reject events to keep; start and solution events are always kept
+    """
+    def __init__(self, outfile, sample_rate=1.0, seed=None):
+        self.out = outfile
+        self.sample_rate = sample_rate
+        self.rng = random.Random(seed)
+        self.word_ids = {}
+        self.count = 0
+
+    def start(self, words):
+        self.word_ids = compact.get_word_ids(words)
+        self._write({"e" : "start", "words" : list(words)})
+
+    def push(self, this_grid, mode):
+        if self._sample():
+            self._write({"e" : "push", "grid" : self._placements(this_grid), "mode" : mode})
+
+    def pop(self, this_grid, mode, depth):
+        if self._sample():
+            self._write({"e" : "pop", "grid" : self._placements(this_grid), "mode" : mode, "depth" : depth})
+
+    def join(self, this_grid, parent_word, parent_index, child_word, child_index, reason=None):
+        """reason = None if the join was allowed, or else why it was rejected"""
+        if self._sample():
+            event = {
+                "e" : "join" if reason is None else "reject",
+                "grid" : self._placements(this_grid),
+                "parent" : self.word_ids.get(parent_word),
+                "parent_index" : parent_index,
+                "child" : self.word_ids[child_word],
+                "child_index" : child_index,
+            }
+            if reason is not None:
+                event["reason"] = reason
+            self._write(event)
+
+    def solution(self, this_grid):
+        self.count += 1
+        self._write({"e" : "solution", "grid" : self._placements(this_grid)})
+
+    def _sample(self):
+        self.count += 1
+        return self.sample_rate >= 1 or self.rng.random() < self.sample_rate
+
+    def _placements(self, this_grid):
+        return this_grid.get_placements(self.word_ids)
+
+    def _write(self, event):
+        event["n"] = self.count
+        self.out.write(json.dumps(event, separators=(",", ":")) + "\n")
+
+def replay(infile):
+    """Yield (event, grid.Grid) for every event with a grid in the trace read from infile
+
+    The grid is rebuilt from the event's placements, so it is the grid the event happened on
+    (e.g. for a join, the grid before the child word was added)."""
+    words = []
+    for line in infile:
+        if not line.strip():
+            continue
+        event = json.loads(line)
+        if event["e"] == "start":
+            words = event["words"]
+        elif "grid" in event:
+            yield (event, grid.Grid.from_placements(words, event["grid"]))
+
+def main():
+    """Summarize the trace file given on the command line, printing every solution grid"""
+    path = sys.argv[1] if len(sys.argv) > 1 else "-"
+    infile = sys.stdin if path == "-" else open(path, "r", encoding="utf-8")
+    counts = {}
+    reasons = {}
+    max_depth = 0
+    for event, this_grid in replay(infile):
+        counts[event["e"]] = counts.get(event["e"], 0) + 1
+        if event["e"] == "reject":
+            reasons[event["reason"]] = reasons.get(event["reason"], 0) + 1
+        elif event["e"] == "pop":
+            max_depth = max(max_depth, event["depth"])
+        elif event["e"] == "solution":
+            print(f"===SOLUTION (event {event['n']})===")
+            print(this_grid)
+            print()
+    print(f"events: {counts}")
+    print(f"rejections: {reasons}")
+    print(f"max depth: {max_depth}")
+
+if __name__ == "__main__":
+    main()
@@ -3,10 +3,12 @@ import networkx as nx
 import queue
 import random
 import sys
+import time
 from crossgen import link
 from crossgen import grid
+from crossgen.seen import ExactSeenSet, canonical_hash
 
-def can_generate_crosswords(words):
+def can_generate_crosswords(words, max_width=None, max_height=None):
     """Some cheap preliminary checks to see if a crossword solution is even possible"""
     link_graph = link.generate_link_graph(words)
     num_connected_components = nx.number_connected_components(link_graph)
@@ -25,15 +27,44 @@ def can_generate_crosswords(words):
         if len(word) < 2:
             logging.info(f"word '{word}' is too short")
             return False
+        if max_width is not None and max_height is not None and len(word) > max(max_width, max_height):
+            logging.info(f"word '{word}' doesn't fit in a {max_width}x{max_height} grid")
+            return False
 
     return True
 
-def generate_crosswords(words, max=None):
-    """words is a sequence of words"""
+def make_rng(seed=None):
+    """Return a random.Random for seed, which may be None (seed from the OS), an int, or already a random.Random"""
+    if isinstance(seed, random.Random):
+        return seed
+    return random.Random(seed)
+
+def spawn_rng(rng):
+    """Return a new random.Random seeded from rng, e.g. for each batch of a run"""
+    return random.Random(rng.getrandbits(64))
+
+def derive_seed(seed, index):
+    """Return an independent sub-seed for the index-th parallel worker of a run with the given seed
+
+    Same (seed, index) gives the same sub-seed in every process."""
+    return random.Random(f"{seed}/{index}").getrandbits(64)
+
+def generate_crosswords(words, max=None, stats=None, tracer=None, deadline=None, rng=None, max_width=None, max_height=None,
+        cancel=None, seeds=()):
+    """words is a sequence of words
+
+    stats = SearchStats to accumulate search counters into
+    tracer = trace.SearchTracer to record search events to
+    deadline = time.monotonic() value at which to stop searching
+    rng = seed or random.Random for the search (see make_rng)
+    max_width, max_height = only generate crosswords that fit in this size
+    cancel = threading.Event (or anything with is_set()) that stops the search once set
+    seeds = partial grids to search from first (see CrosswordTreeSearch)"""
 
     outcount = 0
-    searcher = CrosswordTreeSearch(words)
-    for crossword in searcher.search():
+    searcher = CrosswordTreeSearch(words, stats=stats, tracer=tracer, rng=rng, max_width=max_width, max_height=max_height,
+            seeds=seeds)
+    for crossword in searcher.search(deadline=deadline, cancel=cancel):
         yield crossword
         outcount += 1
         if outcount == max:
@@ -58,6 +89,79 @@ def flip_mode(mode):
     else:
         raise ValueError(f"unknown mode {mode}")
 
+class SearchStats:
+    """Counters collected by CrosswordTreeSearch; one instance can be shared by several searches
+
+    Attributes:
+        nodes_expanded = number of search tree nodes popped off the stack and expanded
+        states_pushed = number of states pushed onto the stack
+        joins_attempted = number of times a word was tried against the grid
+        joins_rejected = map from grid.REJECT_* reason to number of joins rejected for that reason
+        transposition_hits = number of states skipped because they were already visited
+        max_stack_depth = largest size the stack has reached
+        solutions = number of complete grids found
+        time_to_first_solution = seconds from start_time until the first complete grid, or None
+        phase_times = map from phase ("candidates", "feasibility", "scoring") to seconds spent in it
+    """
+    def __init__(self):
+        self.start_time = time.perf_counter()
+        self.nodes_expanded = 0
+        self.states_pushed = 0
+        self.joins_attempted = 0
+        self.joins_rejected = {}
+        self.transposition_hits = 0
+        self.max_stack_depth = 0
+        self.solutions = 0
+        self.time_to_first_solution = None
+        self.phase_times = {"candidates" : 0.0, "feasibility" : 0.0, "scoring" : 0.0}
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["start_time"] = time.perf_counter() - self.start_time # perf_counter values mean nothing in another process
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.start_time = time.perf_counter() - state["start_time"] # so time spent stopped doesn't count
+
+    def reject(self, reason):
+        self.joins_rejected[reason] = self.joins_rejected.get(reason, 0) + 1
+
+    def add_solution(self):
+        self.solutions += 1
+        if self.time_to_first_solution is None:
+            self.time_to_first_solution = time.perf_counter() - self.start_time
+
+    def as_dict(self):
+        elapsed = time.perf_counter() - self.start_time
+        return {
+            "elapsed" : elapsed,
+            "nodes_expanded" : self.nodes_expanded,
+            "nodes_per_second" : self.nodes_expanded / elapsed if elapsed > 0 else 0.0,
+            "states_pushed" : self.states_pushed,
+            "joins_attempted" : self.joins_attempted,
+            "joins_rejected" : dict(self.joins_rejected),
+            "transposition_hits" : self.transposition_hits,
+            "max_stack_depth" : self.max_stack_depth,
+            "solutions" : self.solutions,
+            "time_to_first_solution" : self.time_to_first_solution,
+            "phase_times" : dict(self.phase_times),
+        }
+
+def format_stats(stats):
+    """Return a human-readable report of a SearchStats.as_dict() dict"""
+    lines = []
+    for key, value in stats.items():
+        if isinstance(value, dict):
+            lines.append(f"{key}:")
+            for subkey, subvalue in sorted(value.items()):
+                lines.append(f"  {subkey}: {subvalue:.4g}" if isinstance(subvalue, float) else f"  {subkey}: {subvalue}")
+        elif isinstance(value, float):
+            lines.append(f"{key}: {value:.4g}")
+        else:
+            lines.append(f"{key}: {value}")
+    return "\n".join(lines)
+
 class CrosswordTreeSearch:
     """class to try misc. word combinations to try and find valid crosswords
 
@@ -71,29 +175,122 @@ class CrosswordTreeSearch:
                 move = the node or edge that was added
         root = the root search tree node link graph state; i.e. an empty graph
         stack = working queue of places to search from next
-            entries are in the form (link graph state, LETTER or WORD)
-        visited = dict where visited.get(link state, False) = True if already visited and False otherwise
+            entries are in the form (grid state, link graph state, LETTER or WORD)
+        stack_discrepancies = number of discrepancies (times a child other than the preferred one was taken)
+            on the path to each stack entry, for limited discrepancy search
+        open_nodes = stack of (state, stack height, prune count) for nodes whose children are still being searched;
+            a node is finished once the stack shrinks back down to the height it had when the node was popped
+        closed = set of state_key hashes of nodes whose whole subtree has been searched without any pruning,
+            i.e. the transposition table; children in it aren't pushed again, even after a restart
+        prune_count = number of times children have been pruned by a discrepancy limit
         node_count = number of nodes visited so far
+        stats = SearchStats for this search
+        tracer = trace.SearchTracer that search events are recorded to, or None
+        rng = random.Random used to shuffle the order in which candidates are tried
+        start_states = states the search starts from on every restart, most promising first: the search states for
+            the seed grids, and then the root (unless search_root is False)
+        check_connected = whether finished grids might not be connected, and so need checking
+        order_seed = seed that fixes the order children are tried in at each node for limited discrepancy search,
+            drawn from rng the first time search is called with max_discrepancies
     """
-    def __init__(self, all_words):
+    def __init__(self, all_words, stats=None, tracer=None, rng=None, max_width=None, max_height=None, seeds=(),
+            search_root=True, initial_grid=None, grid_class=grid.Grid):
+        """rng can be a seed or a random.Random (see make_rng)
+
+        max_width, max_height = limits on the grid size; placements that would go past them are rejected
+        as soon as they're tried (as grid.REJECT_TOO_BIG), so oversized layouts are never searched
+        seeds = connected partial grids of all_words (e.g. from crossgen.warmstart), most promising first;
+            they are searched before the root, so the search starts out only adding the words they're missing
+        search_root = if False, only search from the seeds
+        initial_grid = grid.Grid of some of all_words to lock in place (relative to each other); only the rest of the
+            words are searched, so this replaces seeds and search_root. It doesn't have to be connected, as long as
+            the rest of the words can connect it. ExhaustiveSearch does the same much more quickly when most of
+            the words are locked.
+        grid_class = grid.Grid or grid.BitGrid, the grid backend to search with"""
         self.all_words = all_words
+        self.rng = make_rng(rng)
+        self.stats = stats if stats is not None else SearchStats()
+        self.tracer = tracer
+        if tracer is not None:
+            tracer.start(all_words)
 
         self.master_link_graph = link.generate_link_graph(all_words)
 
         self.search_tree = nx.DiGraph()
-        self.root_grid = grid.Grid()
+        self.record_search_tree = logging.getLogger().isEnabledFor(logging.DEBUG) # only used by print_pv
+        self.root_grid = grid_class(max_width, max_height)
         self.root_link = nx.MultiGraph()
         self.search_tree.add_node((self.root_grid, self.root_link, link.LETTER))
 
-        self.visited = {}
+        self.closed = ExactSeenSet()
+        self.prune_count = 0
+        self.node_count = 0
+        self.check_connected = False
+        self.order_seed = None
+        if initial_grid is not None:
+            unknown_words = [word for word in initial_grid.words if word not in all_words]
+            if len(unknown_words) > 0:
+                raise ValueError(f"initial grid has words that aren't in the word list: {unknown_words}")
+            seeds = [initial_grid.translated_to_origin(max_width, max_height)]
+            search_root = False
+            self.check_connected = not initial_grid.is_connected()
+        self.start_states = [self.get_seed_state(seed) for seed in seeds]
+        if search_root:
+            self.start_states.append((self.root_grid, self.root_link, link.LETTER))
+        self.restart()
 
-        self.stack = []
-        self.stack.append((self.root_grid, self.root_link, link.LETTER))
+    def __getstate__(self):
+        """For crossgen.checkpoint; the tracer is left out, since it holds an open file"""
+        state = self.__dict__.copy()
+        state["tracer"] = None
+        state["search_tree"] = nx.DiGraph() # only used for debug output
+        return state
 
-        self.node_count = 0
+    def restart(self):
+        """Throw away the stack and start again from the start states, keeping the transposition table and rng"""
+        self.stack = self.start_states[::-1]
+        self.stack_discrepancies = [0] * len(self.stack)
+        self.open_nodes = []
+
+    def get_seed_state(self, seed_grid):
+        """Return the search state for a connected partial grid of all_words, i.e. the grid with a link graph
+        that has an edge from each word to each letter where it crosses another word"""
+        seed_link = nx.MultiGraph()
+        cells = {} # map from (x, y) to the (word, index) pairs at that cell
+        for word, data in seed_grid.words.items():
+            seed_link.add_node(word, **self.master_link_graph.nodes[word])
+            (x, y) = data["coords"]
+            (dx, dy) = data["orientation"]
+            for i in range(len(word)):
+                cells.setdefault((x + dx * i, y + dy * i), []).append((word, i))
+        for cell_words in cells.values():
+            if len(cell_words) < 2:
+                continue
+            for word, i in cell_words:
+                letter = word[i]
+                key = word[:i].count(letter) # see link.generate_link_graph
+                seed_link.add_node(letter, **self.master_link_graph.nodes[letter])
+                seed_link.add_edge(word, letter, key, **self.master_link_graph.edges[(word, letter, key)])
+        return (seed_grid.copy(), seed_link, link.WORD)
+
+    def is_complete(self):
+        """Return True if the whole search tree (under every start state) has been searched"""
+        return all(self.state_key(*state) in self.closed for state in self.start_states)
+
+    def state_key(self, this_grid, this_link, mode):
+        """Return a stable 64-bit hash identifying a search state, for the transposition table"""
+        return canonical_hash((this_grid.get_canonical_key(), tuple(sorted(this_link.edges(keys=True))), mode))
+
+    def is_closed(self, this_grid, this_link, mode):
+        if self.state_key(this_grid, this_link, mode) in self.closed:
+            self.stats.transposition_hits += 1
+            return True
+        return False
     
     def print_pv(self, this_grid, this_link, mode):
         """pv = primary variation"""
+        if not logging.getLogger().isEnabledFor(logging.DEBUG): # walking the search tree isn't free
+            return
         labels = []
         node = (this_grid, this_link, mode)
         parents = list(self.search_tree.predecessors(node))
@@ -106,46 +303,125 @@ class CrosswordTreeSearch:
         sequence = " -> ".join(reversed(labels))
         logging.debug(sequence)
 
-    def search(self):
+    def search(self, deadline=None, node_limit=None, max_discrepancies=None, cancel=None):
         """Yields valid grid.Grids that it finds
 
         This is a brute-force search, so runtime is probably exponential wrt number of words.
+        If deadline is given, stop once time.monotonic() passes it.
+        If cancel is given, stop once cancel.is_set() (e.g. a threading.Event set from another thread).
+        If node_limit is given, stop after expanding that many nodes.
+        If max_discrepancies is given, only search paths that deviate from the preferred (i.e. first tried)
+        child at most that many times. The children of each node are then tried in an order that depends only
+        on the node (and order_seed), so that every pass measures discrepancies from the same ordering.
+
+        Stopping early leaves the stack as it is, so calling search() again carries on where it stopped.
         """
+        stats = self.stats
+        start_count = self.node_count
+        if max_discrepancies is not None and self.order_seed is None:
+            self.order_seed = self.rng.getrandbits(64)
         while len(self.stack) > 0:
-            (this_grid, this_link, mode) = self.stack.pop()
-            self.print_pv(this_grid, this_link, mode)
-            used_letters = [u for u,data in this_link.nodes(data=True) if data['bipartite'] == link.LETTER]
-            used_words = [u for u,data in this_link.nodes(data=True) if data['bipartite'] == link.WORD]
-
-            if mode == link.LETTER: # need to add a word
-                next_from_letters = self.next_from_letters(this_grid, this_link, used_words, used_letters)
-                if len(next_from_letters) == 0:
-                    for word in self.next_root_words(this_grid, this_link, used_words, used_letters):
-                        self.read_word(this_grid, this_link, word)
-                else:
-                    for edge in next_from_letters:
-                        self.read_letter_to_word(this_grid, this_link, edge)
-            elif mode == link.WORD: # need to add a letter
-                if len(used_words) == len(self.all_words):
-                    assert(len(this_grid.words) == len(self.all_words))
-                    logging.debug(f"FINISHED GRID: \n{str(this_grid)}")
-                    yield this_grid
-                    continue
-                next_from_words = self.next_from_words(this_grid, this_link, used_words, used_letters)
-                for edge in next_from_words:
-                    self.read_word_to_letter(this_grid, this_link, edge)
-            self.visited[(this_grid, this_link)] = True
+            self._close_finished_nodes()
+            if deadline is not None and time.monotonic() > deadline:
+                return
+            if cancel is not None and cancel.is_set():
+                return
+            if node_limit is not None and self.node_count - start_count >= node_limit:
+                return
+            stats.max_stack_depth = max(stats.max_stack_depth, len(self.stack))
+            state = self.stack.pop()
+            discrepancies = self.stack_discrepancies.pop()
+            height = len(self.stack)
+            self.open_nodes.append((state, height, self.prune_count))
+            if max_discrepancies is not None:
+                (rng, self.rng) = (self.rng, random.Random(derive_seed(self.order_seed, self.state_key(*state))))
+                finished_grid = self.expand(state)
+                self.rng = rng
+            else:
+                finished_grid = self.expand(state)
+            self._assign_discrepancies(height, discrepancies, max_discrepancies)
+            if finished_grid is not None:
+                yield finished_grid
+        self._close_finished_nodes()
+
+    def _close_finished_nodes(self):
+        """Add the open nodes whose subtrees are done to the transposition table"""
+        while len(self.open_nodes) > 0 and len(self.stack) <= self.open_nodes[-1][1]:
+            (state, height, prune_count) = self.open_nodes.pop()
+            if prune_count == self.prune_count: # nothing under it was pruned, so it really has been fully searched
+                self.closed.add(self.state_key(*state))
+
+    def _assign_discrepancies(self, height, discrepancies, max_discrepancies):
+        """Record discrepancies for the children just pushed above height, and prune those over max_discrepancies
+
+        The last child pushed is searched first, so it is the preferred one; every other child costs a discrepancy."""
+        num_children = len(self.stack) - height
+        if num_children == 0:
+            return
+        if max_discrepancies is not None and discrepancies + 1 > max_discrepancies:
+            del self.stack[height:-1] # only the preferred child is left within the limit
+            if num_children > 1:
+                self.prune_count += 1
+            self.stack_discrepancies.append(discrepancies)
+            return
+        self.stack_discrepancies.extend([discrepancies + 1] * (num_children - 1))
+        self.stack_discrepancies.append(discrepancies)
+
+    def expand(self, state):
+        """Expand one (grid, link, mode) search tree node, pushing its children onto the stack
+
+        Returns the grid if the node is a finished crossword (and so has no children), or None otherwise.
+        """
+        (this_grid, this_link, mode) = state
+        stats = self.stats
+        phase_times = stats.phase_times
+        stats.nodes_expanded += 1
+        self.node_count += 1
+        if self.tracer is not None:
+            self.tracer.pop(this_grid, mode, len(self.stack))
+        self.print_pv(this_grid, this_link, mode)
+        used_letters = [u for u,data in this_link.nodes(data=True) if data['bipartite'] == link.LETTER]
+        used_words = [u for u,data in this_link.nodes(data=True) if data['bipartite'] == link.WORD]
+
+        if mode == link.LETTER: # need to add a word
+            start_time = time.perf_counter()
+            next_from_letters = self.next_from_letters(this_grid, this_link, used_words, used_letters)
+            if len(next_from_letters) == 0 and len(used_words) == 0: # otherwise the new word would be disconnected
+                next_root_words = self.next_root_words(this_grid, this_link, used_words, used_letters)
+                phase_times["candidates"] += time.perf_counter() - start_time
+                for word in next_root_words:
+                    self.read_word(this_grid, this_link, word)
+            else:
+                phase_times["candidates"] += time.perf_counter() - start_time
+                for edge in next_from_letters:
+                    self.read_letter_to_word(this_grid, this_link, edge)
+        elif mode == link.WORD: # need to add a letter
+            if len(used_words) == len(self.all_words):
+                assert(len(this_grid.words) == len(self.all_words))
+                if self.check_connected and not this_grid.is_connected():
+                    return None
+                logging.debug("FINISHED GRID: \n%s", this_grid)
+                stats.add_solution()
+                if self.tracer is not None:
+                    self.tracer.solution(this_grid)
+                return this_grid
+            start_time = time.perf_counter()
+            next_from_words = self.next_from_words(this_grid, this_link, used_words, used_letters)
+            phase_times["candidates"] += time.perf_counter() - start_time
+            for edge in next_from_words:
+                self.read_word_to_letter(this_grid, this_link, edge)
+        return None
 
     def next_root_words(self, this_grid, this_link, used_words, used_letters):
         """Return list of word nodes to esearch next"""
-        unused_words = set(self.all_words) - set(used_words)
-        return random.sample(unused_words, len(unused_words))
+        unused_words = sorted(set(self.all_words) - set(used_words)) # sorted so that the order doesn't depend on str hashing
+        return self.rng.sample(unused_words, len(unused_words))
 
     def next_from_letters(self, this_grid, this_link, used_words, used_letters):
         """Return list of (letter, word, key) edges to search next"""
         next_list = []
 
-        for letter in random.sample(used_letters, len(used_letters)):
+        for letter in self.rng.sample(sorted(used_letters), len(used_letters)): # sorted so that only the rng decides the order
             edge_count = sum(len(atlas) for atlas in this_link.adj[letter].values())
             if edge_count % 2 == 0: # only letters with an odd number of edges will be able to have a word added
                 continue
@@ -160,7 +436,7 @@ class CrosswordTreeSearch:
     def next_from_words(self, this_grid, this_link, used_words, used_letters):
         """Return list of (word, letter, key) edges to search next"""
         next_list = []
-        for word in random.sample(used_words, len(used_words)):
+        for word in self.rng.sample(sorted(used_words), len(used_words)):
             for letter, atlas in self.master_link_graph.adj[word].items():
                 for key in atlas: # for each edge between word and letter
                         proposed_edge = (word, letter, key)
@@ -180,11 +456,11 @@ class CrosswordTreeSearch:
         new_link = this_link.copy()        
         new_link.add_node(word, **self.master_link_graph.nodes[word])
         new_grid = this_grid.copy()
-        if new_grid.can_add_word(word, 0, 0, grid.EAST): # by default, add word horizontally at origin
+        if self.check_add_word(new_grid, word, 0, 0, grid.EAST): # by default, add word horizontally at origin
             new_grid.add_word(word, 0, 0, grid.EAST)
-            if self.visited.get((new_grid, new_link), False) == False:
-                self.stack.append((new_grid, new_link, new_mode))
-                self.search_tree.add_edge((this_grid, this_link, mode), (new_grid, new_link, new_mode), move=word)
+            if not self.is_closed(new_grid, new_link, new_mode):
+                self.push((new_grid, new_link, new_mode))
+                self.add_search_tree_edge((this_grid, this_link, mode), (new_grid, new_link, new_mode), word)
 
     def read_word_to_letter(self, this_grid, this_link, edge):
         """ Add (word, letter, key) edge to search tree and push onto stack for further reading
@@ -200,9 +476,9 @@ class CrosswordTreeSearch:
         new_link.add_node(edge[1], **self.master_link_graph.nodes[edge[1]])
         new_link.add_edge(*edge, **self.master_link_graph.edges[edge])
         new_grid = this_grid.copy() # grid doesn't change yet
-        if self.visited.get((new_grid, new_link), False) == False: 
-            self.stack.append((new_grid, new_link, new_mode))
-            self.search_tree.add_edge((this_grid, this_link, mode), (new_grid, new_link, new_mode), move=edge)
+        if not self.is_closed(new_grid, new_link, new_mode):
+            self.push((new_grid, new_link, new_mode))
+            self.add_search_tree_edge((this_grid, this_link, mode), (new_grid, new_link, new_mode), edge)
 
     def read_letter_to_word(self, this_grid, this_link, edge):
         """Edge is an edge from a letter to a word
@@ -223,17 +499,275 @@ class CrosswordTreeSearch:
             for key, attrs in atlas.items():
                 parent_edge = (parent_word, letter, key)
                 parent_letter_index = attrs["index"]
-                logging.debug(f"can join: {parent_word}-{parent_letter_index}, {child_word}-{child_letter_index}?")
-                if this_grid.can_join_word(parent_word, parent_letter_index, child_word, child_letter_index):
+                logging.debug("can join: %s-%s, %s-%s?", parent_word, parent_letter_index, child_word, child_letter_index)
+                if self.check_join_word(this_grid, parent_word, parent_letter_index, child_word, child_letter_index):
                     logging.debug("  yes")
                     new_grid = this_grid.copy()
                     new_grid.join_word(parent_word, parent_letter_index, child_word, child_letter_index)
                     new_link = this_link.copy()
                     new_link.add_node(child_word, **self.master_link_graph.nodes[child_word])
                     new_link.add_edge(*edge, **self.master_link_graph.edges[edge])
-                    self.stack.append((new_grid, new_link, new_mode))
-                    self.search_tree.add_edge((this_grid, this_link, mode), (new_grid, new_link, new_mode), move=edge)
+                    if not self.is_closed(new_grid, new_link, new_mode):
+                        self.push((new_grid, new_link, new_mode))
+                        self.add_search_tree_edge((this_grid, this_link, mode), (new_grid, new_link, new_mode), edge)
+
+    def add_search_tree_edge(self, parent, child, move):
+        if self.record_search_tree:
+            self.search_tree.add_edge(parent, child, move=move)
+
+    def push(self, state):
+        self.stack.append(state)
+        self.stats.states_pushed += 1
+        if self.tracer is not None:
+            self.tracer.push(state[0], state[2])
+
+    def check_add_word(self, this_grid, word, x, y, direction):
+        """this_grid.can_add_word, but recorded in self.stats (and self.tracer)"""
+        start_time = time.perf_counter()
+        reason = this_grid.get_add_word_rejection(word, x, y, direction)
+        self._record_join(reason, start_time)
+        if self.tracer is not None:
+            self.tracer.join(this_grid, None, None, word, 0, reason)
+        return reason is None
+
+    def check_join_word(self, this_grid, parent_word, parent_index, child_word, child_index):
+        """this_grid.can_join_word, but recorded in self.stats (and self.tracer)"""
+        start_time = time.perf_counter()
+        reason = this_grid.get_join_word_rejection(parent_word, parent_index, child_word, child_index)
+        self._record_join(reason, start_time)
+        if self.tracer is not None:
+            self.tracer.join(this_grid, parent_word, parent_index, child_word, child_index, reason)
+        return reason is None
+
+    def _record_join(self, reason, start_time):
+        stats = self.stats
+        stats.phase_times["feasibility"] += time.perf_counter() - start_time
+        stats.joins_attempted += 1
+        if reason is not None:
+            stats.reject(reason)
     
+class ExhaustiveSearch(CrosswordTreeSearch):
+    """Enumerates every distinct connected layout of all_words exactly once, for small word lists
+
+    Instead of walking the link graph, each search node is a grid (plus the joins that might still be
+    legal on it, see expand), and its children are the grid with one more word joined onto it in every
+    legal way. The words that can still be added to a grid
+    don't depend on how the grid was built, so every partial grid only needs to be searched once:
+    seen holds the hashes of all the grids pushed so far, and other routes to the same grid are pruned
+    (and counted as stats.transposition_hits).
+
+    The first word is always at the origin, so grids don't need translating to compare them, and a grid's
+    hash is just the XOR of the hashes of its word placements; that way a child's hash can be worked out
+    from its parent's before bothering to build the child grid.
+
+    The first word is always placed across (or along root_orientation), which picks one of each layout
+    and its transpose; if transposes is True, the transposed layout is yielded as well, if it fits.
+    With a max_width different from max_height, the transpose of a layout that fits might not fit
+    itself, so a second search with root_orientation=grid.SOUTH is needed to find everything.
+
+    With an initial_grid, the search starts from that instead (moved to the origin), and only adds the
+    words that aren't in it, which is far quicker than the link graph walk when most of the words are placed.
+
+    Attributes:
+        root_word = the word the search starts from
+        letter_positions = map from word to map from letter to the indices of that letter in the word
+        seen = ExactSeenSet of hashes of the grids pushed so far
+        placement_hashes = cache of placement_hash
+        dead_ends = number of unfinished grids that no remaining word could be joined to
+        initial_grid = grid.Grid the search starts from, or None to start from root_word
+        grid_class = grid.Grid or grid.BitGrid, the grid backend to search with
+        check_connected = whether finished grids might not be connected, and so need checking
+    """
+    def __init__(self, all_words, stats=None, tracer=None, transposes=False, max_width=None, max_height=None,
+            root_orientation=grid.EAST, initial_grid=None, grid_class=grid.Grid):
+        self.all_words = all_words
+        self.stats = stats if stats is not None else SearchStats()
+        self.tracer = tracer
+        if tracer is not None:
+            tracer.start(all_words)
+        self.transposes = transposes
+        self.max_width = max_width
+        self.max_height = max_height
+        self.root_orientation = root_orientation
+        self.grid_class = grid_class
+        self.root_word = all_words[0]
+        self.letter_positions = {}
+        for word in all_words:
+            positions = {}
+            for i, letter in enumerate(word):
+                positions.setdefault(letter, []).append(i)
+            self.letter_positions[word] = positions
+        self.placement_hashes = {}
+        self.seen = ExactSeenSet()
+        self.dead_ends = 0
+        self.node_count = 0
+        self.initial_grid = None
+        self.check_connected = False
+        if initial_grid is not None:
+            unknown_words = [word for word in initial_grid.words if word not in all_words]
+            if len(unknown_words) > 0:
+                raise ValueError(f"initial grid has words that aren't in the word list: {unknown_words}")
+            self.initial_grid = initial_grid.translated_to_origin(max_width, max_height)
+            self.check_connected = not initial_grid.is_connected()
+        self.restart()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["tracer"] = None
+        state["placement_hashes"] = {} # just a cache
+        return state
+
+    def restart(self):
+        """Start again from the root, forgetting every grid seen so far"""
+        if self.initial_grid is not None:
+            self.restart_from_initial_grid()
+            return
+        root_grid = self.grid_class(self.max_width, self.max_height)
+        root_hash = self.placement_hash(self.root_word, 0, 0, self.root_orientation)
+        self.seen = ExactSeenSet()
+        self.seen.add(root_hash)
+        self.stack = []
+        if self.check_add_word(root_grid, self.root_word, 0, 0, self.root_orientation):
+            root_grid.add_word(self.root_word, 0, 0, self.root_orientation)
+            self.push((root_grid, [], self.root_word, root_hash))
+
+    def restart_from_initial_grid(self):
+        root_grid = self.initial_grid.copy()
+        root_hash = 0
+        for word, data in root_grid.words.items():
+            root_hash ^= self.placement_hash(word, *data["coords"], data["orientation"])
+        root_hash = root_hash or 1
+        self.seen = ExactSeenSet()
+        self.seen.add(root_hash)
+        joins = [] # every join onto the initial grid, checked by expand like a parent's legal joins
+        for parent_word in root_grid.words:
+            joins.extend(self.get_joins_onto(root_grid, parent_word))
+        self.stack = []
+        self.push((root_grid, joins, None, root_hash))
+
+    def get_joins_onto(self, this_grid, parent_word):
+        """Return every (parent_word, parent_index, child_word, child_index) join of a word that isn't in this_grid
+        onto parent_word, legal or not"""
+        joins = []
+        for child_word in self.all_words:
+            if child_word in this_grid.words:
+                continue
+            child_positions = self.letter_positions[child_word]
+            for parent_index, letter in enumerate(parent_word):
+                for child_index in child_positions.get(letter, ()):
+                    joins.append((parent_word, parent_index, child_word, child_index))
+        return joins
+
+    def placement_hash(self, word, x, y, orientation):
+        key = (word, x, y, orientation)
+        h = self.placement_hashes.get(key)
+        if h is None:
+            h = canonical_hash((word, x, y, orientation == grid.SOUTH))
+            self.placement_hashes[key] = h
+        return h
+
+    def is_complete(self):
+        return len(self.stack) == 0
+
+    def search(self, deadline=None, node_limit=None, cancel=None):
+        """Yields every layout, stopping early if deadline (a time.monotonic() value) passes, node_limit
+        nodes have been expanded or cancel is set; calling search() again carries on where it stopped"""
+        start_count = self.node_count
+        while len(self.stack) > 0:
+            if deadline is not None and time.monotonic() > deadline:
+                return
+            if cancel is not None and cancel.is_set():
+                return
+            if node_limit is not None and self.node_count - start_count >= node_limit:
+                return
+            self.stats.max_stack_depth = max(self.stats.max_stack_depth, len(self.stack))
+            finished_grid = self.expand(self.stack.pop())
+            if finished_grid is not None:
+                yield finished_grid
+                if self.transposes:
+                    transposed = finished_grid.transposed()
+                    if transposed.fits(self.max_width, self.max_height):
+                        yield transposed
+
+    def expand(self, state):
+        """Expand one (grid, joins, new word, hash) search node, pushing every grid with one more word joined onto it
+        that hasn't been seen yet
+
+        joins are the (parent_word, parent_index, child_word, child_index) joins that were legal on the parent
+        grid, and new word is the word the parent grid didn't have (None for the initial grid, whose joins
+        are all of the ones onto it). Adding words only ever adds letters, so
+        a join onto a word that is already placed can't become legal later on; only those joins, plus the
+        joins onto the new word, need checking.
+
+        Returns the grid if it is finished, or None otherwise."""
+        (this_grid, joins, new_word, this_hash) = state
+        stats = self.stats
+        stats.nodes_expanded += 1
+        self.node_count += 1
+        if self.tracer is not None:
+            self.tracer.pop(this_grid, link.LETTER, len(self.stack))
+        if len(this_grid.words) == len(self.all_words):
+            if self.check_connected and not this_grid.is_connected():
+                self.dead_ends += 1
+                return None
+            stats.add_solution()
+            if self.tracer is not None:
+                self.tracer.solution(this_grid)
+            return this_grid
+
+        start_time = time.perf_counter()
+        placed_words = this_grid.words
+        candidates = [join for join in joins if join[2] not in placed_words]
+        if new_word is not None:
+            candidates.extend(self.get_joins_onto(this_grid, new_word))
+        stats.phase_times["candidates"] += time.perf_counter() - start_time
+
+        legal_joins = [join for join in candidates if self.check_join_word(this_grid, *join)]
+        if len(legal_joins) == 0:
+            self.dead_ends += 1
+        children = legal_joins
+        if self.check_connected:
+            components = this_grid.get_components()
+            if len(components) > 1:
+                # joins only ever become illegal, so a piece with nothing to join onto it now never will have
+                parent_words = {join[0] for join in legal_joins}
+                if not all(any(word in parent_words for word in component) for component in components):
+                    self.dead_ends += 1
+                    return None
+                children = self.sort_by_merges(this_grid, components, legal_joins)
+        for (parent_word, parent_index, child_word, child_index) in children:
+            (x, y, orientation) = this_grid.get_join_position(parent_word, parent_index, child_index)
+            new_hash = (this_hash ^ self.placement_hash(child_word, x, y, orientation)) or 1
+            if self.seen.add(new_hash):
+                new_grid = this_grid.copy()
+                new_grid.add_word(child_word, x, y, orientation)
+                self.push((new_grid, legal_joins, child_word, new_hash))
+            else:
+                stats.transposition_hits += 1
+        return None
+
+    def sort_by_merges(self, this_grid, components, joins):
+        """Return joins sorted so that the ones whose child word crosses the most of the components (separate pieces)
+        of this_grid come last, and so are searched first; otherwise, a disconnected initial grid is only joined up by chance"""
+        component_at = {} # map from (x, y) to the index of the piece of this_grid there
+        for i, component in enumerate(components):
+            for word in component:
+                data = this_grid.words[word]
+                (x, y) = data["coords"]
+                (dx, dy) = data["orientation"]
+                for j in range(len(word)):
+                    component_at[(x + dx * j, y + dy * j)] = i
+        def get_merges(join):
+            (x, y, (dx, dy)) = this_grid.get_join_position(join[0], join[1], join[3])
+            return len({component_at[(x + dx * j, y + dy * j)] for j in range(len(join[2])) if (x + dx * j, y + dy * j) in component_at})
+        return sorted(joins, key=get_merges)
+
+    def push(self, state):
+        self.stack.append(state)
+        self.stats.states_pushed += 1
+        if self.tracer is not None:
+            self.tracer.push(state[0], link.WORD)
+
 def walk_test():
     logging.basicConfig(level=logging.DEBUG)
     logging.getLogger().setLevel(logging.DEBUG)
@@ -0,0 +1,56 @@
+"""Warm starts: seeding a search with the cached layouts of a similar word list.
+
+When a word or two of a list is edited and the crosswords regenerated, the best layouts of the old list
+mostly still work: strip the words that were removed, and what's left is a partial grid that the search
+only has to add the new words to. create_crosswords searches from those partial grids first (see the seeds
+argument of walker.CrosswordTreeSearch), NODE_LIMIT nodes at a time, until there's nothing left under them,
+and only then carries on as usual.
+"""
+
+from crossgen import grid
+
+MAX_SEEDS = 20
+"""Most partial grids to seed a search with"""
+
+NODE_LIMIT = 1000
+"""Nodes to search from the seeds per batch, so that seeds that lead nowhere count as batches without progress"""
+
+def strip_words(crossword, words, max_width=None, max_height=None):
+    """Return a new grid.Grid with the largest connected piece of crossword that only uses words in words,
+    moved so that its top left corner is at the origin, or None if no two such words cross"""
+    stripped = crossword.subgrid(words)
+    components = stripped.get_components()
+    if len(components) == 0 or len(components[0]) < 2:
+        return None
+    return stripped.subgrid(components[0]).translated_to_origin(max_width, max_height)
+
+def get_seed_grids(crosswords, words, max_width=None, max_height=None, max_seeds=MAX_SEEDS):
+    """Return up to max_seeds distinct partial grids for words, from the best of crosswords (a sequence of
+    (score, crossword_grid) tuples for a similar word list), most promising first"""
+    seeds = []
+    seen = set()
+    for score, crossword in sorted(crosswords, key=lambda x: x[0], reverse=True):
+        seed = strip_words(crossword, words, max_width, max_height)
+        if seed is None or not seed.fits(max_width, max_height):
+            continue
+        key = seed.get_canonical_key()
+        if key in seen:
+            continue
+        seen.add(key)
+        seeds.append(seed)
+        if len(seeds) == max_seeds:
+            break
+    seeds.sort(key=lambda seed: len(seed.words), reverse=True) # stable, so ties stay in score order
+    return seeds
+
+def main():
+    old_grid = grid.Grid()
+    old_grid.add_word("REIMU", 0, 0, grid.EAST)
+    old_grid.add_word("MARISA", 3, 0, grid.SOUTH)
+    old_grid.add_word("SANAE", 3, 4, grid.EAST)
+    print(old_grid)
+    print()
+    print(strip_words(old_grid, ["MARISA", "SANAE", "YOUMU"]))
+
+if __name__ == "__main__":
+    main()
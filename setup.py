@@ -13,6 +13,9 @@ setup(
 	author_email="ahiijny@gmail.com",
 	license="GPLv3",
 	packages=find_packages(),
+	package_data={
+		"crossgen" : ["corpora/*.txt"],
+	},
 	python_requires=">=3",
 	install_requires = [
 		'networkx',
@@ -0,0 +1,44 @@
+"""Tests for the asyncio API"""
+
+import asyncio
+import concurrent.futures
+
+from crossgen import aio
+from crossgen import command
+
+WORDS = ["reimu", "marisa", "sanae", "youmu", "sakuya"]
+
+def layouts(crosswords):
+    return [(score, str(crossword)) for score, crossword in crosswords]
+
+def test_acreate_crosswords_matches_create_crosswords():
+    expected = command.create_crosswords(list(WORDS), max=5, seed=0, verbose=False)
+    async def run():
+        return await asyncio.gather(*(aio.acreate_crosswords(WORDS, max=5, seed=0) for i in range(2)))
+    for result in asyncio.run(run()):
+        assert layouts(result) == layouts(expected)
+
+def test_acreate_crosswords_in_processes():
+    expected = command.create_crosswords(list(WORDS), max=5, seed=0, verbose=False)
+    async def run():
+        with concurrent.futures.ProcessPoolExecutor(2) as pool:
+            return await aio.acreate_crosswords(WORDS, executor=pool, max=5, seed=0)
+    assert layouts(asyncio.run(run())) == layouts(expected)
+
+def test_agenerate_streams_every_result():
+    expected = command.create_crosswords(list(WORDS), max=8, seed=0, verbose=False)
+    async def run():
+        return [item async for item in aio.agenerate(WORDS, queue_size=2, max=8, seed=0)]
+    assert sorted(layouts(asyncio.run(run())), reverse=True) == layouts(expected)
+
+def test_leaving_agenerate_early_stops_the_search():
+    async def run():
+        results = []
+        generator = aio.agenerate(WORDS, queue_size=1, max=None, seed=0)
+        async for item in generator:
+            results.append(item)
+            if len(results) == 2:
+                break
+        await generator.aclose()
+        return results
+    assert len(asyncio.run(asyncio.wait_for(run(), 10))) == 2
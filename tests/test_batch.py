@@ -0,0 +1,46 @@
+"""Tests for batch generation of many word lists"""
+
+import io
+import json
+
+from crossgen import batch
+
+def read_results(path):
+    with open(path, encoding="utf-8") as infile:
+        return {json.dumps(result["id"]) : result for result in map(json.loads, infile)}
+
+def run(lines, outpath, **kwargs):
+    infile = io.StringIO("".join(json.dumps(line) + "\n" if not isinstance(line, str) else line for line in lines))
+    return batch.run_batch(infile, str(outpath), workers=2, defaults={"max" : 3, "seed" : 0}, err=io.StringIO(), **kwargs)
+
+LISTS = [
+    {"id" : "a", "words" : ["alpha", "beta", "gamma"]},
+    {"words" : ["delta", "epsilon"]},
+    {"id" : "bad", "words" : []},
+    "not json\n",
+]
+
+def test_run_batch(tmp_path):
+    outpath = tmp_path / "out.jsonl"
+    summary = run(LISTS, outpath)
+    assert (summary["done"], summary["errors"], summary["skipped"]) == (2, 2, 0)
+    results = read_results(outpath)
+    assert results['"a"']["words"] == ["ALPHA", "BETA", "GAMMA"]
+    assert 0 < len(results['"a"']["crosswords"]) <= 3
+    assert "crosswords" in results["2"] # ids default to the line number
+    assert "error" in results['"bad"']
+    assert "error" in results["4"]
+
+def test_rerun_skips_finished_lists(tmp_path):
+    outpath = tmp_path / "out.jsonl"
+    run(LISTS[:1], outpath)
+    with open(outpath, "a", encoding="utf-8") as outfile:
+        outfile.write('{"id" : "half a li') # an interrupted write
+    summary = run(LISTS[:2], outpath)
+    assert (summary["done"], summary["skipped"]) == (1, 1)
+    assert set(read_results(outpath)) == {'"a"', "2"}
+
+def test_duplicate_ids_run_once(tmp_path):
+    outpath = tmp_path / "out.jsonl"
+    summary = run([LISTS[0], LISTS[0]], outpath)
+    assert summary["done"] == 1
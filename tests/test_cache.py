@@ -0,0 +1,64 @@
+"""Tests for the on-disk result cache"""
+
+import os
+
+from crossgen import cache
+from crossgen import command
+from crossgen import grid
+
+WORDS = ["ABC", "CAB"]
+
+def make_crosswords():
+    g = grid.Grid()
+    g.add_word("ABC", 0, 0, grid.EAST)
+    g.add_word("CAB", 2, 0, grid.SOUTH)
+    return [(1.5, g)]
+
+def test_keys_ignore_word_order_but_not_options():
+    assert cache.get_cache_key(["ABC", "CAB"], {}) == cache.get_cache_key(["CAB", "ABC"], {})
+    assert cache.get_cache_key(WORDS, {}) != cache.get_cache_key(WORDS, {"max_width" : 5})
+    assert cache.get_cache_key(WORDS, {}) != cache.get_cache_key(["ABC", "CAB", "BAD"], {})
+
+def test_put_and_get(tmp_path):
+    result_cache = cache.ResultCache(str(tmp_path))
+    key = cache.get_cache_key(WORDS, {})
+    assert result_cache.get(key) is None
+    result_cache.put(key, WORDS, make_crosswords())
+    [(score, crossword)] = result_cache.get(key)
+    assert score == 1.5
+    assert str(crossword) == str(make_crosswords()[0][1])
+
+def test_corrupt_entry_is_a_miss(tmp_path):
+    result_cache = cache.ResultCache(str(tmp_path))
+    key = cache.get_cache_key(WORDS, {})
+    with open(result_cache.get_path(key), "wb") as outfile:
+        outfile.write(b"not a cache entry")
+    assert result_cache.get(key) is None
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    result_cache = cache.ResultCache(str(tmp_path), max_entries=2)
+    keys = [cache.get_cache_key(WORDS, {"n" : i}) for i in range(3)]
+    for i, key in enumerate(keys[:2]):
+        result_cache.put(key, WORDS, make_crosswords())
+        os.utime(result_cache.get_path(key), (i, i))
+    result_cache.get(keys[0]) # now the most recently used
+    result_cache.put(keys[2], WORDS, make_crosswords())
+    assert len(result_cache) == 2
+    assert result_cache.get(keys[1]) is None
+    assert result_cache.get(keys[0]) is not None
+
+def test_find_similar(tmp_path):
+    result_cache = cache.ResultCache(str(tmp_path))
+    result_cache.put(cache.get_cache_key(WORDS, {}), WORDS, make_crosswords())
+    assert result_cache.find_similar(["ABC", "CAB", "BAD"], {}) == cache.get_cache_key(WORDS, {})
+    assert result_cache.find_similar(["ABC", "CAB", "BAD"], {"max_width" : 5}) is None
+    assert result_cache.find_similar(["XYZ", "ZYX"], {}) is None
+    assert result_cache.find_similar(WORDS, {}) is None # the same word list isn't "similar"
+
+def test_create_crosswords_uses_cache(tmp_path):
+    result_cache = cache.ResultCache(str(tmp_path))
+    words = ["alpha", "beta", "gamma", "delta"]
+    first = command.create_crosswords(list(words), max=10, seed=0, cache=result_cache, verbose=False)
+    assert len(result_cache) == 1
+    second = command.create_crosswords(list(reversed(words)), max=10, seed=1, cache=result_cache, verbose=False)
+    assert [(score, str(crossword)) for score, crossword in second] == [(score, str(crossword)) for score, crossword in first]
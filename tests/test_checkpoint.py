@@ -0,0 +1,69 @@
+"""Tests for checkpointing and resuming create_crosswords"""
+
+import gzip
+import threading
+
+import pytest
+
+from crossgen import checkpoint
+from crossgen import command
+
+WORDS = ["alpha", "beta", "gamma", "delta", "epsilon"]
+
+def interrupted_run(path, stop_after, **kwargs):
+    """Run create_crosswords with a checkpoint at path, cancelling it after stop_after results"""
+    cancel = threading.Event()
+    found = []
+    def result_callback(score, crossword):
+        found.append(crossword)
+        if len(found) == stop_after:
+            cancel.set()
+    return command.create_crosswords(list(WORDS), checkpoint=path, checkpoint_interval=0.0, cancel=cancel,
+            result_callback=result_callback, verbose=False, **kwargs)
+
+def keys(crosswords):
+    return sorted(crossword.get_canonical_key(True) for score, crossword in crosswords)
+
+def test_resumed_exhaustive_run_finds_the_same_layouts(tmp_path):
+    path = str(tmp_path / "run.ckpt")
+    expected = command.create_crosswords(list(WORDS), max=None, exhaustive=True, verbose=False)
+    assert len(expected) > 20
+    partial = interrupted_run(path, 10, max=None, exhaustive=True)
+    assert 10 <= len(partial) < len(expected)
+    resumed = command.create_crosswords(list(WORDS), max=None, exhaustive=True, checkpoint=path, verbose=False)
+    assert keys(resumed) == keys(expected)
+
+def test_resumed_sampled_run_carries_on(tmp_path):
+    path = str(tmp_path / "run.ckpt")
+    partial = interrupted_run(path, 5, max=15, seed=0)
+    assert len(partial) < 15
+    resumed = command.create_crosswords(list(WORDS), max=15, seed=0, checkpoint=path, verbose=False)
+    assert len(resumed) == 15
+    assert set(keys(partial)) <= set(keys(resumed))
+    assert len(set(keys(resumed))) == 15
+
+def test_checkpoint_for_other_words(tmp_path):
+    path = str(tmp_path / "run.ckpt")
+    interrupted_run(path, 5, max=30, seed=0)
+    (words, options, state) = checkpoint.load_checkpoint(path)
+    assert words == [word.upper() for word in WORDS]
+    with pytest.raises(command.OptionsError):
+        command.create_crosswords(["alpha", "beta"], checkpoint=path, verbose=False)
+
+def test_store_for_other_words(tmp_path):
+    path = str(tmp_path / "run.store")
+    command.create_crosswords(["alpha", "beta"], store=path, max=1, verbose=False)
+    with pytest.raises(command.OptionsError):
+        command.create_crosswords(list(WORDS), store=path, verbose=False)
+
+def test_bad_checkpoint(tmp_path):
+    path = tmp_path / "run.ckpt"
+    path.write_bytes(b"not a checkpoint")
+    with pytest.raises(command.OptionsError):
+        command.create_crosswords(list(WORDS), checkpoint=str(path), verbose=False)
+
+def test_corrupt_checkpoint(tmp_path):
+    path = tmp_path / "run.ckpt"
+    path.write_bytes(gzip.compress(b"not a pickle"))
+    with pytest.raises(command.OptionsError):
+        command.create_crosswords(list(WORDS), checkpoint=str(path), verbose=False)
@@ -0,0 +1,43 @@
+"""Tests for divide-and-conquer layout by word clusters"""
+
+import io
+
+from crossgen import cluster
+from crossgen import command
+from crossgen import scaling
+
+def make_words(count):
+    return [word.upper() for word in scaling.load_corpus("science")][:count]
+
+def test_partition_covers_every_word_once():
+    words = make_words(40)
+    clusters = cluster.partition_words(words, max_size=8, seed=0)
+    assert sorted(word for words_in_cluster in clusters for word in words_in_cluster) == sorted(words)
+    assert all(len(words_in_cluster) <= 8 for words_in_cluster in clusters)
+    assert [len(words_in_cluster) for words_in_cluster in clusters] == sorted(map(len, clusters), reverse=True)
+
+def test_clustered_crosswords_use_every_word():
+    words = make_words(30)
+    stats = {}
+    crosswords = cluster.create_clustered_crosswords(words, max=2, cluster_size=8, workers=1, cluster_timeout=1.0,
+            timeout=10.0, seed=0, stats=stats, err=io.StringIO())
+    assert len(crosswords) > 0
+    assert stats["clusters"]["count"] >= 30 / 8
+    for score, crossword in crosswords:
+        assert sorted(crossword.words) == sorted(words)
+        assert crossword.is_connected()
+
+def test_size_limits():
+    words = make_words(20)
+    crosswords = cluster.create_clustered_crosswords(words, max=2, cluster_size=8, workers=1, cluster_timeout=1.0,
+            timeout=10.0, seed=0, max_width=30, max_height=30, err=io.StringIO())
+    assert len(crosswords) > 0
+    assert all(crossword.fits(30, 30) for score, crossword in crosswords)
+
+def test_create_crosswords_cluster_mode():
+    words = make_words(20)
+    options = command.CreateOptions(max=2, cluster_size=8, workers=1, cluster_timeout=1.0, seed=0, verbose=False)
+    crosswords = command.create_crosswords([word.lower() for word in words], options)
+    assert len(crosswords) > 0
+    assert all(sorted(crossword.words) == sorted(words) for score, crossword in crosswords)
+    assert options.batch == 5 # create_crosswords fills in a copy of the options, not the caller's
@@ -0,0 +1,70 @@
+import io
+
+import pytest
+
+from crossgen import compact
+from crossgen import grid
+
+WORDS = ["REIMU", "MARISA", "SANAE"]
+
+def make_grid():
+    g = grid.Grid()
+    g.add_word("REIMU", 0, 0, grid.EAST)
+    g.add_word("MARISA", 3, 0, grid.SOUTH)
+    g.add_word("SANAE", 2, 5, grid.EAST)
+    return g
+
+def test_placements_round_trip():
+    placements = [(0, 0, 0, 0), (1, 3, -2, 1), (2, -7, 5, 0)]
+    assert compact.unpack_placements(compact.pack_placements(placements)) == placements
+
+def test_word_id_too_big_for_the_orientation_bit():
+    compact.pack_placements([(compact.ORIENTATION_BIT - 1, 0, 0, 1)])
+    with pytest.raises(ValueError):
+        compact.pack_placements([(compact.ORIENTATION_BIT, 0, 0, 0)])
+
+def test_jsonl_round_trip():
+    g = make_grid()
+    text = io.StringIO()
+    compact.write_jsonl(text, WORDS, [(1.5, g)])
+    text.seek(0)
+    (words, crosswords) = compact.read_jsonl(text)
+    [(score, crossword)] = list(crosswords)
+    assert words == WORDS
+    assert score == 1.5
+    assert str(crossword) == str(g)
+    assert crossword.words == g.words
+
+def test_binary_round_trip():
+    g = make_grid()
+    data = io.BytesIO()
+    compact.write_binary(data, WORDS, [(1.5, g), (0.5, g.transposed())])
+    data.seek(0)
+    (words, crosswords) = compact.read_binary(data)
+    assert words == WORDS
+    assert [score for score, crossword in crosswords] == [1.5, 0.5]
+    assert str(crosswords[0][1]) == str(g)
+    assert str(crosswords[1][1]) == str(g.transposed())
+    data.seek(0)
+    assert compact.read_header(data) == WORDS
+    assert data.tell() == len(compact.pack_header(WORDS))
+
+def test_binary_rejects_bad_magic():
+    data = bytearray(compact.pack_header(WORDS))
+    data[:4] = b"NOPE"
+    with pytest.raises(ValueError):
+        compact.unpack_header(bytes(data))
+    with pytest.raises(ValueError):
+        compact.read_header(io.BytesIO(bytes(data)))
+
+def test_binary_rejects_other_versions():
+    data = bytearray(compact.pack_header(WORDS))
+    data[4] = compact.VERSION + 1
+    with pytest.raises(ValueError):
+        compact.unpack_header(bytes(data))
+    with pytest.raises(ValueError):
+        compact.read_header(io.BytesIO(bytes(data)))
+
+def test_read_header_of_empty_file():
+    with pytest.raises(ValueError):
+        compact.read_header(io.BytesIO(b""))
@@ -0,0 +1,42 @@
+"""Tests for the search-space estimator and the settings it suggests"""
+
+from crossgen import estimate
+from crossgen import walker
+
+def test_estimate_is_close_on_a_small_tree():
+    words = ["alpha", "beta", "gamma"]
+    searcher = walker.CrosswordTreeSearch(words, rng=0)
+    solutions = len(list(searcher.search()))
+    result = estimate.estimate_search(words, time_budget=10, max_probes=2000, rng=0)
+    assert result["probes"] == 2000
+    assert 0.5 < result["tree_size"] / searcher.stats.nodes_expanded < 2
+    assert 0.5 < result["solutions"] / solutions < 2
+
+def test_estimate_is_seeded():
+    first = estimate.estimate_search(["alpha", "beta", "gamma"], max_probes=50, rng=1)
+    second = estimate.estimate_search(["alpha", "beta", "gamma"], max_probes=50, rng=1)
+    assert (first["tree_size"], first["solutions"]) == (second["tree_size"], second["solutions"])
+
+def make_estimate(tree_size, solutions):
+    return {"tree_size" : tree_size, "solutions" : solutions, "nodes_per_second" : 1e5}
+
+def test_small_trees_are_enumerated():
+    settings = estimate.suggest_settings(make_estimate(1e4, 50), max=10)
+    assert settings["exhaustive"]
+    assert settings["restarts"] == "batch"
+
+def test_sparse_trees_restart_by_node_count():
+    settings = estimate.suggest_settings(make_estimate(1e12, 1e6), max=10)
+    assert not settings["exhaustive"]
+    assert settings["restarts"] == "luby"
+    assert settings["restart_nodes"] == 1e6
+    assert settings["eta"] == 10 * 1e6 / 1e5
+
+def test_dense_trees_restart_after_batches():
+    settings = estimate.suggest_settings(make_estimate(1e12, 1e11), max=100)
+    assert (settings["exhaustive"], settings["restarts"]) == (False, "batch")
+    assert 2 <= settings["batch"] <= 50
+
+def test_no_solutions_falls_back_to_defaults():
+    settings = estimate.suggest_settings(make_estimate(1e12, 0), max=100)
+    assert (settings["batch"], settings["no_progress_timeout"], settings["eta"]) == (5, 5, None)
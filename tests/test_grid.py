@@ -0,0 +1,66 @@
+"""Tests for the grid's canonical dedupe key and the bitboard grid backend"""
+
+import random
+
+import pytest
+
+from crossgen import bench
+from crossgen import grid
+from crossgen import walker
+
+def make_grid(placements, grid_class=grid.Grid):
+    """Build a grid_class from (word, x, y, orientation) tuples"""
+    g = grid_class()
+    for word, x, y, orientation in placements:
+        g.add_word(word, x, y, orientation)
+    return g
+
+LAYOUT = [("ABC", 0, 0, grid.EAST), ("CAB", 2, 0, grid.SOUTH), ("BAD", 2, 2, grid.EAST)]
+
+def test_canonical_key_ignores_translation():
+    moved = [(word, x - 3, y + 5, orientation) for word, x, y, orientation in LAYOUT]
+    assert make_grid(LAYOUT).get_canonical_key() == make_grid(moved).get_canonical_key()
+
+def test_canonical_key_tells_layouts_apart():
+    other = [("ABC", 0, 0, grid.EAST), ("CAB", 2, 0, grid.SOUTH)]
+    assert make_grid(LAYOUT).get_canonical_key() != make_grid(other).get_canonical_key()
+
+def test_canonical_key_transpose():
+    g = make_grid(LAYOUT)
+    t = g.transposed()
+    assert g.get_canonical_key() != t.get_canonical_key()
+    assert g.get_canonical_key(True) == t.get_canonical_key(True)
+    assert t.transposed().get_canonical_key() == g.get_canonical_key()
+
+def test_empty_grid_key():
+    assert grid.Grid().get_canonical_key() == ()
+
+@pytest.mark.parametrize("trial", range(40))
+def test_bit_grid_agrees_with_grid(trial):
+    """BitGrid gives the same rejection for every placement as Grid, including ones far off the grid"""
+    rng = random.Random(trial)
+    words = bench.make_words(30, seed=trial, min_length=2, max_length=rng.choice([5, 10, 20]), alphabet="AEIRST")
+    g = bench.make_grid(words[:rng.randint(1, 25)])
+    if trial % 2:
+        b = grid.BitGrid.from_placements(words, g.get_placements({word : i for i, word in enumerate(words)}))
+    else:
+        b = make_grid([(word, *data["coords"], data["orientation"]) for word, data in g.words.items()], grid.BitGrid)
+    for i in range(200):
+        word = rng.choice(words) if rng.random() < 0.9 else rng.choice(words)[:3]
+        orientation = rng.choice(grid.ORIENTATIONS)
+        x = rng.randint(g.xmin - 22, g.xmax + 2)
+        y = rng.randint(g.ymin - 22, g.ymax + 2)
+        rejection = g.get_add_word_rejection(word, x, y, orientation)
+        assert b.get_add_word_rejection(word, x, y, orientation) == rejection
+        if rejection is None and word not in g.words and rng.random() < 0.3:
+            g.add_word(word, x, y, orientation)
+            b.add_word(word, x, y, orientation)
+            assert str(b) == str(g)
+    for other in (b.copy(), b.transposed()):
+        assert type(other) is grid.BitGrid
+    assert b.copy() == b
+
+def test_exhaustive_search_with_bit_grid():
+    words = ["ALPHA", "BETA", "GAMMA", "DELTA", "EPSILON"]
+    expected = [str(crossword) for crossword in walker.ExhaustiveSearch(words).search()]
+    assert [str(crossword) for crossword in walker.ExhaustiveSearch(words, grid_class=grid.BitGrid).search()] == expected
@@ -0,0 +1,34 @@
+"""Tests for regenerating a crossword around words that stay where they are"""
+
+import pytest
+
+from crossgen import command
+from crossgen import grid
+from crossgen import walker
+
+WORDS = ["ALPHA", "BETA", "GAMMA", "DELTA"]
+
+def every_layout():
+    """Every layout of WORDS, transposes included"""
+    return list(walker.ExhaustiveSearch(WORDS, transposes=True).search())
+
+def layouts_keeping(kept_grid):
+    """Canonical keys of every layout of WORDS with kept_grid's words placed as they are in kept_grid"""
+    kept_key = kept_grid.get_canonical_key()
+    return {crossword.get_canonical_key() for crossword in every_layout()
+            if crossword.subgrid(kept_grid.words).get_canonical_key() == kept_key}
+
+@pytest.mark.parametrize("kept_words", [["ALPHA", "BETA"], ["GAMMA"], ["BETA", "GAMMA", "DELTA"]])
+def test_kept_words_stay_where_they_are(kept_words):
+    for crossword in every_layout()[:10]:
+        kept_grid = crossword.subgrid(kept_words)
+        crosswords = command.create_crosswords(list(WORDS), max=None, initial_grid=kept_grid, verbose=False)
+        keys = [crossword.get_canonical_key() for score, crossword in crosswords]
+        assert len(keys) == len(set(keys))
+        assert set(keys) == layouts_keeping(kept_grid)
+
+def test_unknown_kept_word():
+    kept_grid = grid.Grid()
+    kept_grid.add_word("OMEGA", 0, 0, grid.EAST)
+    with pytest.raises(command.OptionsError):
+        command.create_crosswords(list(WORDS), initial_grid=kept_grid, verbose=False)
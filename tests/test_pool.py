@@ -0,0 +1,47 @@
+"""Tests for filling crosswords from a word pool"""
+
+import random
+
+import pytest
+
+from crossgen import pool
+from crossgen import scaling
+
+@pytest.fixture(scope="module")
+def pool_words():
+    return sorted({word.upper() for word in scaling.load_corpus(scaling.list_corpora()[0]) if word.isalpha()})
+
+@pytest.fixture
+def index(pool_words, tmp_path):
+    path = str(tmp_path / "pool.xgpl")
+    pool.build_index(pool_words + pool_words[:5], path) # duplicates are dropped
+    index = pool.PoolIndex(path)
+    yield index
+    index.close()
+
+def test_index_matches_brute_force(index, pool_words):
+    assert len(index) == len(pool_words)
+    assert sorted(index.get_word(i) for i in range(len(index))) == pool_words
+    rng = random.Random(0)
+    for trial in range(50):
+        word = rng.choice(pool_words)
+        positions = rng.sample(range(len(word)), rng.randint(0, min(2, len(word))))
+        constraints = [(position, word[position]) for position in positions]
+        expected = sorted(w for w in pool_words if len(w) == len(word) and all(w[p] == letter for p, letter in constraints))
+        assert sorted(index.get_word(i) for i in index.match(len(word), constraints)) == expected
+
+def test_fill_crosswords(index, pool_words):
+    crosswords = pool.fill_crosswords(index, 8, max=3, seed=0, max_width=15, max_height=15)
+    assert len(crosswords) > 0
+    for score, crossword in crosswords:
+        assert len(crossword.words) == 8
+        assert set(crossword.words) <= set(pool_words)
+        assert crossword.is_connected()
+        assert crossword.fits(15, 15)
+    assert len({crossword.get_canonical_key(True) for score, crossword in crosswords}) == len(crosswords)
+
+def test_not_an_index(tmp_path):
+    path = tmp_path / "pool.xgpl"
+    path.write_bytes(bytes(64))
+    with pytest.raises(ValueError):
+        pool.PoolIndex(str(path))
@@ -0,0 +1,32 @@
+"""Tests for the restart policies"""
+
+import pytest
+
+from crossgen import command
+from crossgen import restarts
+
+def test_luby_sequence():
+    assert [restarts.luby(i) for i in range(1, 16)] == [1, 1, 2, 1, 1, 2, 4, 1, 1, 2, 1, 1, 2, 4, 8]
+
+def test_policy_runs():
+    luby = restarts.LubyRestarts(unit=10)
+    assert [luby.next_run()["node_limit"] for i in range(7)] == [10, 10, 20, 10, 10, 20, 40]
+    lds = restarts.DiscrepancyRestarts()
+    assert [lds.next_run()["max_discrepancies"] for i in range(3)] == [0, 1, 2]
+    assert restarts.RandomRestarts(nodes=50).next_run() == {"node_limit" : 50}
+    assert restarts.BatchRestarts().next_run() == {}
+
+def test_make_restarts():
+    assert restarts.make_restarts("luby", nodes=30).unit == 30
+    assert restarts.make_restarts("random", nodes=30).nodes == 30
+    assert isinstance(restarts.make_restarts("lds", nodes=30), restarts.DiscrepancyRestarts)
+    with pytest.raises(KeyError):
+        restarts.make_restarts("nope")
+
+@pytest.mark.parametrize("name", ["luby", "random", "lds"])
+def test_persistent_policies_find_every_layout(name):
+    # the "batch" policy can't promise this: a fresh search that stops after a few results may never get to some layouts
+    words = ["alpha", "beta", "gamma"] # 8 layouts in all
+    crosswords = command.create_crosswords(list(words), max=8, seed=0, restarts=restarts.make_restarts(name, nodes=20),
+            no_progress_timeout=20, verbose=False)
+    assert len({crossword.get_canonical_key(True) for score, crossword in crosswords}) == 8
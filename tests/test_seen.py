@@ -0,0 +1,41 @@
+"""Tests for the memory-bounded seen-sets"""
+
+import random
+
+from crossgen import seen
+
+def random_hashes(count, seed=0):
+    rng = random.Random(seed)
+    return [rng.getrandbits(64) or 1 for i in range(count)]
+
+def test_canonical_hash_is_stable():
+    key = (("ABC", 0, 0, False), ("CAB", 2, 0, True))
+    assert seen.canonical_hash(key) == seen.canonical_hash(tuple(key))
+    assert seen.canonical_hash(key) != seen.canonical_hash(key[:1])
+    assert seen.canonical_hash(()) != 0
+
+def test_exact_seen_set_grows():
+    seen_set = seen.ExactSeenSet(capacity=4)
+    hashes = random_hashes(5000)
+    assert all(seen_set.add(h) for h in hashes)
+    assert len(seen_set) == 5000
+    assert all(h in seen_set for h in hashes)
+    assert not any(seen_set.add(h) for h in hashes)
+    assert len(seen_set) == 5000
+    assert not any(h in seen_set for h in random_hashes(1000, seed=1))
+
+def test_bloom_seen_set_has_no_false_negatives():
+    seen_set = seen.BloomSeenSet(error_rate=0.01, capacity=100)
+    hashes = random_hashes(2000)
+    for h in hashes:
+        seen_set.add(h)
+    assert len(seen_set.filters) > 1 # it had to scale up
+    assert all(h in seen_set for h in hashes)
+    assert not any(seen_set.add(h) for h in hashes)
+
+def test_bloom_seen_set_error_rate():
+    seen_set = seen.BloomSeenSet(error_rate=0.01, capacity=100)
+    for h in random_hashes(2000):
+        seen_set.add(h)
+    false_positives = sum(h in seen_set for h in random_hashes(100000, seed=1))
+    assert false_positives < 100000 * 0.011 # a little slack for sampling noise
@@ -0,0 +1,140 @@
+"""Load tests for the crossword HTTP service: several clients at once against a small server, checking that
+requests past its capacity get a 503 and that requests that run out of time get a 504."""
+
+import concurrent.futures
+import http.client
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+from crossgen import scaling
+from crossgen import server
+
+def post_json(url, obj, timeout):
+    """POST obj as JSON to url, and return (status, parsed response body)"""
+    data = json.dumps(obj).encode("utf-8")
+    request = urllib.request.Request(url, data=data, headers={"Content-Type" : "application/json"})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return (response.status, json.loads(response.read()))
+    except urllib.error.HTTPError as e:
+        return (e.code, json.loads(e.read()))
+
+def get_json(url, timeout=5):
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        return json.loads(response.read())
+
+def run_load(url, requests, concurrency, size=8, max=10, timeout=1.0, seed=0):
+    """Send requests to url's /generate from concurrency client threads, all starting at once, and return
+    a map from response status to the number of responses with it
+
+    Request i uses generated word list i, so that the server can't just cache one result."""
+    word_lists = [scaling.generate_word_list(size, seed=seed + i) for i in range(requests)]
+    start = threading.Barrier(concurrency)
+    def client(i):
+        if i < concurrency:
+            start.wait()
+        body = {"words" : word_lists[i], "max" : max, "timeout" : timeout, "seed" : seed + i}
+        return post_json(url + "/generate", body, timeout + 10)[0]
+    with concurrent.futures.ThreadPoolExecutor(concurrency) as clients:
+        statuses = list(clients.map(client, range(requests)))
+    return {status : statuses.count(status) for status in set(statuses)}
+
+@pytest.fixture
+def running_server():
+    """A CrosswordServer with one worker and room for one more request in the queue, serving on a free port"""
+    crossword_server = server.CrosswordServer(("127.0.0.1", 0), workers=1, queue_size=1, max_timeout=5.0)
+    thread = threading.Thread(target=crossword_server.serve_forever, daemon=True)
+    thread.start()
+    yield (crossword_server, f"http://127.0.0.1:{crossword_server.server_address[1]}")
+    crossword_server.shutdown()
+    crossword_server.server_close()
+
+def test_generate(running_server):
+    (crossword_server, url) = running_server
+    (status, response) = post_json(url + "/generate", {"words" : ["alpha", "beta", "gamma"], "max" : 3, "seed" : 0}, 10)
+    assert status == 200
+    assert response["words"] == ["ALPHA", "BETA", "GAMMA"]
+    assert 0 < len(response["crosswords"]) <= 3
+
+def test_bad_request(running_server):
+    (crossword_server, url) = running_server
+    (status, response) = post_json(url + "/generate", {"words" : []}, 10)
+    assert status == 400
+
+@pytest.mark.parametrize("length", ["ten", "-1"])
+def test_bad_content_length(running_server, length):
+    (crossword_server, url) = running_server
+    connection = http.client.HTTPConnection("127.0.0.1", crossword_server.server_address[1], timeout=10)
+    try:
+        connection.putrequest("POST", "/generate")
+        connection.putheader("Content-Length", length)
+        connection.endheaders()
+        response = connection.getresponse()
+        assert response.status == 400
+        assert "Content-Length" in json.loads(response.read())["error"]
+    finally:
+        connection.close()
+
+def test_failed_generate_gets_500(monkeypatch):
+    def broken_generate(words, options, deadline, cache_dir=None):
+        raise RuntimeError("broken")
+    crossword_server = server.CrosswordServer(("127.0.0.1", 0), workers=1, queue_size=0)
+    try:
+        # a thread pool, so that the monkeypatched _generate is the one that runs
+        crossword_server.pool.shutdown()
+        crossword_server.pool = concurrent.futures.ThreadPoolExecutor(1)
+        monkeypatch.setattr(server, "_generate", broken_generate)
+        with pytest.raises(server.RequestError) as e:
+            crossword_server.generate({"words" : ["alpha", "beta"], "timeout" : 1.0})
+        assert e.value.status == 500
+        assert crossword_server.active == 0
+    finally:
+        crossword_server.pool.shutdown()
+        crossword_server.server_close()
+
+def test_requests_past_capacity_get_503(running_server):
+    (crossword_server, url) = running_server
+    statuses = run_load(url, requests=6, concurrency=6, size=12, max=10000, timeout=1.0)
+    assert statuses.get(503) == 6 - crossword_server.capacity
+    assert set(statuses) <= {200, 503, 504}
+    deadline = time.monotonic() + 10
+    while get_json(url + "/health")["active"] > 0 and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert get_json(url + "/health")["active"] == 0
+
+def test_timed_out_request_keeps_its_slot_until_the_worker_is_done(monkeypatch):
+    release = threading.Event()
+    def slow_generate(words, options, deadline, cache_dir=None):
+        release.wait(10)
+        return ([], {})
+    crossword_server = server.CrosswordServer(("127.0.0.1", 0), workers=1, queue_size=0)
+    try:
+        # a thread pool, so that the worker can be held up from here
+        crossword_server.pool.shutdown()
+        crossword_server.pool = concurrent.futures.ThreadPoolExecutor(1)
+        monkeypatch.setattr(server, "_generate", slow_generate)
+        monkeypatch.setattr(server, "GRACE_PERIOD", 0.0)
+
+        with pytest.raises(server.RequestError) as e:
+            crossword_server.generate({"words" : ["alpha", "beta"], "timeout" : 0.2})
+        assert e.value.status == 504
+        with pytest.raises(server.RequestError) as e: # the worker is still busy with the first request
+            crossword_server.generate({"words" : ["alpha", "beta"], "timeout" : 0.2})
+        assert e.value.status == 503
+
+        release.set()
+        crossword_server.pool.shutdown(wait=True)
+        crossword_server.pool = concurrent.futures.ThreadPoolExecutor(1)
+        (words, crosswords, stats) = crossword_server.generate({"words" : ["alpha", "beta"], "timeout" : 1.0})
+        assert crosswords == []
+    finally:
+        release.set()
+        crossword_server.server_close()
+
+def test_worker_skips_requests_that_expired_in_the_queue():
+    assert server._generate(["alpha", "beta"], {}, time.time() - 1) is None
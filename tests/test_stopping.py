@@ -0,0 +1,59 @@
+import time
+
+from crossgen import command
+from crossgen.stopping import AnyStopping, CoverageStopping, DroughtStopping
+
+def test_drought_stops_after_batches_without_new_crosswords():
+    stopping = DroughtStopping(no_progress_timeout=3)
+    for found_new in [False, False, True, False, False]:
+        stopping.end_batch(found_new)
+        assert not stopping.should_stop()
+    stopping.end_batch(False)
+    assert stopping.should_stop()
+
+def test_drought_never_stops_with_negative_timeout():
+    stopping = DroughtStopping(no_progress_timeout=-1)
+    for i in range(100):
+        stopping.end_batch(False)
+    assert not stopping.should_stop()
+
+def test_coverage_waits_for_min_samples():
+    stopping = CoverageStopping(min_rate=1e9, min_samples=10)
+    for i in range(9):
+        stopping.observe(False)
+    assert not stopping.should_stop()
+    stopping.observe(False)
+    assert stopping.should_stop()
+
+def test_coverage_keeps_going_while_results_are_new():
+    stopping = CoverageStopping(min_rate=1.0, min_samples=10)
+    for i in range(50):
+        stopping.observe(True)
+    assert not stopping.should_stop() # 50 new crosswords in next to no time
+    assert stopping.get_coverage() == 0.0
+
+def test_coverage_estimates_total_from_duplicates():
+    stopping = CoverageStopping(window=10)
+    for is_new in [True] * 5 + [False] * 5:
+        stopping.observe(is_new)
+    assert stopping.get_coverage() == 0.5
+    assert stopping.get_estimated_total() == 10
+
+def test_any_stops_when_either_rule_does():
+    stopping = AnyStopping(CoverageStopping(min_rate=1.0, min_samples=20), DroughtStopping(no_progress_timeout=2))
+    stopping.end_batch(False)
+    assert not stopping.should_stop()
+    stopping.end_batch(False)
+    assert stopping.should_stop()
+    assert stopping.report()["drought_count"] == 2
+    assert stopping.report()["samples"] == 0
+
+def test_stop_rate_stops_on_unsolvable_word_list():
+    # the words can only cross each other, which needs more than one row, so nothing is ever found
+    stats = {}
+    start_time = time.monotonic()
+    crosswords = command.create_crosswords(["abc", "cab"], max=10, max_height=1, stopping=CoverageStopping(min_rate=1.0),
+            stats=stats, verbose=False, timeout=60)
+    assert crosswords == []
+    assert time.monotonic() - start_time < 30
+    assert stats["stopping"]["drought_count"] == 5
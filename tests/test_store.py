@@ -0,0 +1,66 @@
+import pytest
+
+from crossgen import command
+from crossgen import grid
+from crossgen.store import ResultStore
+
+WORDS = ["ABC", "CAB"]
+
+def make_grids():
+    """Three different layouts of WORDS"""
+    grids = []
+    for parent_index, child_index in [(0, 1), (2, 0), (1, 2)]:
+        g = grid.Grid()
+        g.add_word("ABC", 0, 0, grid.EAST)
+        g.join_word("ABC", parent_index, "CAB", child_index)
+        grids.append(g)
+    return grids
+
+def test_append_and_read_back(tmp_path):
+    path = tmp_path / "results.bin"
+    grids = make_grids()
+    with ResultStore(path, WORDS) as store:
+        for score, g in zip([1.0, 3.0, 2.0], grids):
+            store.append(score, g)
+        assert len(store) == 3
+        assert store.score(1) == 3.0
+        assert str(store[-1][1]) == str(grids[2])
+        assert [score for score, g in store.top_k(2)] == [3.0, 2.0]
+        assert [score for score, g in store.top_k()] == [3.0, 2.0, 1.0]
+        assert len(store.sample(10)) == 3
+
+def test_reopen_appends_after_old_records(tmp_path):
+    path = tmp_path / "results.bin"
+    grids = make_grids()
+    with ResultStore(path, WORDS) as store:
+        store.append(1.0, grids[0])
+    with ResultStore(path) as store:
+        assert store.words == WORDS
+        store.append(2.0, grids[1])
+    with ResultStore(path, WORDS) as store:
+        assert [score for score, g in store] == [1.0, 2.0]
+
+def test_partial_record_is_dropped(tmp_path):
+    path = tmp_path / "results.bin"
+    with ResultStore(path, WORDS) as store:
+        store.append(1.0, make_grids()[0])
+    with open(path, "ab") as outfile:
+        outfile.write(b"\x01\x02\x03")
+    with ResultStore(path) as store:
+        assert len(store) == 1
+
+def test_reopen_with_other_words(tmp_path):
+    path = tmp_path / "results.bin"
+    ResultStore(path, WORDS).close()
+    with pytest.raises(ValueError):
+        ResultStore(path, ["XYZ"])
+
+def test_create_crosswords_resumes_store(tmp_path):
+    path = str(tmp_path / "results.bin")
+    words = ["alpha", "beta", "gamma", "delta"] # 30 layouts in all
+    first = command.create_crosswords(list(words), max=5, seed=0, store=path, verbose=False)
+    assert len(first) == 5
+    second = command.create_crosswords(list(words), max=None, exhaustive=True, store=path, verbose=False)
+    assert len(second) == 30
+    keys = [g.get_canonical_key(True) for score, g in second]
+    assert len(set(keys)) == 30 # the first five weren't stored again
@@ -0,0 +1,50 @@
+"""Tests for filling block-pattern templates"""
+
+import itertools
+
+import pytest
+
+from crossgen import template
+
+WORDS = ["THE", "WOE", "OWL", "TWO", "HOW", "EEL", "WHY", "HOE", "OPT", "WHO", "HOP", "YET", "TOE", "HEN", "ERA",
+        "ONE", "ELK", "TOO", "HOT", "ENE", "ARE", "ATE", "TEN", "EAR", "NET", "TAN", "ANT", "NAP", "PEA"]
+
+def all_fills(first_letter=None):
+    """Every fill of a full 3x3 template from WORDS, as a tuple of rows, found by brute force"""
+    fills = set()
+    for rows in itertools.permutations(WORDS, 3):
+        columns = ["".join(row[x] for row in rows) for x in range(3)]
+        if len(set(rows) | set(columns)) == 6 and all(column in WORDS for column in columns):
+            if first_letter is None or rows[0][0] == first_letter:
+                fills.add(rows)
+    return fills
+
+def rows_of(crossword):
+    return tuple("".join(crossword.index[(x, y)] for x in range(3)) for y in range(3))
+
+def test_template_slots():
+    t = template.Template.from_string("""
+        ..#
+        ...
+        #..
+    """)
+    assert (t.width, t.height) == (3, 3)
+    assert len(t.slots) == 6
+    assert str(t) == "..#\n...\n#.."
+
+@pytest.mark.parametrize("text", ["", "..\n...", "#.#\n###\n#.#"])
+def test_bad_templates(text):
+    with pytest.raises(ValueError):
+        template.Template.from_string(text)
+
+def test_finds_every_fill():
+    expected = all_fills("T")
+    assert len(expected) > 0
+    t = template.Template.from_string("T..\n...\n...")
+    fills = template.fill_template(t, template.PatternIndex(WORDS), max=len(expected) + 1, seed=0, attempts=200)
+    assert len(fills) > 0
+    assert {rows_of(crossword) for score, crossword in fills} == expected
+
+def test_no_fill():
+    t = template.Template.from_string("Q..\n...\n...")
+    assert template.fill_template(t, template.PatternIndex(WORDS), max=3, seed=0) == []
@@ -0,0 +1,32 @@
+"""Tests for the structured search trace"""
+
+import io
+import json
+
+from crossgen import trace
+from crossgen import walker
+
+WORDS = ["ALPHA", "BETA", "GAMMA"]
+
+def run_traced(sample_rate=1.0):
+    outfile = io.StringIO()
+    tracer = trace.SearchTracer(outfile, sample_rate=sample_rate, seed=0)
+    crosswords = list(walker.generate_crosswords(WORDS, max=5, rng=0, tracer=tracer))
+    return (crosswords, outfile.getvalue())
+
+def test_replay_rebuilds_the_solutions():
+    (crosswords, text) = run_traced()
+    events = [json.loads(line) for line in text.splitlines()]
+    assert events[0] == {"e" : "start", "words" : WORDS, "n" : 0}
+    assert [event["n"] for event in events] == sorted(event["n"] for event in events)
+    solutions = [str(this_grid) for event, this_grid in trace.replay(io.StringIO(text)) if event["e"] == "solution"]
+    assert solutions == [str(crossword) for crossword in crosswords]
+
+def test_sampling_keeps_starts_and_solutions():
+    (crosswords, full_text) = run_traced()
+    (crosswords, sampled_text) = run_traced(sample_rate=0.1)
+    events = [json.loads(line) for line in sampled_text.splitlines()]
+    assert len(events) < len(full_text.splitlines())
+    assert sum(event["e"] == "solution" for event in events) == 5
+    assert sum(event["e"] == "start" for event in events) == 1
+    assert events[-1]["n"] == len(full_text.splitlines()) - 1 # sampled-out events are still counted
@@ -0,0 +1,89 @@
+"""Tests for the crossword search"""
+
+from crossgen import command
+from crossgen import restarts
+from crossgen import walker
+
+WORDS = ["alpha", "beta", "gamma", "delta", "epsilon"]
+
+def layouts(crosswords):
+    return [(score, str(crossword)) for score, crossword in crosswords]
+
+def test_same_seed_same_crosswords():
+    first = list(walker.generate_crosswords(WORDS, max=20, rng=1))
+    second = list(walker.generate_crosswords(WORDS, max=20, rng=1))
+    assert len(first) == 20
+    assert [str(g) for g in first] == [str(g) for g in second]
+
+def test_different_seed_different_order():
+    first = list(walker.generate_crosswords(WORDS, max=20, rng=1))
+    second = list(walker.generate_crosswords(WORDS, max=20, rng=2))
+    assert [str(g) for g in first] != [str(g) for g in second]
+
+def test_create_crosswords_is_reproducible():
+    for name in ("batch", "luby", "lds"):
+        first = command.create_crosswords(list(WORDS), max=15, seed=3, restarts=restarts.make_restarts(name), verbose=False)
+        second = command.create_crosswords(list(WORDS), max=15, seed=3, restarts=restarts.make_restarts(name), verbose=False)
+        assert len(first) == 15
+        assert layouts(first) == layouts(second)
+
+def all_layouts(words):
+    """Canonical keys of every layout of words, from running the sampling search to completion"""
+    searcher = walker.CrosswordTreeSearch(words, rng=0)
+    return {crossword.get_canonical_key(True) for crossword in searcher.search()}
+
+def test_exhaustive_search_finds_every_layout_once():
+    for words in (["alpha", "beta", "gamma"], ["alpha", "beta", "gamma", "delta"]):
+        keys = [crossword.get_canonical_key(True) for crossword in walker.ExhaustiveSearch(words).search()]
+        assert len(keys) == len(set(keys))
+        assert set(keys) == all_layouts(words)
+    assert len(keys) == 30
+
+def test_exhaustive_search_transposes():
+    words = ["alpha", "beta", "gamma", "delta"]
+    keys = [crossword.get_canonical_key() for crossword in walker.ExhaustiveSearch(words, transposes=True).search()]
+    assert len(keys) == len(set(keys)) == 60
+
+def test_create_crosswords_exhaustive():
+    words = ["alpha", "beta", "gamma", "delta"]
+    crosswords = command.create_crosswords(list(words), max=None, exhaustive=True, verbose=False)
+    assert len(crosswords) == 30
+    best = command.create_crosswords(list(words), max=5, exhaustive=True, verbose=False)
+    assert [score for score, crossword in best] == sorted((score for score, crossword in crosswords), reverse=True)[:5]
+
+def test_size_limits_keep_exactly_the_layouts_that_fit():
+    words = ["alpha", "beta", "gamma", "delta"]
+    unlimited = list(walker.CrosswordTreeSearch(words, rng=0).search())
+    for max_width, max_height in ((5, 5), (7, 5), (6, 9)):
+        searcher = walker.CrosswordTreeSearch(words, rng=0, max_width=max_width, max_height=max_height)
+        limited = {crossword.get_canonical_key() for crossword in searcher.search()}
+        assert limited == {crossword.get_canonical_key() for crossword in unlimited if crossword.fits(max_width, max_height)}
+
+def test_create_crosswords_size_limits():
+    words = ["alpha", "beta", "gamma", "delta"]
+    for exhaustive in (False, True):
+        crosswords = command.create_crosswords(list(words), max=None, seed=0, max_width=6, max_height=9,
+                exhaustive=exhaustive, verbose=False)
+        assert len(crosswords) > 0
+        assert all(crossword.fits(6, 9) for score, crossword in crosswords)
+    # a layout whose transpose also fits is only kept once
+    expected = {crossword.get_canonical_key(True) for crossword in walker.ExhaustiveSearch([word.upper() for word in words]).search()
+            if crossword.fits(6, 9) or crossword.transposed().fits(6, 9)}
+    assert {crossword.get_canonical_key(True) for score, crossword in crosswords} == expected
+
+def test_search_stats():
+    stats = walker.SearchStats()
+    crosswords = list(walker.generate_crosswords(WORDS, max=10, rng=0, stats=stats))
+    assert stats.solutions == len(crosswords) == 10
+    assert stats.nodes_expanded > 0
+    assert stats.joins_attempted >= sum(stats.joins_rejected.values())
+    assert stats.time_to_first_solution is not None
+    report = stats.as_dict()
+    assert report["solutions"] == 10
+    assert "nodes_expanded: " in walker.format_stats(report)
+
+def test_create_crosswords_fills_in_stats():
+    stats = {}
+    crosswords = command.create_crosswords(list(WORDS), max=10, seed=0, stats=stats, verbose=False)
+    assert stats["nodes_expanded"] > 0
+    assert stats["solutions"] >= len(crosswords)
@@ -0,0 +1,43 @@
+"""Tests for warm-starting a search from the layouts of a similar word list"""
+
+from crossgen import cache
+from crossgen import command
+from crossgen import grid
+from crossgen import walker
+from crossgen import warmstart
+
+def make_old_grid():
+    old_grid = grid.Grid()
+    old_grid.add_word("REIMU", 0, 0, grid.EAST)
+    old_grid.add_word("MARISA", 3, 0, grid.SOUTH)
+    old_grid.add_word("SANAE", 3, 4, grid.EAST)
+    return old_grid
+
+def test_strip_words():
+    seed = warmstart.strip_words(make_old_grid(), ["MARISA", "SANAE", "YOUMU"])
+    assert sorted(seed.words) == ["MARISA", "SANAE"]
+    assert seed.words["MARISA"]["coords"] == (0, 0)
+    assert warmstart.strip_words(make_old_grid(), ["REIMU", "SANAE"]) is None # they don't cross
+
+def test_get_seed_grids_dedupes():
+    crosswords = [(2.0, make_old_grid()), (1.0, make_old_grid())]
+    seeds = warmstart.get_seed_grids(crosswords, ["MARISA", "SANAE", "YOUMU"])
+    assert len(seeds) == 1
+
+def test_search_starts_from_seeds():
+    words = ["MARISA", "SANAE", "YOUMU"]
+    seed = warmstart.strip_words(make_old_grid(), words)
+    for rng in range(5):
+        [crossword] = walker.generate_crosswords(words, max=1, rng=rng, seeds=[seed])
+        assert crossword.subgrid(["MARISA", "SANAE"]).get_canonical_key() == seed.get_canonical_key()
+
+def test_create_crosswords_warm_start(tmp_path):
+    result_cache = cache.ResultCache(str(tmp_path))
+    old_words = ["REIMU", "MARISA", "SANAE"]
+    result_cache.put(cache.get_cache_key(old_words, {}), old_words, [(1.0, make_old_grid())])
+    new_words = ["MARISA", "SANAE", "YOUMU"]
+    crosswords = command.create_crosswords(list(new_words), max=5, seed=0, cache=result_cache, warm_start=True, verbose=False)
+    assert len(crosswords) > 0
+    seed = warmstart.strip_words(make_old_grid(), new_words)
+    assert any(crossword.subgrid(["MARISA", "SANAE"]).get_canonical_key() == seed.get_canonical_key()
+            for score, crossword in crosswords)